@@ -0,0 +1,76 @@
+"""Load benchmark for the async agent execution path.
+
+Compares the old blocking handler (``Agent.run`` called inline on the event
+loop, which is what a synchronous MCP tool does) with ``AsyncAgentExecutor``
+using a thread-pooled synchronous stub and an async-native stub.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.async_execution
+"""
+
+import asyncio
+import os
+import time
+
+from medical_aop.execution import AsyncAgentExecutor
+
+from benchmarks.stub_llm import AsyncStubAgent, StubAgent, summarize
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.02"))
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "200"))
+CONCURRENCY_LEVELS = [
+    int(c) for c in os.environ.get("BENCH_CONCURRENCY", "1,8,32,128,256").split(",")
+]
+
+
+async def closed_loop(call, concurrency: int, requests: int) -> dict:
+    latencies = []
+    remaining = iter(range(requests))
+
+    start = time.perf_counter()
+
+    async def worker() -> None:
+        # Measure from when the worker was ready to send, so time spent
+        # waiting on a blocked event loop counts against the request.
+        ready = start
+        for i in remaining:
+            await asyncio.sleep(0)  # request arrival yields like a socket read
+            await call(f"CBC panel #{i}")
+            done = time.perf_counter()
+            latencies.append(done - ready)
+            ready = done
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def main() -> None:
+    sync_agent = StubAgent(latency=LATENCY)
+    async_agent = AsyncStubAgent(latency=LATENCY)
+    executor = AsyncAgentExecutor(max_concurrency_per_agent=256, max_threads=256)
+
+    async def blocking(task: str):
+        return sync_agent.run(task=task)
+
+    async def threaded(task: str):
+        return await executor.execute("stub", sync_agent, task, timeout=30)
+
+    async def native(task: str):
+        return await executor.execute("stub", async_agent, task, timeout=30)
+
+    modes = {"blocking": blocking, "async+threads": threaded, "async-native": native}
+    print(f"stub latency={LATENCY * 1000:.0f}ms, {REQUESTS} requests per level")
+    print(f"{'mode':<15}{'conc':>6}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for concurrency in CONCURRENCY_LEVELS:
+        for name, call in modes.items():
+            stats = await closed_loop(call, concurrency, REQUESTS)
+            print(
+                f"{name:<15}{concurrency:>6}{stats['rps']:>10}"
+                f"{stats['p50_ms']:>10}{stats['p99_ms']:>10}"
+            )
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
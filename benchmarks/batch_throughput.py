@@ -0,0 +1,82 @@
+"""Throughput of ``batch_run`` versus one ``call_tool`` per item.
+
+Starts the stub MCP server in-process and pushes the same items through
+three client strategies over streamable-http.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.batch_throughput
+"""
+
+import asyncio
+import os
+import time
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from benchmarks.stub_server import build_stub_server, serve_in_background
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.02"))
+ITEMS = int(os.environ.get("BENCH_ITEMS", "500"))
+CHUNK_SIZE = int(os.environ.get("BENCH_CHUNK_SIZE", "100"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "16"))
+PORT = int(os.environ.get("BENCH_PORT", "8765"))
+AGENT = "Blood-Data-Analysis-Agent"
+
+
+async def per_item_sequential(session: ClientSession, items) -> None:
+    for item in items:
+        await session.call_tool(AGENT, arguments={"task": item["task"]})
+
+
+async def per_item_concurrent(session: ClientSession, items) -> None:
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def call(item) -> None:
+        async with semaphore:
+            await session.call_tool(AGENT, arguments={"task": item["task"]})
+
+    await asyncio.gather(*(call(item) for item in items))
+
+
+async def batched(session: ClientSession, items) -> None:
+    async def on_progress(progress, total, message) -> None:
+        pass
+
+    for start in range(0, len(items), CHUNK_SIZE):
+        await session.call_tool(
+            "batch_run",
+            arguments={
+                "agent_name": AGENT,
+                "items": items[start : start + CHUNK_SIZE],
+                "max_concurrency": CONCURRENCY,
+            },
+            progress_callback=on_progress,
+        )
+
+
+async def main(url: str) -> None:
+    items = [
+        {"id": f"panel-{i}", "task": f"Interpret CBC #{i}: WBC 15.2, HGB 10.1"}
+        for i in range(ITEMS)
+    ]
+    strategies = {
+        "call_tool per item (sequential)": per_item_sequential,
+        f"call_tool per item ({CONCURRENCY} concurrent)": per_item_concurrent,
+        f"batch_run (chunks of {CHUNK_SIZE}, {CONCURRENCY} concurrent)": batched,
+    }
+    print(f"{ITEMS} items, stub latency={LATENCY * 1000:.0f}ms")
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for name, strategy in strategies.items():
+                start = time.perf_counter()
+                await strategy(session, items)
+                elapsed = time.perf_counter() - start
+                print(f"{name:<48} {ITEMS / elapsed:>8.1f} items/s  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    with serve_in_background(build_stub_server(latency=LATENCY), PORT) as url:
+        asyncio.run(main(url))
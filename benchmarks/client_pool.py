@@ -0,0 +1,100 @@
+"""Per-call client overhead: pooled ``AOPClient`` versus a session per call.
+
+Starts the stub MCP server in-process with a near-instant agent, so what
+is measured is the client-side cost around each call. Four strategies:
+
+- ``unpooled``: what the example scripts do for every call. It connects,
+  runs ``initialize()`` and ``list_tools()``, makes one call and tears
+  the session down.
+- ``unpooled-concurrent``: the same, ``BENCH_CONCURRENCY`` calls at a time
+- ``pooled``: one ``AOPClient``, calls one after another
+- ``pooled-concurrent``: one ``AOPClient`` (``BENCH_POOL_SIZE`` sessions),
+  ``BENCH_CONCURRENCY`` calls at a time
+
+Reports calls/s and per-call latency. The agent's own latency
+(``BENCH_LATENCY``) is subtracted to give the client overhead.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.client_pool
+"""
+
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, List
+
+from loguru import logger
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from medical_aop.client import AOPClient
+
+from benchmarks.stub_llm import percentile
+from benchmarks.stub_server import build_stub_server, serve_in_background
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.001"))
+CALLS = int(os.environ.get("BENCH_CALLS", "300"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "16"))
+POOL_SIZE = int(os.environ.get("BENCH_POOL_SIZE", "4"))
+PORT = int(os.environ.get("BENCH_PORT", "8765"))
+AGENT = "Blood-Data-Analysis-Agent"
+
+
+async def unpooled_call(url: str, i: int) -> None:
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            await session.list_tools()
+            result = await session.call_tool(AGENT, arguments={"task": f"Panel #{i}"})
+            assert not result.isError
+
+
+async def drive(call: Callable[[int], Awaitable[None]], concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call(i)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(timed(i) for i in range(CALLS)))
+    return latencies
+
+
+async def main(url: str) -> None:
+    print(
+        f"{CALLS} calls, agent latency {LATENCY * 1e3:.1f}ms, "
+        f"concurrency {CONCURRENCY}, pool size {POOL_SIZE}"
+    )
+    print(f"{'strategy':<22}{'calls/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'overhead ms':>13}")
+
+    async def pooled(client: AOPClient, i: int) -> None:
+        response = await client.call(AGENT, f"Panel #{i}")
+        assert response["success"], response
+
+    for name in ("unpooled", "unpooled-concurrent", "pooled", "pooled-concurrent"):
+        concurrency = CONCURRENCY if name.endswith("concurrent") else 1
+        start = time.perf_counter()
+        if name.startswith("unpooled"):
+            latencies = await drive(lambda i: unpooled_call(url, i), concurrency)
+        else:
+            async with AOPClient(url, pool_size=POOL_SIZE) as client:
+                # The pool's first connect is a one-off, like a service's startup.
+                start = time.perf_counter()
+                latencies = await drive(lambda i: pooled(client, i), concurrency)
+        elapsed = time.perf_counter() - start
+        p50 = percentile(latencies, 50)
+        print(
+            f"{name:<22}{CALLS / elapsed:>9.1f}{p50 * 1e3:>9.1f}"
+            f"{percentile(latencies, 99) * 1e3:>9.1f}{(p50 - LATENCY) * 1e3:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    # The executor logs every agent call.
+    logger.remove()
+    with serve_in_background(build_stub_server(latency=LATENCY), port=PORT) as url:
+        asyncio.run(main(url))
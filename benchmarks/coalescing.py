@@ -0,0 +1,109 @@
+"""LLM calls saved by single-flight coalescing of identical concurrent requests.
+
+Fires waves of concurrent calls through ``AgentDispatcher`` at one stub
+agent with a fixed latency. Each wave draws its tasks from a few hot
+payloads (a popular lab panel or drug pair) with a Zipf-like skew; task
+texts are new every wave, so nothing is answered from an earlier wave.
+Four configurations:
+
+- ``none``: every call runs the agent
+- ``cache``: response cache only; identical calls arriving together all
+  miss, since no result has been stored yet
+- ``single-flight``: identical calls in flight share one execution
+- ``both``: cache plus single-flight (the ``app.py`` setup)
+
+Reports agent executions, calls per execution, and per-call latency.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.coalescing
+"""
+
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, List
+
+from loguru import logger
+
+from medical_aop.cache import ResponseCache
+from medical_aop.coalesce import SingleFlight
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AsyncAgentExecutor
+
+from benchmarks.stub_llm import AsyncStubAgent, percentile
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.2"))
+WAVES = int(os.environ.get("BENCH_WAVES", "10"))
+CALLS_PER_WAVE = int(os.environ.get("BENCH_CALLS_PER_WAVE", "200"))
+HOT_KEYS = int(os.environ.get("BENCH_HOT_KEYS", "20"))
+SEED = int(os.environ.get("BENCH_SEED", "7"))
+TOOL = "Drug-Interaction-Agent"
+
+
+class CountingStubAgent(AsyncStubAgent):
+    executions = 0
+
+    async def arun(self, task: str, *args, **kwargs) -> Any:
+        self.executions += 1
+        return await super().arun(task, *args, **kwargs)
+
+
+def wave_tasks(wave: int, rng: random.Random) -> List[str]:
+    weights = [1 / (rank + 1) for rank in range(HOT_KEYS)]
+    picks = rng.choices(range(HOT_KEYS), weights=weights, k=CALLS_PER_WAVE)
+    # Case and spacing differences normalize to the same key.
+    return [
+        f"Wave {wave}: warfarin + drug #{key}" if i % 2 else f"wave {wave}:  WARFARIN + drug #{key} "
+        for i, key in enumerate(picks)
+    ]
+
+
+async def run(mode: str) -> dict:
+    agent = CountingStubAgent(agent_name=TOOL, latency=LATENCY)
+    dispatcher = AgentDispatcher(
+        AsyncAgentExecutor(max_concurrency_per_agent=1024, retry_delay=0),
+        agents={TOOL: agent},
+        tool_configs={TOOL: SimpleNamespace(timeout=30, max_retries=0)},
+        response_cache=ResponseCache(max_entries=100_000) if mode in ("cache", "both") else None,
+        single_flight=SingleFlight() if mode in ("single-flight", "both") else None,
+    )
+    rng = random.Random(SEED)
+    latencies: List[float] = []
+
+    async def call(task: str) -> None:
+        start = time.perf_counter()
+        response = await dispatcher.dispatch(TOOL, task)
+        assert response["success"], response
+        latencies.append(time.perf_counter() - start)
+
+    for wave in range(WAVES):
+        await asyncio.gather(*(call(task) for task in wave_tasks(wave, rng)))
+    return {
+        "executions": agent.executions,
+        "calls_per_execution": len(latencies) / agent.executions,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def main() -> None:
+    print(
+        f"{WAVES} waves x {CALLS_PER_WAVE} concurrent calls over {HOT_KEYS} hot payloads, "
+        f"{LATENCY * 1e3:.0f}ms per agent call"
+    )
+    print(f"{'mode':<15}{'executions':>11}{'calls/exec':>12}{'p50 ms':>9}{'p99 ms':>9}")
+    for mode in ("none", "cache", "single-flight", "both"):
+        r = await run(mode)
+        print(
+            f"{mode:<15}{r['executions']:>11}{r['calls_per_execution']:>12.1f}"
+            f"{r['p50'] * 1e3:>9.1f}{r['p99'] * 1e3:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    # The executor logs every agent call.
+    logger.remove()
+    asyncio.run(main())
@@ -0,0 +1,144 @@
+"""Agent discovery and search latency as the registry grows.
+
+Registers synthetic specialty agents (10, 1k and 10k by default) and
+times the discovery tool bodies two ways:
+
+- ``linear``: what AOP's stock tools do, rebuilding every agent's
+  discovery record and substring-matching each searched field per call
+- ``indexed``: ``AgentIndex`` with precomputed records, posting lists and
+  ranked results, as served by ``MedicalAOP(indexed_discovery=True)``
+
+Reports per-call search latency, the cost of a full ``discover_agents``
+listing, a projected (``tool_name``, ``tags``) page of 50, the payload
+size of each, and the time to index one more agent.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.discovery
+"""
+
+import json
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from medical_aop.discovery import AgentIndex, agent_discovery_info, paginate, project
+
+SIZES = [int(n) for n in os.environ.get("BENCH_SIZES", "10,1000,10000").split(",")]
+QUERIES = os.environ.get(
+    "BENCH_QUERIES", "cardio,oncology imaging,icd,pediatric dosing,zzz"
+).split(",")
+MIN_SECONDS = float(os.environ.get("BENCH_MIN_SECONDS", "0.2"))
+
+SPECIALTIES = [
+    "cardiology", "oncology", "nephrology", "hematology", "neurology", "pediatrics",
+    "dermatology", "radiology", "endocrinology", "pulmonology", "rheumatology",
+    "gastroenterology", "infectious-disease", "psychiatry", "geriatrics", "urology",
+]
+TASKS = [
+    "triage", "imaging", "dosing", "coding", "summarization", "lab-interpretation",
+    "interaction-check", "guideline-lookup", "risk-scoring", "documentation",
+]
+
+
+def make_agents(count: int) -> Dict[str, Any]:
+    rng = random.Random(count)
+    agents = {}
+    for i in range(count):
+        specialty, task = SPECIALTIES[i % len(SPECIALTIES)], rng.choice(TASKS)
+        name = f"{specialty.title()}-{task.title()}-Agent-{i}"
+        agents[name] = SimpleNamespace(
+            agent_name=name,
+            agent_description=f"{task.replace('-', ' ')} support for {specialty} teams",
+            system_prompt=f"You are a {specialty} {task} assistant. " * 20,
+            tags=[specialty, task, rng.choice(["adult", "pediatric", "education"])],
+            capabilities=[f"{task}-support", rng.choice(["citation", "flagging", "ranking"])],
+            role="worker",
+            model_name="claude-haiku-4-5",
+            max_loops=1,
+            temperature=None,
+            max_tokens=4096,
+        )
+    return agents
+
+
+def linear_search(agents: Dict[str, Any], query: str) -> List[Dict[str, Any]]:
+    """AOP's stock ``search_agents``: rebuild each record, substring match."""
+    query = query.lower()
+    matches = []
+    for tool_name, agent in agents.items():
+        info = agent_discovery_info(tool_name, agent)
+        if (
+            query in info["agent_name"].lower()
+            or query in info["description"].lower()
+            or any(query in tag.lower() for tag in info["tags"])
+            or any(query in cap.lower() for cap in info["capabilities"])
+        ):
+            matches.append(info)
+    return matches
+
+
+def timed(fn: Callable[[], Any]) -> float:
+    """Mean seconds per call, repeating for at least ``MIN_SECONDS``."""
+    calls, start = 0, time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            return elapsed / calls
+
+
+def fmt(seconds: float) -> str:
+    return f"{seconds * 1e6:.0f}us" if seconds < 1e-3 else f"{seconds * 1e3:.1f}ms"
+
+
+def main() -> None:
+    print(f"queries: {QUERIES}")
+    print(
+        f"{'agents':>7}  {'mode':<8}{'search':>10}{'discover all':>14}{'bytes':>11}"
+        f"{'page of 50':>12}{'bytes':>8}{'add one':>10}"
+    )
+    for size in SIZES:
+        agents = make_agents(size)
+        index = AgentIndex()
+        for name, agent in agents.items():
+            index.add(name, agent)
+        projection = ["tool_name", "tags"]
+
+        def linear_all() -> List[Dict[str, Any]]:
+            return [agent_discovery_info(name, agent) for name, agent in agents.items()]
+
+        rows = {
+            "linear": (
+                lambda: [linear_search(agents, q) for q in QUERIES],
+                linear_all,
+                lambda: linear_all()[:50],
+                None,
+            ),
+            "indexed": (
+                lambda: [paginate(index.search(q), 0, 50) for q in QUERIES],
+                index.records,
+                lambda: [
+                    project(info, projection)
+                    for info in index.records(paginate(index.names(), 0, 50)[0])
+                ],
+                lambda: (
+                    index.add("Extra-Agent", agents[next(iter(agents))]),
+                    index.remove("Extra-Agent"),
+                ),
+            ),
+        }
+        for mode, (search, discover, page, add) in rows.items():
+            print(
+                f"{size:>7}  {mode:<8}{fmt(timed(search) / len(QUERIES)):>10}"
+                f"{fmt(timed(discover)):>14}{len(json.dumps(discover())):>11}"
+                f"{fmt(timed(page)):>12}{len(json.dumps(page())):>8}"
+                f"{fmt(timed(add) / 2) if add else '-':>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
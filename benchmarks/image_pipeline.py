@@ -0,0 +1,180 @@
+"""Per-request image preprocessing time and memory.
+
+Writes synthetic 16-bit grayscale PNGs of ``BENCH_EDGE``² pixels (what
+a DICOM series exported for triage looks like), all distinct, and
+prepares requests of 1, 10 and 50 of them (``BENCH_COUNTS``) three ways:
+
+- ``baseline``: what the agent does today for every call, reading each
+  file whole and base64-encoding it (``swarms``' ``get_image_base64``)
+- ``cold``: ``ImagePipeline`` with an empty cache; images are hashed,
+  downscaled to ``BENCH_MAX_EDGE`` and re-encoded on the worker pool
+- ``warm``: the same request again, as when a study is re-triaged or
+  the images are shared between requests
+
+Reports the time per request, the Python heap peak (tracemalloc), the
+process RSS peak above the starting RSS (sampled) and the size of the
+payload handed to the model. Downscaling needs Pillow; without it the
+pipeline passes the PNGs through and only hashing and caching apply.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.image_pipeline
+"""
+
+import asyncio
+import base64
+import os
+import struct
+import tempfile
+import threading
+import time
+import tracemalloc
+import zlib
+from typing import Awaitable, Callable, List, Tuple
+
+import psutil
+from loguru import logger
+
+from medical_aop.images import ImagePipeline
+
+COUNTS = [int(n) for n in os.environ.get("BENCH_COUNTS", "1,10,50").split(",")]
+EDGE = int(os.environ.get("BENCH_EDGE", "2048"))
+MAX_EDGE = int(os.environ.get("BENCH_MAX_EDGE", "1568"))
+WORKERS = int(os.environ.get("BENCH_WORKERS", "4"))
+REPEAT = int(os.environ.get("BENCH_REPEAT", "3"))
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return (
+        struct.pack(">I", len(data))
+        + kind
+        + data
+        + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+    )
+
+
+def write_images(directory: str, count: int) -> List[str]:
+    """16-bit grayscale PNGs sharing pixel data but differing in content."""
+    # Smooth anatomy-like gradients plus low-bit noise, which compresses
+    # about as well as a real scan.
+    rows = []
+    for y in range(EDGE):
+        row = bytearray(b"\x00")
+        for x in range(EDGE):
+            value = (x * y // EDGE) * 24 + ((x * 7919 + y * 104729) % 251 & 0x3F)
+            row += (value & 0xFFFF).to_bytes(2, "big")
+        rows.append(bytes(row))
+    idat = _chunk(b"IDAT", zlib.compress(b"".join(rows), 6))
+    ihdr = _chunk(b"IHDR", struct.pack(">IIBBBBB", EDGE, EDGE, 16, 0, 0, 0, 0))
+    paths = []
+    for i in range(count):
+        text = _chunk(b"tEXt", b"Comment\x00" + f"series image {i}".encode())
+        path = os.path.join(directory, f"image_{i:03d}.png")
+        with open(path, "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + ihdr + text + idat + _chunk(b"IEND", b""))
+        paths.append(path)
+    return paths
+
+
+def baseline(paths: List[str]) -> List[str]:
+    encoded = []
+    for path in paths:
+        with open(path, "rb") as f:
+            encoded.append("data:image/png;base64," + base64.b64encode(f.read()).decode())
+    return encoded
+
+
+async def measure(
+    run: Callable[[], Awaitable[List[str]]], reset: Callable[[], Awaitable[None]]
+) -> Tuple[float, float, float, float]:
+    """Best seconds, heap peak MB, RSS peak MB above the start, payload MB.
+
+    Timed runs and the traced run are separate: tracemalloc slows every
+    allocation down.
+    """
+    elapsed = float("inf")
+    for _ in range(REPEAT):
+        await reset()
+        start = time.perf_counter()
+        await run()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    await reset()
+    process = psutil.Process()
+    start_rss = process.memory_info().rss
+    peak_rss = start_rss
+    done = threading.Event()
+
+    def sample() -> None:
+        nonlocal peak_rss
+        while not done.wait(0.002):
+            peak_rss = max(peak_rss, process.memory_info().rss)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    tracemalloc.start()
+    payload = await run()
+    _, heap_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    done.set()
+    sampler.join()
+    peak_rss = max(peak_rss, process.memory_info().rss)
+    mb = 2**20
+    return (
+        elapsed,
+        heap_peak / mb,
+        (peak_rss - start_rss) / mb,
+        sum(len(uri) for uri in payload) / mb,
+    )
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_images(directory, max(COUNTS))
+        size = os.path.getsize(paths[0]) / 2**20
+        pipeline = ImagePipeline(
+            max_edge=MAX_EDGE, max_workers=WORKERS, allowed_roots=[directory]
+        )
+        print(
+            f"{EDGE}x{EDGE} 16-bit PNGs ({size:.1f} MB each), max edge {MAX_EDGE}, "
+            f"{WORKERS} workers, Pillow {'yes' if pipeline.get_stats()['pillow'] else 'no'}"
+        )
+        print(
+            f"{'images':>6}  {'strategy':<9}{'ms/request':>11}"
+            f"{'heap MB':>9}{'RSS MB':>8}{'payload MB':>12}"
+        )
+
+        for count in COUNTS:
+            batch = paths[:count]
+
+            async def direct() -> List[str]:
+                return baseline(batch)
+
+            async def prepared() -> List[str]:
+                return (await pipeline.prepare(None, batch)).imgs
+
+            async def nothing() -> None:
+                pass
+
+            async def clear() -> None:
+                pipeline.clear()
+
+            async def warm_up() -> None:
+                await prepared()
+
+            for name, run, reset in (
+                ("baseline", direct, nothing),
+                ("cold", prepared, clear),
+                ("warm", prepared, warm_up),
+            ):
+                elapsed, heap, rss, payload = await measure(run, reset)
+                print(
+                    f"{count:>6}  {name:<9}{elapsed * 1e3:>11.1f}"
+                    f"{heap:>9.1f}{rss:>8.1f}{payload:>12.1f}"
+                )
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    # A missing Pillow is reported in the header instead.
+    logger.remove()
+    asyncio.run(main())
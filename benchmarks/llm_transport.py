@@ -0,0 +1,114 @@
+"""Shared pooled LLM client versus litellm's default client, end to end.
+
+Runs real swarms agents (the six from ``medical_agents.py``) against the
+local mock Anthropic API in ``benchmarks.mock_llm``, from a thread pool as
+the server does, in two modes:
+
+- ``default``: agents as built, litellm picks its own HTTP client
+- ``shared``: every agent routed through one ``SharedLLMClient``
+
+and two backend scenarios: unlimited, and a ``BENCH_RPS`` request limit
+that answers bursts with 429. Reports client-visible failures, latency,
+connections the server saw and 429s it had to send.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.llm_transport
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock")
+
+PORT = int(os.environ.get("BENCH_PORT", "8090"))
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "300"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "32"))
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+RPS = int(os.environ.get("BENCH_RPS", "50"))
+MODES = os.environ.get("BENCH_MODES", "default,shared").split(",")
+
+from loguru import logger  # noqa: E402
+from swarms import Agent  # noqa: E402  (slow import, after the env is set)
+
+from medical_agents import agents as medical_agents  # noqa: E402
+from medical_aop.llm_client import SharedLLMClient  # noqa: E402
+
+from benchmarks.mock_llm import MockLLM, serve_mock_llm  # noqa: E402
+from benchmarks.stub_llm import summarize  # noqa: E402
+
+
+def build_agents() -> List[Any]:
+    return [
+        Agent(
+            agent_name=lazy.agent_name,
+            system_prompt=lazy.system_prompt,
+            # Explicit provider, so older litellm releases route it too.
+            model_name=f"anthropic/{lazy.model_name.split('/')[-1]}",
+            max_loops=1,
+            print_on=False,
+            retry_attempts=1,
+        )
+        for lazy in medical_agents
+    ]
+
+
+def drive(agents: List[Any]) -> Dict[str, Any]:
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        output = agents[i % len(agents)].run(f"Lab panel #{i}: Hgb 11.2 g/dL")
+        if "Mock answer" not in str(output):
+            raise RuntimeError(str(output)[:80])
+        return time.perf_counter() - start
+
+    latencies, failures = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        futures = [pool.submit(call, i) for i in range(REQUESTS)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                failures += 1
+    return {"failures": failures, **summarize(latencies, time.perf_counter() - start)}
+
+
+def main() -> None:
+    # swarms logs every call (and per-agent warnings) to stdout.
+    logger.remove()
+    print(
+        f"{REQUESTS} calls, concurrency {CONCURRENCY}, backend latency {LATENCY * 1e3:.0f}ms"
+    )
+    print(
+        f"{'scenario':<12}{'mode':<9}{'ok':>6}{'failed':>8}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'rps':>8}{'conns':>7}{'429s':>6}{'retries':>9}"
+    )
+    for scenario, rps in (("unlimited", None), (f"{RPS} rps", RPS)):
+        mock = MockLLM(latency=LATENCY, rps=rps)
+        with serve_mock_llm(mock, PORT) as url:
+            os.environ["ANTHROPIC_API_BASE"] = url
+            for mode in MODES:
+                agents = build_agents()
+                client = None
+                if mode == "shared":
+                    client = SharedLLMClient(http2=False, max_retries=5)
+                    for agent in agents:
+                        client.install(agent)
+                time.sleep(1.0)  # start in a fresh rate-limit window
+                mock.reset_stats()
+                result = drive(agents)
+                retries = client.get_stats()["retries"] if client else "-"
+                print(
+                    f"{scenario:<12}{mode:<9}{REQUESTS - result['failures']:>6}"
+                    f"{result['failures']:>8}{result['p50_ms']:>9.1f}"
+                    f"{result['p99_ms']:>9.1f}{result['rps']:>8.1f}"
+                    f"{mock.connections:>7}{mock.stats['rate_limited']:>6}{retries:>9}"
+                )
+                if client is not None:
+                    client.close()
+
+
+if __name__ == "__main__":
+    main()
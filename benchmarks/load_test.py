@@ -0,0 +1,424 @@
+"""End-to-end load test of ``app.py`` against a local fake model backend.
+
+Starts ``benchmarks.mock_llm`` with a configurable latency, token rate
+and error rate. It then starts ``app.py`` as a subprocess, pointed at the
+mock through ``ANTHROPIC_API_BASE``, and drives the six agent tools over
+real ``streamablehttp_client`` sessions with two load profiles:
+
+- ``closed``: ``BENCH_USERS`` sessions, each sending its next call as soon
+  as the previous one returns (throughput at a fixed concurrency)
+- ``open``: calls arrive at ``BENCH_RPS`` per second (Poisson), however
+  fast the server answers, spread over ``BENCH_SESSIONS`` sessions.
+  Latency counts from the scheduled arrival, so queueing shows in the tail.
+
+Every task text is unique, so neither the response cache nor request
+coalescing answers a call. For each profile the run reports:
+
+- throughput and error rate
+- p50/p95/p99 latency, per tool and overall
+- server CPU and peak RSS, summed over the server process and its
+  worker processes
+- how many requests reached the mock backend
+
+Results go to ``BENCH_OUTPUT`` as JSON, together with the git commit and
+the configuration. Set ``BENCH_BASELINE`` to an earlier results file to
+print the change against it. ``BENCH_SERVER_URL`` drives a server that is
+already running instead; give ``BENCH_SERVER_PID`` as well to sample its
+CPU and memory. Everything runs offline.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.load_test
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import AsyncExitStack, contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import psutil
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from benchmarks.mock_llm import MockLLM, serve_mock_llm
+from benchmarks.stub_llm import percentile
+from benchmarks.stub_server import MEDICAL_AGENT_NAMES
+
+PROFILES = os.environ.get("BENCH_PROFILES", "closed,open").split(",")
+DURATION = float(os.environ.get("BENCH_DURATION", "30"))
+USERS = int(os.environ.get("BENCH_USERS", "32"))
+RPS = float(os.environ.get("BENCH_RPS", "40"))
+SESSIONS = int(os.environ.get("BENCH_SESSIONS", "8"))
+DRAIN_TIMEOUT = float(os.environ.get("BENCH_DRAIN_TIMEOUT", "60"))
+LLM_LATENCY = float(os.environ.get("BENCH_LLM_LATENCY", "0.3"))
+TOKEN_RATE = float(os.environ.get("BENCH_TOKEN_RATE", "200"))
+ERROR_RATE = float(os.environ.get("BENCH_ERROR_RATE", "0"))
+LLM_PORT = int(os.environ.get("BENCH_LLM_PORT", "8090"))
+SERVER_PORT = int(os.environ.get("BENCH_SERVER_PORT", "8000"))
+SERVER_URL = os.environ.get("BENCH_SERVER_URL")
+SERVER_PID = int(os.environ.get("BENCH_SERVER_PID", "0")) or None
+STARTUP_TIMEOUT = float(os.environ.get("BENCH_STARTUP_TIMEOUT", "120"))
+OUTPUT = os.environ.get("BENCH_OUTPUT", "load_test_results.json")
+BASELINE = os.environ.get("BENCH_BASELINE")
+SEED = int(os.environ.get("BENCH_SEED", "11"))
+
+TASKS = {
+    "Blood-Data-Analysis-Agent": "Panel #{n}: Hgb 11.2 g/dL, MCV 72 fL, ferritin 9 ng/mL, platelets 410 x10^9/L.",
+    "ICD10-Symptom-Mapper-Agent": "Case #{n}: 54F, 3 weeks of exertional chest tightness relieved by rest.",
+    "Treatment-Solutions-Agent": "Case #{n}: new type 2 diabetes, A1c 8.1%, eGFR 72, BMI 33, no ASCVD.",
+    "Drug-Interaction-Agent": "Regimen #{n}: warfarin, amiodarone, aspirin, simvastatin 40 mg.",
+    "Imaging-Triage-Agent": "Report #{n}: CT head, 6 mm right frontal subdural hematoma, no midline shift.",
+    "Clinical-Note-Summarizer-Agent": (
+        "Note #{n}: 68M, AF on warfarin, started amiodarone last week; INR 4.1. "
+        "Dyspnea on exertion, bilateral ankle edema, eGFR 48."
+    ),
+}
+TOOLS = list(MEDICAL_AGENT_NAMES)
+
+# Task numbers are never reused, across profiles too.
+_task_numbers = itertools.count()
+
+
+class Recorder:
+    """Latencies of successful calls and error counts, per tool."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {tool: [] for tool in TOOLS}
+        self.errors: Dict[str, int] = {tool: 0 for tool in TOOLS}
+        self.error_samples: List[str] = []
+
+    async def call(self, session: ClientSession, tool: str, start: Optional[float] = None) -> None:
+        start = time.perf_counter() if start is None else start
+        task = TASKS[tool].format(n=next(_task_numbers))
+        try:
+            result = await session.call_tool(tool, arguments={"task": task})
+            content = result.structuredContent or {}
+            payload = content.get("result", content)
+            error = None if not result.isError and payload.get("success") else payload.get("error")
+            error = error or ("tool error" if result.isError else None)
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        if error is None:
+            self.latencies[tool].append(time.perf_counter() - start)
+        else:
+            self.fail(tool, str(error))
+
+    def fail(self, tool: str, error: str) -> None:
+        self.errors[tool] += 1
+        if len(self.error_samples) < 5:
+            self.error_samples.append(f"{tool}: {error[:200]}")
+
+    def summary(self, elapsed: float) -> Dict[str, Any]:
+        def stats(latencies: List[float], errors: int) -> Dict[str, Any]:
+            requests = len(latencies) + errors
+            return {
+                "requests": requests,
+                "errors": errors,
+                "error_rate": round(errors / requests, 4) if requests else 0.0,
+                "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+                "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+            }
+
+        everything = [latency for tool in TOOLS for latency in self.latencies[tool]]
+        overall = stats(everything, sum(self.errors.values()))
+        return {
+            **overall,
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(everything) / elapsed, 1) if elapsed else 0.0,
+            "per_tool": {tool: stats(self.latencies[tool], self.errors[tool]) for tool in TOOLS},
+            "error_samples": self.error_samples,
+        }
+
+
+class ServerMonitor:
+    """CPU time and RSS of the server process and its children (workers)."""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.process = psutil.Process(pid)
+        self.interval = interval
+        self._rss: List[int] = []
+        self._cpu_start = 0.0
+        self._wall_start = 0.0
+        self._sampler: Optional[asyncio.Task] = None
+
+    def _processes(self) -> List[psutil.Process]:
+        try:
+            return [self.process, *self.process.children(recursive=True)]
+        except psutil.NoSuchProcess:
+            return []
+
+    def _sample(self) -> Tuple[float, int]:
+        cpu, rss = 0.0, 0
+        for process in self._processes():
+            try:
+                times = process.cpu_times()
+                cpu += times.user + times.system
+                rss += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+        return cpu, rss
+
+    async def _run(self) -> None:
+        while True:
+            self._rss.append(self._sample()[1])
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        self._cpu_start, rss = self._sample()
+        self._wall_start = time.perf_counter()
+        self._rss = [rss]
+        self._sampler = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> Dict[str, Any]:
+        self._sampler.cancel()
+        cpu, rss = self._sample()
+        self._rss.append(rss)
+        wall = time.perf_counter() - self._wall_start
+        return {
+            "processes": len(self._processes()),
+            # 100 per fully busy core.
+            "cpu_percent": round(100 * (cpu - self._cpu_start) / wall, 1) if wall else 0.0,
+            "rss_peak_mb": round(max(self._rss) / 2**20, 1),
+            "rss_mean_mb": round(sum(self._rss) / len(self._rss) / 2**20, 1),
+        }
+
+
+async def open_sessions(stack: AsyncExitStack, url: str, count: int) -> List[ClientSession]:
+    sessions = []
+    for _ in range(count):
+        read, write, _ = await stack.enter_async_context(
+            streamablehttp_client(url, timeout=60, sse_read_timeout=600)
+        )
+        session = await stack.enter_async_context(ClientSession(read, write))
+        await session.initialize()
+        sessions.append(session)
+    return sessions
+
+
+async def closed_loop(url: str, recorder: Recorder) -> float:
+    async with AsyncExitStack() as stack:
+        sessions = await open_sessions(stack, url, USERS)
+        start = time.perf_counter()
+        deadline = start + DURATION
+
+        async def user(offset: int, session: ClientSession) -> None:
+            for i in itertools.count(offset):
+                if time.perf_counter() >= deadline:
+                    return
+                await recorder.call(session, TOOLS[i % len(TOOLS)])
+
+        await asyncio.gather(*(user(i, session) for i, session in enumerate(sessions)))
+        return time.perf_counter() - start
+
+
+async def open_loop(url: str, recorder: Recorder) -> float:
+    async with AsyncExitStack() as stack:
+        sessions = await open_sessions(stack, url, SESSIONS)
+        rng = random.Random(SEED)
+        calls: Dict[asyncio.Future, str] = {}
+        start = due = time.perf_counter()
+        for i in itertools.count():
+            if due >= start + DURATION:
+                break
+            delay = due - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tool = TOOLS[i % len(TOOLS)]
+            calls[asyncio.ensure_future(recorder.call(sessions[i % len(sessions)], tool, start=due))] = tool
+            due += rng.expovariate(RPS)
+        _, unfinished = await asyncio.wait(calls, timeout=DRAIN_TIMEOUT)
+        for call in unfinished:
+            call.cancel()
+            recorder.fail(calls[call], f"unfinished after {DRAIN_TIMEOUT:.0f}s drain")
+        return time.perf_counter() - start
+
+
+async def wait_until_ready(url: str, process: Optional[subprocess.Popen], log_path: Optional[str]) -> None:
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    missing: List[str] = TOOLS
+    while True:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"app.py exited with {process.returncode}:\n{log_tail(log_path)}")
+        try:
+            async with streamablehttp_client(url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    names = {tool.name for tool in (await session.list_tools()).tools}
+            missing = [tool for tool in TOOLS if tool not in names]
+            if not missing:
+                return
+        except Exception:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f"Server not ready after {STARTUP_TIMEOUT:.0f}s (missing tools: {missing})")
+        await asyncio.sleep(0.5)
+
+
+def log_tail(path: Optional[str], lines: int = 30) -> str:
+    if not path or not os.path.exists(path):
+        return ""
+    with open(path, errors="replace") as log:
+        return "".join(log.readlines()[-lines:])
+
+
+@contextmanager
+def run_app(llm_url: str, workdir: str) -> Iterator[subprocess.Popen]:
+    """Start ``app.py`` against the mock backend, logging to ``workdir``."""
+    env = {
+        **os.environ,
+        "ANTHROPIC_API_BASE": llm_url,
+        "ANTHROPIC_API_KEY": "mock",
+        "AOP_PORT": str(SERVER_PORT),
+        "AOP_TASK_STORE": os.path.join(workdir, "tasks.db"),
+    }
+    env.pop("RESPONSE_CACHE_PATH", None)
+    with open(os.path.join(workdir, "server.log"), "wb") as log:
+        process = subprocess.Popen(
+            [sys.executable, "app.py"], env=env, stdout=log, stderr=subprocess.STDOUT
+        )
+        try:
+            yield process
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def git_commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+async def run_profiles(url: str, mock: MockLLM, pid: Optional[int]) -> Dict[str, Any]:
+    # Agents are built on first use; keep that out of the measurements.
+    warmup = Recorder()
+    async with AsyncExitStack() as stack:
+        (session,) = await open_sessions(stack, url, 1)
+        for tool in TOOLS:
+            await warmup.call(session, tool)
+    results = {}
+    for profile in PROFILES:
+        recorder = Recorder()
+        monitor = ServerMonitor(pid) if pid else None
+        llm_before = mock.stats["requests"]
+        if monitor is not None:
+            monitor.start()
+        elapsed = await (closed_loop if profile == "closed" else open_loop)(url, recorder)
+        results[profile] = {
+            **({"users": USERS} if profile == "closed" else {"offered_rps": RPS, "sessions": SESSIONS}),
+            **recorder.summary(elapsed),
+            "server": await monitor.stop() if monitor is not None else None,
+            "llm_requests": mock.stats["requests"] - llm_before,
+        }
+        print_result(profile, results[profile])
+    return results
+
+
+def print_result(profile: str, result: Dict[str, Any]) -> None:
+    server = result["server"] or {}
+    print(
+        f"\n{profile}: {result['requests']} calls, {result['throughput_rps']} ok/s, "
+        f"{result['error_rate'] * 100:.1f}% errors, server CPU {server.get('cpu_percent', '-')}%, "
+        f"peak RSS {server.get('rss_peak_mb', '-')} MB, {result['llm_requests']} LLM requests"
+    )
+    print(f"  {'tool':<32}{'calls':>7}{'err':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for tool, stats in [*result["per_tool"].items(), ("all", result)]:
+        print(
+            f"  {tool:<32}{stats['requests']:>7}{stats['errors']:>6}"
+            f"{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}{stats['p99_ms']:>9.1f}"
+        )
+    for sample in result["error_samples"]:
+        print(f"  error: {sample}")
+
+
+def compare(results: Dict[str, Any], config: Dict[str, Any], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nchange against {baseline_path} ({baseline.get('commit')}):")
+    differing = [key for key, value in config.items() if baseline.get("config", {}).get(key) != value]
+    if differing:
+        print(f"  note: configuration differs ({', '.join(differing)}), numbers are not comparable")
+    for profile, result in results.items():
+        before = baseline.get("results", {}).get(profile)
+        if before is None:
+            continue
+        changes = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms", "error_rate"):
+            if before.get(key):
+                changes.append(f"{key} {(result[key] / before[key] - 1) * 100:+.1f}%")
+        if result["server"] and before.get("server"):
+            for key in ("cpu_percent", "rss_peak_mb"):
+                if before["server"].get(key):
+                    changes.append(f"{key} {(result['server'][key] / before['server'][key] - 1) * 100:+.1f}%")
+        print(f"  {profile}: " + ", ".join(changes))
+
+
+async def main() -> None:
+    mock = MockLLM(
+        latency=LLM_LATENCY,
+        error_rate=ERROR_RATE,
+        token_rate=TOKEN_RATE or None,
+        words=200,
+    )
+    config = {
+        "profiles": PROFILES,
+        "duration_s": DURATION,
+        "users": USERS,
+        "offered_rps": RPS,
+        "sessions": SESSIONS,
+        "llm_latency_s": LLM_LATENCY,
+        "token_rate": TOKEN_RATE,
+        "error_rate": ERROR_RATE,
+        "server": SERVER_URL or "app.py",
+    }
+    print(
+        f"mock LLM: {LLM_LATENCY * 1e3:.0f}ms to first token, {TOKEN_RATE or 'instant'} tokens/s, "
+        f"{ERROR_RATE * 100:.1f}% errors; {DURATION:.0f}s per profile"
+    )
+    with serve_mock_llm(mock, LLM_PORT) as llm_url, tempfile.TemporaryDirectory() as workdir:
+        if SERVER_URL:
+            await wait_until_ready(SERVER_URL, None, None)
+            results = await run_profiles(SERVER_URL, mock, SERVER_PID)
+        else:
+            with run_app(llm_url, workdir) as process:
+                url = f"http://127.0.0.1:{SERVER_PORT}/mcp"
+                log_path = os.path.join(workdir, "server.log")
+                await wait_until_ready(url, process, log_path)
+                results = await run_profiles(url, mock, process.pid)
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "config": config,
+        "results": results,
+    }
+    with open(OUTPUT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nresults written to {OUTPUT}")
+    if BASELINE:
+        compare(results, config, BASELINE)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""Per-call cost of the metrics instrumentation.
+
+Drives ``AgentDispatcher`` directly with a zero-latency stub agent so the
+instrumentation is the only thing that differs between runs:
+
+- ``off``: ``metrics=None`` (``metrics_enabled=False``)
+- ``on``: dispatcher stages, counters and gauges
+- ``on+agent``: as ``on`` plus the prompt build / LLM call / parse split
+  from ``Metrics.instrument_agent``
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.metrics_overhead
+"""
+
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.metrics import Metrics
+
+from benchmarks.stub_llm import AsyncStubAgent, StubAgent
+
+CALLS = int(os.environ.get("BENCH_CALLS", "20000"))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "3"))
+TOOL = "Blood-Data-Analysis-Agent"
+
+
+def build(agent, metrics) -> AgentDispatcher:
+    dispatcher = AgentDispatcher(
+        AsyncAgentExecutor(retry_delay=0, metrics=metrics), metrics=metrics
+    )
+    dispatcher.agents[TOOL] = agent
+    dispatcher.tool_configs[TOOL] = SimpleNamespace(timeout=30, max_retries=0)
+    return dispatcher
+
+
+async def per_call_us(dispatcher: AgentDispatcher, calls: int) -> float:
+    start = time.perf_counter()
+    for i in range(calls):
+        await dispatcher.dispatch(TOOL, f"CBC panel #{i}")
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def main() -> None:
+    print(f"{CALLS} sequential calls per round, best of {ROUNDS}")
+    print(f"{'agent':<14}{'mode':<10}{'us/call':>10}{'overhead':>10}")
+    for agent_kind, factory, calls in (
+        ("async stub", lambda: AsyncStubAgent(agent_name=TOOL, latency=0), CALLS),
+        # Thread-pool hops dominate here, so fewer calls are enough.
+        ("thread stub", lambda: StubAgent(agent_name=TOOL, latency=0), CALLS // 4),
+    ):
+        baseline = None
+        for mode in ("off", "on", "on+agent"):
+            metrics = None if mode == "off" else Metrics()
+            agent = factory()
+            if mode == "on+agent":
+                metrics.instrument_agent(TOOL, agent)
+            dispatcher = build(agent, metrics)
+            await per_call_us(dispatcher, 200)  # warm up
+            best = min([await per_call_us(dispatcher, calls) for _ in range(ROUNDS)])
+            dispatcher.executor.shutdown()
+            baseline = best if baseline is None else baseline
+            print(f"{agent_kind:<14}{mode:<10}{best:>10.2f}{best - baseline:>+10.2f}")
+
+    metrics = Metrics()
+    dispatcher = build(AsyncStubAgent(agent_name=TOOL, latency=0), metrics)
+    await per_call_us(dispatcher, 100)
+    start = time.perf_counter()
+    body = metrics.render()
+    print(
+        f"/metrics render: {(time.perf_counter() - start) * 1e3:.2f}ms, "
+        f"{len(body.splitlines())} lines"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
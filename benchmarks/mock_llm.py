@@ -0,0 +1,350 @@
+"""Local mock of the Anthropic Messages API for offline LLM transport tests.
+
+Serves ``POST /v1/messages`` (plain JSON or SSE when ``"stream": true``)
+with a fixed latency, an optional output token rate, a fixed-window
+request rate limit that answers 429
+with ``retry-after`` and ``anthropic-ratelimit-*`` headers, and optional
+random 529 "overloaded" errors. Tail faults can be injected too: a share
+of straggler responses that take ``slow_latency`` longer, and a share of
+requests that hang until the client gives up. All fault settings are
+plain attributes, so a benchmark can change them mid-run to simulate a
+degraded provider. It counts requests, rate-limited responses and
+distinct client connections, so connection reuse is visible from the
+server side.
+
+It also simulates Anthropic prompt caching: the request prefix up to the
+last ``cache_control`` breakpoint is cached for ``cache_ttl`` seconds once
+it reaches ``cache_min_tokens``. Usage reports ``cache_creation_input_tokens``
+and ``cache_read_input_tokens`` like the real API, uncached input tokens add
+``prefill_per_1k`` seconds of latency per thousand (cached ones a tenth of
+that), and ``stats["input_cost"]`` prices input at 1.0 per uncached token,
+1.25 per cache-write token and 0.1 per cache-read token.
+
+Point the real agents at it with ``ANTHROPIC_API_BASE``:
+
+    python -m benchmarks.mock_llm
+    ANTHROPIC_API_BASE=http://127.0.0.1:8090 ANTHROPIC_API_KEY=mock python app.py
+
+Configure via env: ``MOCK_LLM_PORT``, ``MOCK_LLM_LATENCY``,
+``MOCK_LLM_RPS`` (0 for no limit), ``MOCK_LLM_ERROR_RATE``,
+``MOCK_LLM_PREFILL_PER_1K``, ``MOCK_LLM_TOKEN_RATE`` (0 for instant output),
+``MOCK_LLM_SLOW_RATE``, ``MOCK_LLM_SLOW_LATENCY``, ``MOCK_LLM_HANG_RATE``.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+
+class MockLLM:
+    """Anthropic-compatible mock backend.
+
+    Args:
+        latency: Seconds before each response (time to first token).
+        rps: Requests accepted per one-second window (None for no limit).
+        error_rate: Probability of a 529 overloaded response.
+        words: Words in each completion.
+        prefill_per_1k: Extra seconds per thousand uncached input tokens.
+        cache_min_tokens: Shortest prefix the simulated cache accepts.
+        cache_ttl: Seconds a cached prefix lives after its last use.
+        token_rate: Output tokens generated per second (None for instant
+            output); streamed responses are paced at this rate.
+        slow_rate: Probability of a straggler response.
+        slow_latency: Extra seconds a straggler takes.
+        hang_rate: Probability a request is never answered (the handler
+            waits until the client disconnects).
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        rps: Optional[int] = None,
+        error_rate: float = 0.0,
+        words: int = 40,
+        prefill_per_1k: float = 0.0,
+        cache_min_tokens: int = 1024,
+        cache_ttl: float = 300,
+        token_rate: Optional[float] = None,
+        slow_rate: float = 0.0,
+        slow_latency: float = 2.0,
+        hang_rate: float = 0.0,
+    ):
+        self.latency = latency
+        self.rps = rps
+        self.error_rate = error_rate
+        self.words = words
+        self.prefill_per_1k = prefill_per_1k
+        self.cache_min_tokens = cache_min_tokens
+        self.cache_ttl = cache_ttl
+        self.token_rate = token_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.hang_rate = hang_rate
+        self._window = 0
+        self._window_count = 0
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._prefixes: Dict[str, float] = {}
+        self.stats = {
+            "requests": 0,
+            "ok": 0,
+            "rate_limited": 0,
+            "overloaded": 0,
+            "slow": 0,
+            "hung": 0,
+            "input_tokens": 0,
+            "cache_write_tokens": 0,
+            "cache_read_tokens": 0,
+            "input_cost": 0.0,
+        }
+        self.app = Starlette(routes=[Route("/v1/messages", self.messages, methods=["POST"])])
+
+    @property
+    def connections(self) -> int:
+        """Distinct client connections seen so far."""
+        return len(self._connections)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._connections.clear()
+            for key in self.stats:
+                self.stats[key] = 0
+
+    def _admit(self) -> Dict[str, str]:
+        """Count the request in the current window; return rate-limit headers."""
+        now = time.time()
+        window = int(now)
+        with self._lock:
+            self.stats["requests"] += 1
+            if window != self._window:
+                self._window, self._window_count = window, 0
+            self._window_count += 1
+            count = self._window_count
+        if self.rps is None:
+            return {}
+        reset = datetime.fromtimestamp(window + 1, timezone.utc)
+        headers = {
+            "anthropic-ratelimit-requests-limit": str(self.rps),
+            "anthropic-ratelimit-requests-remaining": str(max(self.rps - count, 0)),
+            "anthropic-ratelimit-requests-reset": reset.isoformat().replace("+00:00", "Z"),
+        }
+        if count > self.rps:
+            headers["retry-after"] = f"{window + 1 - now:.3f}"
+        return headers
+
+    @staticmethod
+    def _blocks(body: Dict[str, Any]) -> List[Tuple[str, bool]]:
+        """The prompt as ``(text, has_breakpoint)`` blocks in cache order."""
+        blocks = []
+        contents = [body.get("system") or ""]
+        contents += [message.get("content") or "" for message in body.get("messages", [])]
+        for content in contents:
+            if isinstance(content, str):
+                blocks.append((content, False))
+                continue
+            for block in content:
+                blocks.append(
+                    (json.dumps(block.get("text", block), sort_keys=True), "cache_control" in block)
+                )
+        return blocks
+
+    def _usage(self, body: Dict[str, Any]) -> Dict[str, int]:
+        """Input token usage with the cacheable prefix read or written."""
+        blocks = self._blocks(body)
+        total = sum(len(text) for text, _ in blocks) // 4
+        breakpoints = [i for i, (_, marked) in enumerate(blocks) if marked]
+        written = read = 0
+        if breakpoints:
+            prefix = "\x00".join(text for text, _ in blocks[: breakpoints[-1] + 1])
+            tokens = len(prefix) // 4
+            if tokens >= self.cache_min_tokens:
+                key = hashlib.sha256(prefix.encode()).hexdigest()
+                now = time.monotonic()
+                with self._lock:
+                    hit = self._prefixes.get(key, 0) > now
+                    self._prefixes[key] = now + self.cache_ttl
+                if hit:
+                    read = tokens
+                else:
+                    written = tokens
+        uncached = max(total - written - read, 0)
+        with self._lock:
+            self.stats["input_tokens"] += uncached
+            self.stats["cache_write_tokens"] += written
+            self.stats["cache_read_tokens"] += read
+            self.stats["input_cost"] += uncached + 1.25 * written + 0.1 * read
+        return {
+            "input_tokens": uncached,
+            "cache_creation_input_tokens": written,
+            "cache_read_input_tokens": read,
+        }
+
+    def _text(self, body: Dict[str, Any]) -> str:
+        content = body.get("messages", [{}])[-1].get("content", "")
+        if isinstance(content, list):
+            content = " ".join(block.get("text", "") for block in content)
+        prompt = str(content)[:40]
+        filler = " ".join(["lorem"] * self.words)
+        return f"SECTION: SUMMARY\nMock answer for {prompt!r}. {filler}"
+
+    async def messages(self, request: Request) -> Response:
+        client = request.scope.get("client")
+        if client:
+            self._connections.add(tuple(client))
+        try:
+            body = await request.json()
+        except ClientDisconnect:
+            # A hedged or timed-out call cancelled mid-upload.
+            return Response(status_code=499)
+        headers = self._admit()
+        if "retry-after" in headers:
+            self.stats["rate_limited"] += 1
+            return JSONResponse(
+                {"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limited"}},
+                status_code=429,
+                headers=headers,
+            )
+        if self.error_rate and random.random() < self.error_rate:
+            self.stats["overloaded"] += 1
+            return JSONResponse(
+                {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}},
+                status_code=529,
+                headers=headers,
+            )
+        if self.hang_rate and random.random() < self.hang_rate:
+            self.stats["hung"] += 1
+            while not await request.is_disconnected():
+                await asyncio.sleep(0.1)
+            return Response(status_code=499)
+        if self.slow_rate and random.random() < self.slow_rate:
+            self.stats["slow"] += 1
+            await asyncio.sleep(self.slow_latency)
+        usage = self._usage(body)
+        prefill_tokens = usage["input_tokens"] + usage["cache_creation_input_tokens"]
+        prefill_tokens += usage["cache_read_input_tokens"] // 10
+        await asyncio.sleep(self.latency + self.prefill_per_1k * prefill_tokens / 1000)
+        self.stats["ok"] += 1
+        text = self._text(body)
+        model = body.get("model", "claude-haiku-4-5")
+        usage["output_tokens"] = len(text) // 4
+        if self.token_rate and not body.get("stream"):
+            # Generation time; streamed responses spend it between deltas.
+            await asyncio.sleep(len(text.split(" ")) / self.token_rate)
+        if body.get("stream"):
+            return StreamingResponse(
+                self._events(text, model, usage),
+                media_type="text/event-stream",
+                headers=headers,
+            )
+        return JSONResponse(
+            {
+                "id": f"msg_mock_{self.stats['ok']}",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "stop_sequence": None,
+                "usage": usage,
+            },
+            headers=headers,
+        )
+
+    async def _events(
+        self, text: str, model: str, usage: Dict[str, int]
+    ) -> AsyncIterator[str]:
+        def event(name: str, data: Dict[str, Any]) -> str:
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+        yield event(
+            "message_start",
+            {
+                "type": "message_start",
+                "message": {
+                    "id": f"msg_mock_{self.stats['ok']}",
+                    "type": "message",
+                    "role": "assistant",
+                    "model": model,
+                    "content": [],
+                    "stop_reason": None,
+                    "usage": {**usage, "output_tokens": 0},
+                },
+            },
+        )
+        yield event(
+            "content_block_start",
+            {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}},
+        )
+        for word in text.split(" "):
+            if self.token_rate:
+                await asyncio.sleep(1 / self.token_rate)
+            yield event(
+                "content_block_delta",
+                {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": word + " "}},
+            )
+        yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield event(
+            "message_delta",
+            {
+                "type": "message_delta",
+                "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                "usage": {"output_tokens": usage["output_tokens"]},
+            },
+        )
+        yield event("message_stop", {"type": "message_stop"})
+
+
+@contextmanager
+def serve_mock_llm(mock: MockLLM, port: int = 8090) -> Iterator[str]:
+    """Serve ``mock`` on a background thread.
+
+    Yields:
+        The base URL to use as ``ANTHROPIC_API_BASE``.
+    """
+    server = uvicorn.Server(
+        uvicorn.Config(mock.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Mock LLM failed to start on port {port}")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    rps = int(os.environ.get("MOCK_LLM_RPS", "0"))
+    mock = MockLLM(
+        latency=float(os.environ.get("MOCK_LLM_LATENCY", "0.05")),
+        rps=rps or None,
+        error_rate=float(os.environ.get("MOCK_LLM_ERROR_RATE", "0")),
+        prefill_per_1k=float(os.environ.get("MOCK_LLM_PREFILL_PER_1K", "0")),
+        token_rate=float(os.environ.get("MOCK_LLM_TOKEN_RATE", "0")) or None,
+        slow_rate=float(os.environ.get("MOCK_LLM_SLOW_RATE", "0")),
+        slow_latency=float(os.environ.get("MOCK_LLM_SLOW_LATENCY", "2")),
+        hang_rate=float(os.environ.get("MOCK_LLM_HANG_RATE", "0")),
+    )
+    uvicorn.run(
+        mock.app,
+        host="127.0.0.1",
+        port=int(os.environ.get("MOCK_LLM_PORT", "8090")),
+        log_level="warning",
+    )
@@ -0,0 +1,112 @@
+"""Case latency: one ``run_pipeline`` call versus sequential tool calls.
+
+Starts the stub MCP server in-process (stub agents with a fixed latency)
+and runs the ``case_workup`` graph (note summary -> ICD-10 mapping and
+drug interactions in parallel -> treatment options) per case two ways
+over streamable-http:
+
+- ``sequential``: one ``call_tool`` round trip per agent, the client
+  feeding each output into the next task, as clients do today
+- ``pipeline``: a single ``run_pipeline`` call
+
+Prints per-case latency percentiles and the per-node timing of one
+pipeline run.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.pipeline
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Dict, List
+
+from loguru import logger
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+from medical_aop.pipeline import (
+    CASE_WORKUP_PIPELINE,
+    build_task,
+    parse_sections,
+    validate_pipeline,
+)
+
+from benchmarks.stub_llm import percentile
+from benchmarks.stub_server import build_stub_server, serve_in_background
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.2"))
+CASES = int(os.environ.get("BENCH_CASES", "10"))
+PORT = int(os.environ.get("BENCH_PORT", "8766"))
+CASE = (
+    "68M, AF on warfarin, new amiodarone; INR 4.1. Note: dyspnea on exertion, "
+    "bilateral ankle edema, eGFR 48."
+)
+
+
+def payload(result: Any) -> Dict[str, Any]:
+    content = result.structuredContent or {}
+    return content.get("result", content)
+
+
+async def sequential(session: ClientSession, case: str) -> None:
+    by_id = {node["id"]: node for node in CASE_WORKUP_PIPELINE}
+    results: Dict[str, Dict[str, Any]] = {}
+    for node_id in validate_pipeline(CASE_WORKUP_PIPELINE):
+        node = by_id[node_id]
+        task = build_task(node, case, by_id, results)
+        response = payload(await session.call_tool(node["agent"], arguments={"task": task}))
+        results[node_id] = {**response, "sections": parse_sections(response.get("result", ""))}
+
+
+async def pipelined(session: ClientSession, case: str) -> Dict[str, Any]:
+    result = await session.call_tool(
+        "run_pipeline", arguments={"case": case, "pipeline": "case_workup"}
+    )
+    response = payload(result)
+    if not response.get("success"):
+        raise RuntimeError(response.get("error") or response)
+    return response
+
+
+async def main(url: str) -> None:
+    print(
+        f"{CASES} cases, {len(CASE_WORKUP_PIPELINE)} agents per case, "
+        f"{LATENCY * 1e3:.0f}ms per agent call"
+    )
+    print(f"{'mode':<12}{'p50 ms':>9}{'p99 ms':>9}")
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            last = None
+            for mode in ("sequential", "pipeline"):
+                latencies: List[float] = []
+                for i in range(CASES):
+                    start = time.perf_counter()
+                    if mode == "sequential":
+                        await sequential(session, f"Case #{i}: {CASE}")
+                    else:
+                        last = await pipelined(session, f"Case #{i}: {CASE}")
+                    latencies.append(time.perf_counter() - start)
+                print(
+                    f"{mode:<12}{percentile(latencies, 50) * 1e3:>9.1f}"
+                    f"{percentile(latencies, 99) * 1e3:>9.1f}"
+                )
+    print(
+        f"\nlast pipeline run: {last['duration'] * 1e3:.0f}ms total, "
+        f"sum of calls {last['sum_of_calls'] * 1e3:.0f}ms, "
+        f"critical path {' -> '.join(last['critical_path'])}"
+    )
+    for node_id, node in last["results"].items():
+        print(
+            f"  {node_id:<14}{node['agent']:<34}start {node['started'] * 1e3:>6.0f}ms"
+            f"  took {node['duration'] * 1e3:>6.0f}ms"
+        )
+
+
+if __name__ == "__main__":
+    # The executor logs every agent call.
+    logger.remove()
+    with serve_in_background(build_stub_server(latency=LATENCY), PORT) as url:
+        asyncio.run(main(url))
@@ -0,0 +1,127 @@
+"""Prompt-prefix caching versus stock agent calls, end to end.
+
+Runs real swarms agents (the six from ``medical_agents.py``) against the
+local mock Anthropic API in ``benchmarks.mock_llm``, which simulates the
+provider's prefix cache: cache writes, cheap cache reads and prefill
+latency proportional to the uncached input tokens. Two modes:
+
+- ``stock``: agents as built, each call goes through ``Agent.run``
+- ``prefix``: agents set up by ``PromptCache`` (cache-marked system prompt,
+  prebuilt prefix, only the task appended)
+
+The shipped system prompts are a few hundred tokens, below the providers'
+minimum cacheable length, so each one is padded with ``BENCH_PREFIX_TOKENS``
+tokens of reference text (a formulary or guideline excerpt in practice).
+Reports latency, input tokens per call, the cached share and the simulated
+input cost per call (uncached 1.0, cache write 1.25, cache read 0.1 per
+token).
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.prompt_cache
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+os.environ.setdefault("ANTHROPIC_API_KEY", "mock")
+
+PORT = int(os.environ.get("BENCH_PORT", "8090"))
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "120"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "6"))
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+PREFILL_PER_1K = float(os.environ.get("BENCH_PREFILL_PER_1K", "0.05"))
+PREFIX_TOKENS = int(os.environ.get("BENCH_PREFIX_TOKENS", "2000"))
+MODES = os.environ.get("BENCH_MODES", "stock,prefix").split(",")
+
+from loguru import logger  # noqa: E402
+from swarms import Agent  # noqa: E402  (slow import, after the env is set)
+
+from medical_agents import agents as medical_agents  # noqa: E402
+from medical_aop.prompt_cache import PromptCache  # noqa: E402
+
+from benchmarks.mock_llm import MockLLM, serve_mock_llm  # noqa: E402
+from benchmarks.stub_llm import summarize  # noqa: E402
+
+
+def reference_text(tokens: int) -> str:
+    line = "Reference: adult dosing, renal adjustment and monitoring per local formulary.\n"
+    return line * max(tokens * 4 // len(line), 0)
+
+
+def build_agents() -> List[Any]:
+    appendix = reference_text(PREFIX_TOKENS)
+    return [
+        Agent(
+            agent_name=lazy.agent_name,
+            system_prompt=lazy.system_prompt + "\n" + appendix,
+            model_name=f"anthropic/{lazy.model_name.split('/')[-1]}",
+            max_loops=1,
+            output_type="final",
+            print_on=False,
+            retry_attempts=1,
+        )
+        for lazy in medical_agents
+    ]
+
+
+def drive(agents: List[Any]) -> Dict[str, Any]:
+    def call(i: int) -> float:
+        start = time.perf_counter()
+        output = agents[i % len(agents)].run(f"Lab panel #{i}: Hgb 11.2 g/dL")
+        if "Mock answer" not in str(output):
+            raise RuntimeError(str(output)[:80])
+        return time.perf_counter() - start
+
+    latencies, failures = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CONCURRENCY) as pool:
+        futures = [pool.submit(call, i) for i in range(REQUESTS)]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                failures += 1
+    return {"failures": failures, **summarize(latencies, time.perf_counter() - start)}
+
+
+def main() -> None:
+    # swarms logs every call (and per-agent warnings) to stdout.
+    logger.remove()
+    print(
+        f"{REQUESTS} calls over {len(medical_agents)} agents, concurrency {CONCURRENCY}, "
+        f"backend {LATENCY * 1e3:.0f}ms + {PREFILL_PER_1K * 1e3:.0f}ms per 1k uncached tokens, "
+        f"system prompts padded by {PREFIX_TOKENS} tokens"
+    )
+    print(
+        f"{'mode':<8}{'failed':>7}{'p50 ms':>9}{'p99 ms':>9}{'in tok/call':>13}"
+        f"{'cached':>8}{'cost/call':>11}"
+    )
+    for mode in MODES:
+        # A fresh backend per mode, so neither starts with a warm cache.
+        mock = MockLLM(latency=LATENCY, prefill_per_1k=PREFILL_PER_1K)
+        with serve_mock_llm(mock, PORT) as url:
+            os.environ["ANTHROPIC_API_BASE"] = url
+            agents = build_agents()
+            if mode == "prefix":
+                cache = PromptCache()
+                for agent in agents:
+                    cache.install(agent.agent_name, agent)
+            result = drive(agents)
+            stats = mock.stats
+            total = (
+                stats["input_tokens"] + stats["cache_write_tokens"] + stats["cache_read_tokens"]
+            )
+            calls = max(stats["ok"], 1)
+            print(
+                f"{mode:<8}{result['failures']:>7}{result['p50_ms']:>9.1f}"
+                f"{result['p99_ms']:>9.1f}{total / calls:>13.0f}"
+                f"{stats['cache_read_tokens'] / max(total, 1):>8.0%}"
+                f"{stats['input_cost'] / calls:>11.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Tail latency and overload behaviour with and without ``Resilience``.
+
+Drives ``AsyncAgentExecutor`` with an async agent that calls the local
+mock Anthropic API (``benchmarks.mock_llm``) at ``BENCH_RPS`` open-loop
+(Poisson) arrivals, under two injected faults:
+
+- ``tail``: ``BENCH_SLOW_RATE`` of responses straggle for
+  ``BENCH_SLOW_LATENCY`` seconds and ``BENCH_HANG_RATE`` never answer
+- ``outage``: every request fails with 529 for ``BENCH_OUTAGE`` seconds
+  in the middle of the run
+
+and three executor setups:
+
+- ``fixed``: today's behaviour, ``BENCH_TIMEOUT`` per attempt and
+  ``BENCH_RETRIES`` retries ``BENCH_RETRY_DELAY`` apart
+- ``adaptive``: ``Resilience`` with adaptive timeouts and the circuit
+  breaker, no hedging
+- ``hedged``: the same plus hedged requests
+
+The first ``BENCH_WARMUP`` seconds are not measured (they seed the
+latency windows). Reports latency quantiles from each call's scheduled
+arrival, the share of successful calls, calls shed by the breaker and
+backend requests per call (retry and hedge amplification).
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.resilience
+"""
+
+import asyncio
+import os
+import random
+from typing import Any, Dict, List, Optional
+
+import httpx
+from loguru import logger
+
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.resilience import Resilience
+
+from benchmarks.mock_llm import MockLLM, serve_mock_llm
+from benchmarks.stub_llm import percentile
+
+PORT = int(os.environ.get("BENCH_PORT", "8091"))
+SCENARIOS = os.environ.get("BENCH_SCENARIOS", "tail,outage").split(",")
+SETUPS = os.environ.get("BENCH_SETUPS", "fixed,adaptive,hedged").split(",")
+RPS = float(os.environ.get("BENCH_RPS", "100"))
+DURATION = float(os.environ.get("BENCH_DURATION", "20"))
+WARMUP = float(os.environ.get("BENCH_WARMUP", "3"))
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+SLOW_RATE = float(os.environ.get("BENCH_SLOW_RATE", "0.02"))
+SLOW_LATENCY = float(os.environ.get("BENCH_SLOW_LATENCY", "2"))
+HANG_RATE = float(os.environ.get("BENCH_HANG_RATE", "0.002"))
+OUTAGE = float(os.environ.get("BENCH_OUTAGE", "5"))
+TIMEOUT = float(os.environ.get("BENCH_TIMEOUT", "30"))
+RETRIES = int(os.environ.get("BENCH_RETRIES", "2"))
+RETRY_DELAY = float(os.environ.get("BENCH_RETRY_DELAY", "1"))
+RESET_TIMEOUT = float(os.environ.get("BENCH_RESET_TIMEOUT", "2"))
+SEED = int(os.environ.get("BENCH_SEED", "7"))
+TOOL = "ICD10-Symptom-Mapper-Agent"
+
+
+class MockBackedAgent:
+    """Minimal agent with a native ``arun`` calling the mock Messages API."""
+
+    agent_name = TOOL
+    model_name = "claude-haiku-4-5"
+
+    def __init__(self, client: httpx.AsyncClient, url: str):
+        self.client = client
+        self.url = f"{url}/v1/messages"
+
+    async def arun(self, task: str, **kwargs: Any) -> str:
+        response = await self.client.post(
+            self.url,
+            json={
+                "model": self.model_name,
+                "max_tokens": 256,
+                "messages": [{"role": "user", "content": task}],
+            },
+        )
+        response.raise_for_status()
+        return response.json()["content"][0]["text"]
+
+
+def build_resilience(setup: str) -> Optional[Resilience]:
+    if setup == "fixed":
+        return None
+    return Resilience(
+        hedging=setup == "hedged",
+        reset_timeout=RESET_TIMEOUT,
+        # Seeded during the warm-up.
+        min_samples=min(50, int(RPS * WARMUP / 2)),
+    )
+
+
+async def run(mock: MockLLM, url: str, scenario: str, setup: str) -> Dict[str, Any]:
+    rng = random.Random(SEED)
+    mock.error_rate = 0.0
+    mock.slow_rate = SLOW_RATE if scenario == "tail" else 0.0
+    mock.slow_latency = SLOW_LATENCY
+    mock.hang_rate = HANG_RATE if scenario == "tail" else 0.0
+    resilience = build_resilience(setup)
+    executor = AsyncAgentExecutor(
+        max_concurrency_per_agent=4096, retry_delay=RETRY_DELAY, resilience=resilience
+    )
+    limits = httpx.Limits(max_connections=4096, max_keepalive_connections=512)
+    async with httpx.AsyncClient(limits=limits, timeout=None) as client:
+        agent = MockBackedAgent(client, url)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        measured_from = start + WARMUP
+        outage = (
+            (start + WARMUP + (DURATION - OUTAGE) / 2, start + WARMUP + (DURATION + OUTAGE) / 2)
+            if scenario == "outage"
+            else None
+        )
+        latencies: List[float] = []
+        failures: List[float] = []
+        requests_before = None
+
+        async def call(i: int, scheduled: float) -> None:
+            response = await executor.execute(
+                TOOL, agent, f"Case {i}: chest pain", TIMEOUT, max_retries=RETRIES
+            )
+            if scheduled < measured_from:
+                return
+            elapsed = loop.time() - scheduled
+            if response["success"]:
+                latencies.append(elapsed)
+            else:
+                failures.append(elapsed)
+
+        calls = []
+        i = 0
+        scheduled = start
+        while scheduled < start + WARMUP + DURATION:
+            scheduled += rng.expovariate(RPS)
+            await asyncio.sleep(max(scheduled - loop.time(), 0))
+            now = loop.time()
+            if scheduled >= measured_from and requests_before is None:
+                requests_before = mock.stats["requests"]
+            if outage is not None:
+                mock.error_rate = 1.0 if outage[0] <= now < outage[1] else 0.0
+            calls.append(asyncio.ensure_future(call(i, scheduled)))
+            i += 1
+        mock.error_rate = 0.0
+        await asyncio.gather(*calls)
+        backend_requests = mock.stats["requests"] - requests_before
+    executor.shutdown()
+    total = len(latencies) + len(failures)
+    shed = sum(
+        stats.get("shed", 0) for stats in (resilience.get_stats()["agents"].values() if resilience else [])
+    )
+    return {
+        "calls": total,
+        "success": len(latencies) / total if total else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies, default=0.0),
+        "fail_p50": percentile(failures, 50) if failures else 0.0,
+        "shed": shed,
+        "amplification": backend_requests / total if total else 0.0,
+    }
+
+
+async def main(mock: MockLLM, url: str) -> None:
+    print(
+        f"{RPS:g} calls/s for {DURATION:g}s (+{WARMUP:g}s warm-up), LLM latency "
+        f"{LATENCY * 1e3:.0f}ms, timeout {TIMEOUT:g}s, {RETRIES} retries {RETRY_DELAY:g}s apart"
+    )
+    for scenario in SCENARIOS:
+        if scenario == "tail":
+            print(
+                f"\ntail: {SLOW_RATE:.1%} stragglers (+{SLOW_LATENCY:g}s), "
+                f"{HANG_RATE:.1%} hung requests"
+            )
+        else:
+            print(f"\noutage: every request fails with 529 for {OUTAGE:g}s")
+        print(
+            f"{'setup':<10}{'ok %':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+            f"{'fail p50 ms':>13}{'shed':>7}{'req/call':>10}"
+        )
+        for setup in SETUPS:
+            r = await run(mock, url, scenario, setup)
+            print(
+                f"{setup:<10}{r['success'] * 100:>7.1f}{r['p50'] * 1e3:>9.0f}"
+                f"{r['p95'] * 1e3:>9.0f}{r['p99'] * 1e3:>9.0f}{r['max'] * 1e3:>9.0f}"
+                f"{r['fail_p50'] * 1e3:>13.0f}{r['shed']:>7}{r['amplification']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    # The executor logs every failed attempt.
+    logger.remove()
+    random.seed(SEED)
+    mock = MockLLM(latency=LATENCY)
+    with serve_mock_llm(mock, port=PORT) as url:
+        asyncio.run(main(mock, url))
@@ -0,0 +1,163 @@
+"""Mixed-tenant load simulation for the fair scheduler.
+
+One tenant floods the server with a nightly bulk batch while two clinics
+send interactive calls and an emergency department sends red-flag
+imaging triage. The same arrival trace is replayed through a plain FIFO
+limit of the same capacity and through ``FairScheduler``; per-class
+latency, rejections and deadline drops are printed for both.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.scheduler_sim
+"""
+
+import asyncio
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.scheduler import FairScheduler
+
+from benchmarks.stub_llm import AsyncStubAgent, summarize
+
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+CAPACITY = int(os.environ.get("BENCH_CAPACITY", "16"))
+BULK_ITEMS = int(os.environ.get("BENCH_BULK_ITEMS", "3000"))
+DURATION = float(os.environ.get("BENCH_DURATION", "5"))
+INTERACTIVE_RPS = float(os.environ.get("BENCH_INTERACTIVE_RPS", "40"))
+RED_FLAG_RPS = float(os.environ.get("BENCH_RED_FLAG_RPS", "5"))
+QUEUE_DEPTH = int(os.environ.get("BENCH_QUEUE_DEPTH", "5000"))
+TIMEOUT = float(os.environ.get("BENCH_TIMEOUT", "2"))
+SEED = int(os.environ.get("BENCH_SEED", "7"))
+
+# (arrival offset, class, tenant, tool, priority)
+Arrival = Tuple[float, str, str, str, Optional[int]]
+
+
+def build_trace() -> List[Arrival]:
+    rng = random.Random(SEED)
+    trace: List[Arrival] = [
+        (0.0, "bulk", "nightly-batch", "ICD10-Symptom-Mapper-Agent", -1)
+        for _ in range(BULK_ITEMS)
+    ]
+
+    def poisson(rate: float, label: str, tenant: str, tool: str, priority) -> None:
+        t = 0.0
+        while rate > 0:
+            t += rng.expovariate(rate)
+            if t >= DURATION:
+                return
+            trace.append((t, label, tenant, tool, priority))
+
+    for tenant in ("clinic-a", "clinic-b"):
+        poisson(INTERACTIVE_RPS / 2, "interactive", tenant, "Blood-Data-Analysis-Agent", None)
+    poisson(RED_FLAG_RPS, "red_flag", "emergency", "Imaging-Triage-Agent", 1)
+    return sorted(trace, key=lambda a: a[0])
+
+
+class FifoExecutor:
+    """Executor behind one FIFO semaphore: the unscheduled baseline."""
+
+    def __init__(self, executor: AsyncAgentExecutor, capacity: int):
+        self.executor = executor
+        self.semaphore = asyncio.Semaphore(capacity)
+
+    async def execute(self, *args, **kwargs):
+        async with self.semaphore:
+            return await self.executor.execute(*args, **kwargs)
+
+
+def build_dispatcher(scheduled: bool) -> AgentDispatcher:
+    executor = AsyncAgentExecutor(
+        max_concurrency_per_agent=CAPACITY, max_threads=CAPACITY, retry_delay=0
+    )
+    if scheduled:
+        dispatcher = AgentDispatcher(
+            executor,
+            scheduler=FairScheduler(
+                max_concurrent=CAPACITY,
+                max_queue_depth=QUEUE_DEPTH,
+                max_tenant_queue_depth=QUEUE_DEPTH // 2,
+            ),
+        )
+    else:
+        dispatcher = AgentDispatcher(FifoExecutor(executor, CAPACITY))
+    for tool in (
+        "ICD10-Symptom-Mapper-Agent",
+        "Blood-Data-Analysis-Agent",
+        "Imaging-Triage-Agent",
+    ):
+        dispatcher.agents[tool] = AsyncStubAgent(agent_name=tool, latency=LATENCY)
+        dispatcher.tool_configs[tool] = SimpleNamespace(timeout=TIMEOUT, max_retries=0)
+    return dispatcher
+
+
+async def replay(dispatcher: AgentDispatcher, trace: List[Arrival]) -> Dict[str, dict]:
+    outcomes: Dict[str, Dict[str, list]] = {}
+    start = time.perf_counter()
+
+    async def one(offset: float, label: str, tenant: str, tool: str, priority) -> None:
+        delay = offset - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        sent = time.perf_counter()
+        response = await dispatcher.dispatch(
+            tool, f"{label} task at {offset:.3f}", tenant=tenant, priority=priority
+        )
+        bucket = outcomes.setdefault(
+            label, {"ok": [], "rejected": 0, "dropped": 0, "timed_out": 0}
+        )
+        error = response["error"] or ""
+        if response["success"]:
+            bucket["ok"].append(time.perf_counter() - sent)
+        elif error.startswith("429"):
+            bucket["rejected"] += 1
+        elif error.startswith("504"):
+            bucket["dropped"] += 1
+        else:
+            bucket["timed_out"] += 1
+
+    await asyncio.gather(*(one(*arrival) for arrival in trace))
+    elapsed = time.perf_counter() - start
+    return {
+        label: {
+            **summarize(bucket["ok"], elapsed),
+            "rejected": bucket["rejected"],
+            "dropped": bucket["dropped"],
+            "timed_out": bucket["timed_out"],
+        }
+        for label, bucket in outcomes.items()
+    }
+
+
+async def main() -> None:
+    trace = build_trace()
+    print(
+        f"capacity={CAPACITY}, stub latency={LATENCY * 1000:.0f}ms, "
+        f"timeout={TIMEOUT}s, {BULK_ITEMS} bulk items at t=0, "
+        f"{INTERACTIVE_RPS} interactive rps + {RED_FLAG_RPS} red-flag rps for {DURATION}s"
+    )
+    print(
+        f"{'mode':<10}{'class':<13}{'ok':>7}{'p50 ms':>10}{'p99 ms':>10}"
+        f"{'429':>7}{'504':>7}{'timeout':>9}"
+    )
+    for mode, scheduled in (("fifo", False), ("fair", True)):
+        dispatcher = build_dispatcher(scheduled)
+        results = await replay(dispatcher, trace)
+        for label in ("red_flag", "interactive", "bulk"):
+            stats = results.get(label)
+            if stats is None:
+                continue
+            print(
+                f"{mode:<10}{label:<13}{stats['requests']:>7}{stats['p50_ms']:>10}"
+                f"{stats['p99_ms']:>10}{stats['rejected']:>7}{stats['dropped']:>7}"
+                f"{stats['timed_out']:>9}"
+            )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Cold-start benchmark: time to listening and time to first successful call.
+
+Launches the server as a subprocess under ``python -X importtime`` once per
+mode (``AOP_LAZY_AGENTS=1`` lazy, ``0`` eager), polls the port until it
+accepts connections, then calls one agent over MCP until it succeeds.
+Prints both timings per mode and the slowest top-level imports.
+
+A first call needs a working model backend (an API key for ``app.py``);
+without one the time to the first (failed) response is reported instead.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.startup
+"""
+
+import asyncio
+import os
+import re
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+COMMAND = os.environ.get("BENCH_CMD", "python app.py")
+HOST = os.environ.get("BENCH_HOST", "127.0.0.1")
+PORT = int(os.environ.get("BENCH_PORT", "8000"))
+TOOL = os.environ.get("BENCH_TOOL", "Blood-Data-Analysis-Agent")
+TASK = os.environ.get("BENCH_TASK", "CBC: Hgb 11.2 g/dL (L), MCV 76 fL (L), Ferritin 9 ng/mL (L)")
+MODES = os.environ.get("BENCH_MODES", "lazy,eager").split(",")
+TIMEOUT = float(os.environ.get("BENCH_TIMEOUT", "120"))
+TOP_IMPORTS = int(os.environ.get("BENCH_TOP_IMPORTS", "10"))
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def command_for(mode: str) -> Tuple[List[str], Dict[str, str]]:
+    args = shlex.split(COMMAND)
+    if args and os.path.basename(args[0]).startswith("python"):
+        args = [sys.executable, "-X", "importtime"] + args[1:]
+    env = dict(os.environ, AOP_LAZY_AGENTS="1" if mode == "lazy" else "0")
+    return args, env
+
+
+def wait_listening(process: subprocess.Popen, deadline: float) -> Optional[float]:
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return None
+        try:
+            socket.create_connection((HOST, PORT), timeout=0.5).close()
+            return time.monotonic()
+        except OSError:
+            time.sleep(0.01)
+    return None
+
+
+async def first_call(deadline: float) -> Tuple[Optional[float], bool, str]:
+    url = f"http://{HOST}:{PORT}/mcp"
+    error = ""
+    while time.monotonic() < deadline:
+        try:
+            async with streamablehttp_client(url) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    result = await session.call_tool(TOOL, arguments={"task": TASK})
+                    payload = result.structuredContent or {}
+                    payload = payload.get("result", payload)
+                    done = time.monotonic()
+                    if payload.get("success"):
+                        return done, True, ""
+                    return done, False, str(payload.get("error") or result.content)
+        except Exception as e:
+            error = str(e)
+            await asyncio.sleep(0.1)
+    return None, False, error or "timed out"
+
+
+def top_imports(stderr_path: str) -> List[Tuple[str, float]]:
+    totals: Dict[str, float] = {}
+    with open(stderr_path, errors="replace") as f:
+        for line in f:
+            match = IMPORT_LINE.match(line)
+            if match and not match.group(3):
+                # Top-level imports only; nested ones are in the cumulative time.
+                totals[match.group(4)] = totals.get(match.group(4), 0) + int(match.group(2))
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)
+    return [(name, micros / 1e6) for name, micros in ranked[:TOP_IMPORTS]]
+
+
+def run_mode(mode: str) -> None:
+    args, env = command_for(mode)
+    with tempfile.NamedTemporaryFile("w+", suffix=".log", delete=False) as stderr:
+        start = time.monotonic()
+        process = subprocess.Popen(
+            args, env=env, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        try:
+            deadline = start + TIMEOUT
+            listening = wait_listening(process, deadline)
+            if listening is None:
+                print(f"{mode:<7}server did not start listening (exit {process.poll()})")
+                return
+            answered, ok, error = asyncio.run(first_call(deadline))
+        finally:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        first = f"{answered - start:.2f}s" if answered else "-"
+        status = "ok" if ok else f"failed: {error[:60]}"
+        print(
+            f"{mode:<7}listening {listening - start:>6.2f}s   "
+            f"first call {first:>7} ({status})"
+        )
+        for name, seconds in top_imports(stderr.name):
+            print(f"         import {name:<40}{seconds:>7.3f}s")
+    os.unlink(stderr.name)
+
+
+def main() -> None:
+    print(f"command: {COMMAND}  (port {PORT}, tool {TOOL})")
+    for mode in MODES:
+        run_mode(mode.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Parse time and memory of structured SECTION output per response.
+
+Builds a corpus of synthetic ICD-10 mapper and drug interaction
+completions (bulleted code candidates with confidences, a markdown
+interaction table, prose sections) at several sizes and parses each one
+four ways:
+
+- ``regex``: what downstream consumers do today, one regex pass per
+  section to cut it out of the text, then per-row regexes for the fields
+- ``sections``: ``medical_aop.pipeline.parse_sections`` (untyped
+  ``{NAME: body}`` split, for reference)
+- ``parser``: ``SectionParser`` over the whole text, typed records
+- ``stream``: ``SectionParser`` fed in ``BENCH_CHUNK``-character pieces,
+  as it is on streamed output
+
+Reports the mean parse time per response, throughput, and the peak
+memory allocated while parsing one response (tracemalloc) relative to
+its size.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.structured_output
+"""
+
+import os
+import random
+import re
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from medical_agents import drug_interaction_system_prompt, icd10_mapping_system_prompt
+from medical_aop.pipeline import parse_sections
+from medical_aop.sections import SectionParser, output_schema, parse_structured
+
+SIZES_KB = [int(n) for n in os.environ.get("BENCH_SIZES_KB", "4,32,256").split(",")]
+RESPONSES = int(os.environ.get("BENCH_RESPONSES", "20"))
+CHUNK = int(os.environ.get("BENCH_CHUNK", "16"))
+MIN_SECONDS = float(os.environ.get("BENCH_MIN_SECONDS", "0.3"))
+SEED = int(os.environ.get("BENCH_SEED", "3"))
+
+ICD_SCHEMA = output_schema(icd10_mapping_system_prompt)
+DDI_SCHEMA = output_schema(drug_interaction_system_prompt)
+WORDS = (
+    "patient reports intermittent exertional symptoms with partial relief at rest "
+    "consider documentation of onset laterality severity and relevant history"
+).split()
+DRUGS = ["warfarin", "amiodarone", "aspirin", "clopidogrel", "simvastatin", "metformin", "lisinopril"]
+
+
+def prose(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def icd_completion(rng: random.Random, size: int) -> str:
+    parts = [f"SECTION: SUMMARY\n{prose(rng, 60)}\n", "SECTION: TOP CODE CANDIDATES\n"]
+    i = 0
+    while sum(map(len, parts)) < size * 0.8:
+        i += 1
+        code = f"{rng.choice('RIJM')}{rng.randint(0, 99):02d}.{rng.randint(0, 99)}"
+        parts.append(
+            f"{i}. {code} {prose(rng, 4).capitalize()} — {prose(rng, 14)} — "
+            f"excludes: {prose(rng, 3)} — confidence {rng.random():.2f}\n"
+        )
+    parts.append(f"SECTION: MISSING DOCUMENTATION NEEDED\n{prose(rng, 40)}\n")
+    parts.append(f"SECTION: ALTERNATIVE CONSIDERATIONS\n{prose(rng, 40)}\n")
+    parts.append("SECTION: SOURCES\n- ICD-10-CM Official Guidelines\n- CDC NCHS\n")
+    return "".join(parts)
+
+
+def ddi_completion(rng: random.Random, size: int) -> str:
+    parts = [
+        f"SECTION: SUMMARY\n{prose(rng, 60)}\n",
+        "SECTION: INTERACTION TABLE\n",
+        "| Agent A | Agent B | Interaction class | Severity | Mechanism | Notes |\n",
+        "|---|---|---|---|---|---|\n",
+    ]
+    while sum(map(len, parts)) < size * 0.8:
+        a, b = rng.sample(DRUGS, 2)
+        parts.append(
+            f"| {a} | {b} | {rng.choice(['PK', 'PD'])} | "
+            f"{rng.choice(['minor', 'moderate', 'major'])} | {prose(rng, 6)} | {prose(rng, 10)} |\n"
+        )
+    for name in ("DUPLICATION/CONTRAINDICATIONS", "MONITORING CONSIDERATIONS", "CONTEXT/UNCERTAINTY"):
+        parts.append(f"SECTION: {name}\n{prose(rng, 40)}\n")
+    parts.append("SECTION: SOURCES\n- Lexicomp\n- FDA labeling\n")
+    return "".join(parts)
+
+
+# Ad hoc consumer parsing: cut each section out with its own regex, then
+# pull fields out of each row.
+_SECTION_RE = {
+    name: re.compile(rf"SECTION:\s*{re.escape(name)}[^\n]*\n(.*?)(?=\nSECTION:|\Z)", re.S)
+    for name in ("SUMMARY", "TOP CODE CANDIDATES", "INTERACTION TABLE", "SOURCES")
+}
+_ROW_RE = re.compile(r"^\s*(?:\d+\.|-)\s*(.+)$", re.M)
+_CODE_RE = re.compile(r"\b([A-Z]\d{2}(?:\.\d{1,4})?)\b")
+_CONF_RE = re.compile(r"confidence\s*:?\s*([0-9.]+)", re.I)
+_TABLE_RE = re.compile(r"^\|(.+)\|$", re.M)
+
+
+def regex_parse(text: str) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name, pattern in _SECTION_RE.items():
+        match = pattern.search(text)
+        if match:
+            out[name] = match.group(1)
+    rows = []
+    for row in _ROW_RE.findall(out.get("TOP CODE CANDIDATES", "")):
+        code = _CODE_RE.search(row)
+        confidence = _CONF_RE.search(row)
+        rows.append(
+            {
+                "code": code.group(1) if code else None,
+                "confidence": float(confidence.group(1)) if confidence else None,
+                "text": row,
+            }
+        )
+    out["candidates"] = rows
+    out["table"] = [
+        [cell.strip() for cell in line.split("|")]
+        for line in _TABLE_RE.findall(out.get("INTERACTION TABLE", ""))
+        if not set(line) <= set("-|: ")
+    ]
+    return out
+
+
+def stream_parse(text: str, schema: List[Dict[str, Any]]) -> Dict[str, Any]:
+    parser = SectionParser(schema)
+    for i in range(0, len(text), CHUNK):
+        parser.feed(text[i : i + CHUNK])
+    return parser.close()
+
+
+def measure(fn: Callable[[str, List[Dict[str, Any]]], Any], corpus: List[Tuple[str, Any]]) -> Tuple[float, float]:
+    """Mean seconds per response and mean peak bytes per response byte."""
+    runs, start = 0, time.perf_counter()
+    while True:
+        for text, schema in corpus:
+            fn(text, schema)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= MIN_SECONDS:
+            break
+    per_response = elapsed / (runs * len(corpus))
+    ratios = []
+    for text, schema in corpus[:5]:
+        tracemalloc.start()
+        fn(text, schema)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        ratios.append(peak / len(text.encode()))
+    return per_response, sum(ratios) / len(ratios)
+
+
+def main() -> None:
+    rng = random.Random(SEED)
+    methods = {
+        "regex": lambda text, schema: regex_parse(text),
+        "sections": lambda text, schema: parse_sections(text),
+        "parser": parse_structured,
+        "stream": stream_parse,
+    }
+    print(f"{RESPONSES} responses per size (half ICD-10 candidates, half interaction tables)")
+    print(f"{'size':>7}  {'method':<9}{'us/resp':>10}{'MB/s':>8}{'peak mem/size':>15}")
+    for size_kb in SIZES_KB:
+        size = size_kb * 1024
+        corpus = [
+            (icd_completion(rng, size), ICD_SCHEMA) if i % 2 == 0 else (ddi_completion(rng, size), DDI_SCHEMA)
+            for i in range(RESPONSES)
+        ]
+        mean_bytes = sum(len(text) for text, _ in corpus) / len(corpus)
+        for name, fn in methods.items():
+            seconds, memory = measure(fn, corpus)
+            print(
+                f"{size_kb:>5}KB  {name:<9}{seconds * 1e6:>10.0f}"
+                f"{mean_bytes / seconds / 1e6:>8.1f}{memory:>14.1f}x"
+            )
+    sample = parse_structured(icd_completion(random.Random(0), 2048), ICD_SCHEMA)
+    print("\nfirst ICD-10 candidate:", sample["sections"]["top_code_candidates"][0])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Callable, List, Optional
+
+DEFAULT_SECTIONS = ["SUMMARY", "DETAILS", "SOURCES"]
+
+
+class StubAgent:
+    """Stand-in for a swarms ``Agent`` whose LLM call has a fixed latency.
+
+    ``latency`` is the time to first token; with ``tokens_per_second`` set,
+    the rest of the output takes ``words / tokens_per_second`` more, and is
+    delivered word by word to ``streaming_callback`` when one is given.
+    ``run`` blocks the calling thread like a synchronous provider client.
+    """
+
+    def __init__(
+        self,
+        agent_name: str = "Stub-Agent",
+        latency: float = 0.05,
+        system_prompt: str = "You are a stub agent.",
+        model_name: str = "stub-model",
+        tokens_per_second: float = 0,
+        sections: Optional[List[str]] = None,
+        words_per_section: int = 5,
+    ):
+        self.agent_name = agent_name
+        self.agent_description = f"Stub agent with {latency}s latency"
+        self.latency = latency
+        self.system_prompt = system_prompt
+        self.model_name = model_name
+        self.tokens_per_second = tokens_per_second
+        self.sections = sections or DEFAULT_SECTIONS
+        self.words_per_section = words_per_section
+
+    def _respond(self, task: str) -> str:
+        filler = " ".join(["lorem"] * self.words_per_section)
+        return "".join(
+            f"SECTION: {name}\n{self.agent_name} handled: {task}. {filler}\n"
+            for name in self.sections
+        )
+
+    def _tokens(self, text: str) -> List[str]:
+        return [word + " " for word in text.split(" ")]
+
+    def run(
+        self,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+    ) -> str:
+        # Same shape as swarms: build the prompt, call the LLM, return.
+        prompt = f"{self.system_prompt}\n\n{task}"
+        return self.call_llm(prompt, streaming_callback=streaming_callback)
+
+    def call_llm(
+        self,
+        task: str,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+    ) -> str:
+        time.sleep(self.latency)
+        response = self._respond(task.removeprefix(f"{self.system_prompt}\n\n"))
+        if self.tokens_per_second:
+            for token in self._tokens(response):
+                time.sleep(1 / self.tokens_per_second)
+                if streaming_callback is not None:
+                    streaming_callback(token)
+        return response
+
+
+class AsyncStubAgent(StubAgent):
+    """Stub agent whose LLM call is awaited through an async client."""
+
+    async def arun(
+        self,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+    ) -> str:
+        await asyncio.sleep(self.latency)
+        response = self._respond(task)
+        if self.tokens_per_second:
+            for token in self._tokens(response):
+                await asyncio.sleep(1 / self.tokens_per_second)
+                if streaming_callback is not None:
+                    streaming_callback(token)
+        return response
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: List[float], elapsed: float) -> dict:
+    """Throughput and latency percentiles (milliseconds) for one run."""
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+    }
+
+
+class CpuBoundStubAgent(StubAgent):
+    """Stub agent that also burns ``cpu_ms`` of GIL-holding CPU per call.
+
+    Models the prompt assembly, output parsing and logging work that swarms
+    does around every model call.
+    """
+
+    def __init__(self, *args, cpu_ms: float = 10, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cpu_ms = cpu_ms
+
+    def run(self, task: str, *args, **kwargs) -> str:
+        deadline = time.thread_time() + self.cpu_ms / 1000
+        digest = task.encode()
+        while time.thread_time() < deadline:
+            digest = hashlib.sha256(digest).digest()
+        return super().run(task, *args, **kwargs)
+
+
+def cpu_bound_agents() -> List[StubAgent]:
+    """Agent factory for worker processes (configured via env)."""
+    return [
+        CpuBoundStubAgent(
+            agent_name="Blood-Data-Analysis-Agent",
+            latency=float(os.environ.get("BENCH_LATENCY", "0.02")),
+            cpu_ms=float(os.environ.get("BENCH_CPU_MS", "10")),
+        )
+    ]
@@ -0,0 +1,109 @@
+"""In-process MCP server backed by stub agents.
+
+Registers the same async agent tools and ``batch_run`` / ``run_pipeline``
+tools as ``MedicalAOP`` (via ``medical_aop.tools``) without needing the
+swarms ``AOP`` class or a model API key, so the benchmarks can drive a
+real ``streamablehttp_client`` offline.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, Optional
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.pipeline import CASE_WORKUP_PIPELINE
+from medical_aop.tools import (
+    register_agent_tool,
+    register_batch_tool,
+    register_metrics_route,
+    register_pipeline_tool,
+)
+
+from benchmarks.stub_llm import AsyncStubAgent
+
+MEDICAL_AGENT_NAMES = [
+    "Blood-Data-Analysis-Agent",
+    "ICD10-Symptom-Mapper-Agent",
+    "Treatment-Solutions-Agent",
+    "Drug-Interaction-Agent",
+    "Imaging-Triage-Agent",
+    "Clinical-Note-Summarizer-Agent",
+]
+
+
+def build_stub_server(
+    agents: Optional[Dict[str, Any]] = None,
+    dispatcher: Optional[AgentDispatcher] = None,
+    latency: float = 0.02,
+    timeout: float = 30,
+    **agent_kwargs,
+) -> FastMCP:
+    """Build a FastMCP server exposing stub agents as tools.
+
+    Args:
+        agents: Mapping of tool name to agent (defaults to the six medical
+            agent names backed by ``AsyncStubAgent``).
+        dispatcher: Optional preconfigured dispatcher; its registries are
+            filled with ``agents``.
+        latency: Stub first-token latency in seconds.
+        timeout: Per-call timeout for every tool.
+        **agent_kwargs: Extra ``AsyncStubAgent`` arguments.
+    """
+    if agents is None:
+        agents = {
+            name: AsyncStubAgent(agent_name=name, latency=latency, **agent_kwargs)
+            for name in MEDICAL_AGENT_NAMES
+        }
+    if dispatcher is None:
+        dispatcher = AgentDispatcher(
+            AsyncAgentExecutor(
+                max_concurrency_per_agent=256, max_threads=256, retry_delay=0
+            )
+        )
+    server = FastMCP("StubMedicalAgentServer", log_level="WARNING")
+    for tool_name, agent in agents.items():
+        dispatcher.agents[tool_name] = agent
+        dispatcher.tool_configs[tool_name] = SimpleNamespace(
+            timeout=timeout, max_retries=0
+        )
+        register_agent_tool(server, dispatcher, tool_name, agent.agent_description)
+    register_batch_tool(server, dispatcher)
+    register_pipeline_tool(
+        server, dispatcher, pipelines={"case_workup": CASE_WORKUP_PIPELINE}
+    )
+    if dispatcher.metrics is not None:
+        register_metrics_route(server, dispatcher.metrics)
+    return server
+
+
+@contextmanager
+def serve_in_background(server: FastMCP, port: int = 8765) -> Iterator[str]:
+    """Serve ``server`` over streamable-http on a background thread.
+
+    Yields:
+        The MCP endpoint URL.
+    """
+    config = uvicorn.Config(
+        server.streamable_http_app(),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+    uvicorn_server = uvicorn.Server(config)
+    thread = threading.Thread(target=uvicorn_server.run, daemon=True)
+    thread.start()
+    while not uvicorn_server.started:
+        if not thread.is_alive():
+            raise RuntimeError(f"Stub server failed to start on port {port}")
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}/mcp"
+    finally:
+        uvicorn_server.should_exit = True
+        thread.join(timeout=5)
@@ -0,0 +1,150 @@
+"""Sustained ``submit_task`` throughput with the durable task store.
+
+Runs ``TaskManager`` in-process with concurrent submitters for a fixed
+time against a stub dispatch (fixed latency), so every task goes
+pending -> processing -> completed while new ones keep arriving. Four
+configurations:
+
+- ``memory``: ``TaskStore(":memory:")``, no durability (the baseline)
+- ``per-write``: SQLite file committing every record on its own
+  (``batch_size=1``, no flush interval)
+- ``batched``: SQLite file with group commits (the server default)
+- ``batched-ack``: the same, acknowledging submits before the commit
+  (``durable_submit=False``)
+
+Except for ``batched-ack`` a submit is acknowledged once its record is
+committed. Reports submissions/s, submit latency percentiles, SQLite
+transactions and rows per transaction, then times the recovery of
+``BENCH_RECOVER`` unfinished tasks on reopening the file.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.task_store
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from loguru import logger
+
+from medical_aop.tasks import TaskManager, TaskStore
+
+from benchmarks.stub_llm import percentile
+
+DURATION = float(os.environ.get("BENCH_DURATION", "3"))
+SUBMITTERS = int(os.environ.get("BENCH_SUBMITTERS", "64"))
+LATENCY = float(os.environ.get("BENCH_LATENCY", "0.05"))
+RECOVER = int(os.environ.get("BENCH_RECOVER", "10000"))
+
+
+async def stub_dispatch(tool_name: str, task: str, **kwargs) -> Dict[str, Any]:
+    await asyncio.sleep(LATENCY)
+    return {"result": f"{tool_name}: {task}", "success": True, "error": None}
+
+
+async def sustained(store: TaskStore, durable_submit: bool = True) -> Dict[str, Any]:
+    manager = TaskManager(store, stub_dispatch, durable_submit=durable_submit)
+    latencies: List[float] = []
+    deadline = time.perf_counter() + DURATION
+
+    async def submitter(worker: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await manager.submit("Clinical-Note-Summarizer-Agent", f"note {worker}-{i}")
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(submitter(w) for w in range(SUBMITTERS)))
+    elapsed = time.perf_counter() - start
+    # Let the last calls finish so their completions are written too.
+    while manager.get_stats()["running"]:
+        await asyncio.sleep(0.01)
+    store.flush()
+    stats = store.get_stats()
+    manager.close()
+    return {
+        "rate": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "batches": stats["batches"],
+        "rows_per_batch": stats["avg_batch_rows"],
+    }
+
+
+async def recovery(path: str) -> None:
+    # Leave RECOVER tasks pending, as a crash would, then reopen the file.
+    store = TaskStore(path)
+    now = time.time()
+    for i in range(RECOVER):
+        store.save(
+            {
+                "task_id": f"t{i}",
+                "agent_name": "Clinical-Note-Summarizer-Agent",
+                "task": f"note {i}",
+                "img": None,
+                "imgs": None,
+                "correct_answer": None,
+                "priority": None,
+                "tenant": "anonymous",
+                "status": "pending" if i % 2 else "processing",
+                "result": None,
+                "error": None,
+                "retry_count": 0,
+                "created_at": now + i * 1e-6,
+                "started_at": None,
+                "finished_at": None,
+            }
+        )
+    store.close()
+
+    start = time.perf_counter()
+    manager = TaskManager(TaskStore(path), stub_dispatch)
+    resumed = await manager.recover()
+    recovered = time.perf_counter() - start
+    while manager.get_stats()["running"]:
+        await asyncio.sleep(0.01)
+    drained = time.perf_counter() - start
+    manager.store.flush()
+    counts = manager.store.counts()
+    manager.close()
+    print(
+        f"\nrecovery: reopened and resumed {resumed} unfinished tasks in "
+        f"{recovered * 1e3:.0f}ms, all finished after {drained * 1e3:.0f}ms {counts}"
+    )
+
+
+async def main() -> None:
+    print(
+        f"{SUBMITTERS} submitters for {DURATION:g}s, {LATENCY * 1e3:.0f}ms per agent call"
+    )
+    print(f"{'store':<11}{'submits/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'txns':>8}{'rows/txn':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            "memory": (lambda: TaskStore(":memory:"), True),
+            "per-write": (
+                lambda: TaskStore(
+                    os.path.join(tmp, "per_write.db"), batch_size=1, flush_interval=0
+                ),
+                True,
+            ),
+            "batched": (lambda: TaskStore(os.path.join(tmp, "batched.db")), True),
+            "batched-ack": (lambda: TaskStore(os.path.join(tmp, "batched_ack.db")), False),
+        }
+        for name, (make_store, durable_submit) in stores.items():
+            r = await sustained(make_store(), durable_submit)
+            print(
+                f"{name:<11}{r['rate']:>11.0f}{r['p50'] * 1e3:>9.2f}{r['p99'] * 1e3:>9.2f}"
+                f"{r['batches']:>8}{r['rows_per_batch']:>10.1f}"
+            )
+        await recovery(os.path.join(tmp, "recover.db"))
+
+
+if __name__ == "__main__":
+    # Recovery logs one line per reopened store.
+    logger.remove()
+    asyncio.run(main())
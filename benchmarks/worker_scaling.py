@@ -0,0 +1,81 @@
+"""Throughput scaling of the multi-process worker pool.
+
+Each call burns ``BENCH_CPU_MS`` of CPU (standing in for swarms' prompt
+assembly, parsing and logging) plus ``BENCH_LATENCY`` of model wait. In one
+process the CPU part serializes on the GIL; with workers it spreads across
+cores.
+
+Run from the repository root (configure via env, no CLI):
+
+    python -m benchmarks.worker_scaling
+"""
+
+import asyncio
+import os
+import time
+
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.workers import WorkerPoolExecutor, load_agents
+
+from benchmarks.stub_llm import summarize
+
+FACTORY = "benchmarks.stub_llm:cpu_bound_agents"
+AGENT = "Blood-Data-Analysis-Agent"
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "400"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "64"))
+WORKER_COUNTS = [
+    int(n)
+    for n in os.environ.get(
+        "BENCH_WORKERS", ",".join(str(n) for n in (1, 2, 4, 8) if n <= (os.cpu_count() or 1))
+    ).split(",")
+]
+
+
+async def drive(executor, agent) -> dict:
+    latencies = []
+    remaining = iter(range(REQUESTS))
+
+    async def worker() -> None:
+        for i in remaining:
+            start = time.perf_counter()
+            response = await executor.execute(AGENT, agent, f"panel {i}", timeout=60)
+            assert response["success"], response["error"]
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(CONCURRENCY)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+def report(name: str, stats: dict) -> None:
+    print(f"{name:<22}{stats['rps']:>10}{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+
+
+async def main() -> None:
+    agent = load_agents(FACTORY)[AGENT]
+    print(
+        f"cpu={os.environ.get('BENCH_CPU_MS', '10')}ms latency={os.environ.get('BENCH_LATENCY', '0.02')}s "
+        f"requests={REQUESTS} concurrency={CONCURRENCY} cores={os.cpu_count()}"
+    )
+    print(f"{'mode':<22}{'rps':>10}{'p50 ms':>10}{'p99 ms':>10}")
+
+    in_process = AsyncAgentExecutor(max_concurrency_per_agent=CONCURRENCY, max_threads=CONCURRENCY)
+    report("in-process threads", await drive(in_process, agent))
+    in_process.shutdown()
+
+    for count in WORKER_COUNTS:
+        pool = WorkerPoolExecutor(
+            FACTORY,
+            workers=count,
+            max_concurrency_per_agent=CONCURRENCY,
+            max_threads=CONCURRENCY,
+        )
+        pool.start()
+        try:
+            report(f"{count} worker process(es)", await drive(pool, agent))
+        finally:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+import os
+import asyncio
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+AOP_URL = os.environ.get("AOP_URL", "http://localhost:8000/mcp")
+
+
+def payload(result):
+    content = result.structuredContent or {}
+    return content.get("result", content)
+
+
+async def main() -> None:
+    # Configure via environment variables (no CLI)
+    agent_name = os.environ.get("AGENT_NAME", "Clinical-Note-Summarizer-Agent")
+    task = os.environ.get(
+        "AGENT_TASK",
+        "Summarize: 68M, AF on warfarin, started amiodarone last week; INR 4.1. "
+        "Dyspnea on exertion, bilateral ankle edema, eGFR 48.",
+    )
+    # Set TASK_ID to pick up a task submitted earlier (e.g. before a restart)
+    task_id = os.environ.get("TASK_ID")
+    wait_seconds = float(os.environ.get("WAIT_SECONDS", "30"))
+
+    async with streamablehttp_client(AOP_URL) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            if not task_id:
+                submitted = payload(
+                    await session.call_tool(
+                        "submit_task", arguments={"agent_name": agent_name, "task": task}
+                    )
+                )
+                if not submitted.get("success"):
+                    print("Submit failed:", submitted.get("error"))
+                    return
+                task_id = submitted["task_id"]
+                print(f"Submitted {task_id} to {agent_name}")
+
+            # Long-poll until the task finishes
+            while True:
+                status = payload(
+                    await session.call_tool(
+                        "wait_for_task",
+                        arguments={"task_id": task_id, "timeout": wait_seconds},
+                    )
+                )
+                if not status.get("success"):
+                    print(status.get("error"))
+                    return
+                record = status["task"]
+                print(f"{task_id}: {record['status']} (resumed {record['retry_count']}x)")
+                if status["finished"]:
+                    print(record.get("result") or record.get("error"))
+                    return
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
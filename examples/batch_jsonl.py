@@ -0,0 +1,70 @@
+import os
+import json
+import asyncio
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+AOP_URL = os.environ.get("AOP_URL", "http://localhost:8000/mcp")
+
+
+def read_chunks(path: str, chunk_size: int):
+    chunk = []
+    with open(path) as f:
+        for line_no, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"task": item}
+            item.setdefault("id", line_no)
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+async def main() -> None:
+    # Configure via environment variables (no CLI)
+    agent_name = os.environ.get("AGENT_NAME", "Blood-Data-Analysis-Agent")
+    batch_file = os.environ.get("BATCH_FILE", "tasks.jsonl")  # one {"id", "task", ...} per line
+    output_file = os.environ.get("BATCH_OUTPUT", "results.jsonl")
+    chunk_size = int(os.environ.get("BATCH_CHUNK_SIZE", "100"))
+    concurrency = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+
+    async with streamablehttp_client(AOP_URL) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            with open(output_file, "w") as out:
+
+                # Each finished item arrives as a progress notification
+                async def on_progress(progress, total, message):
+                    if message:
+                        out.write(message + "\n")
+                        print(f"[{int(progress)}/{int(total or 0)}] {json.loads(message)['id']}")
+
+                failed = 0
+                for chunk in read_chunks(batch_file, chunk_size):
+                    resp = await session.call_tool(
+                        "batch_run",
+                        arguments={
+                            "agent_name": agent_name,
+                            "items": chunk,
+                            "max_concurrency": concurrency,
+                        },
+                        progress_callback=on_progress,
+                    )
+                    # FastMCP wraps dict return values as {"result": {...}}
+                    summary = resp.structuredContent or {}
+                    summary = summary.get("result", summary)
+                    failed += summary.get("failed", 0)
+                    if summary.get("error"):
+                        print("Batch error:", summary["error"])
+            print(f"Done. Results written to {output_file} ({failed} failed items)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -22,8 +22,13 @@ async def main() -> None:
 
             # Try to use discover_agents (if provided by the server)
             if "discover_agents" in tool_names:
-                resp = await session.call_tool("discover_agents", arguments={})
-                agents = getattr(resp, "structuredContent", None)
+                # Only the fields needed to pick an agent.
+                resp = await session.call_tool(
+                    "discover_agents", arguments={"fields": ["tool_name", "agent_name", "tags"]}
+                )
+                payload = getattr(resp, "structuredContent", None) or {}
+                payload = payload.get("result", payload)
+                agents = payload.get("agents") if isinstance(payload, dict) else payload
                 if agents and prefer_tag:
                     for a in agents:
                         tags = a.get("tags", [])
@@ -40,6 +45,11 @@ async def main() -> None:
                     "discover_agents", "get_agent_details", "get_agents_info", "list_agents",
                     "search_agents", "get_queue_stats", "pause_agent_queue",
                     "resume_agent_queue", "clear_agent_queue", "get_task_status",
+                    "get_cache_stats", "clear_response_cache", "batch_run", "run_pipeline",
+                    "get_worker_stats", "get_scheduler_stats", "get_llm_client_stats",
+                    "get_prompt_cache_stats", "submit_task", "wait_for_task", "list_tasks",
+                    "get_task_stats", "get_coalescing_stats",
+                    "get_output_schema", "get_image_stats", "get_resilience_stats",
                 }
                 ordered = [t.name for t in tools.tools]
                 ordered = [n for n in ordered if n and n not in mgmt]
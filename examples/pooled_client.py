@@ -0,0 +1,34 @@
+import os
+import asyncio
+import time
+
+from medical_aop.client import AOPClient
+
+
+AOP_URL = os.environ.get("AOP_URL", "http://localhost:8000/mcp")
+
+
+async def main() -> None:
+    # Configure via environment variables (no CLI)
+    agent_name = os.environ.get("AGENT_NAME", "Drug-Interaction-Agent")
+    regimens = os.environ.get(
+        "AGENT_TASKS",
+        "warfarin, amiodarone|clopidogrel, omeprazole|simvastatin, clarithromycin|lisinopril, spironolactone",
+    ).split("|")
+    pool_size = int(os.environ.get("POOL_SIZE", "4"))
+
+    # One client for the whole service: sessions and the tool list are reused
+    async with AOPClient(AOP_URL, pool_size=pool_size) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(
+            *(client.call(agent_name, f"Assess interactions: {regimen}") for regimen in regimens)
+        )
+        elapsed = time.perf_counter() - start
+        for regimen, response in zip(regimens, responses):
+            status = "ok" if response["success"] else f"failed: {response['error']}"
+            print(f"{regimen}: {status}")
+        print(f"{len(regimens)} calls in {elapsed:.2f}s; client stats: {client.get_stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
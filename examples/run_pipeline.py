@@ -0,0 +1,55 @@
+import os
+import json
+import asyncio
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+AOP_URL = os.environ.get("AOP_URL", "http://localhost:8000/mcp")
+
+
+async def main() -> None:
+    # Configure via environment variables (no CLI)
+    case = os.environ.get(
+        "CASE",
+        "68M, AF on warfarin, started amiodarone last week; INR 4.1. "
+        "Dyspnea on exertion, bilateral ankle edema, eGFR 48.",
+    )
+    pipeline = os.environ.get("PIPELINE", "case_workup")
+    # Optional custom graph: a JSON list of {id, agent, depends_on, sections, task}
+    nodes_file = os.environ.get("PIPELINE_NODES_FILE")
+
+    arguments = {"case": case, "pipeline": pipeline}
+    if nodes_file:
+        with open(nodes_file) as f:
+            arguments["nodes"] = json.load(f)
+
+    async with streamablehttp_client(AOP_URL) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            # Each node's result arrives as a progress notification when it finishes
+            async def on_node(progress, total, message):
+                node = json.loads(message)
+                status = "skipped" if node.get("skipped") else ("ok" if node["success"] else "failed")
+                print(f"[{int(progress)}/{int(total)}] {node['id']} ({node['agent']}): {status}")
+
+            result = await session.call_tool(
+                "run_pipeline", arguments=arguments, progress_callback=on_node
+            )
+            payload = result.structuredContent or {}
+            payload = payload.get("result", payload)
+            if not payload.get("success"):
+                print("Pipeline error:", payload.get("error") or "some nodes failed")
+            for node_id, node in payload.get("results", {}).items():
+                print(f"\n=== {node_id} ({node['agent']}, {node['duration']:.2f}s) ===")
+                print(node.get("result") or node.get("error"))
+            if payload.get("critical_path"):
+                print(
+                    f"\nTotal {payload['duration']:.2f}s (sum of calls {payload['sum_of_calls']:.2f}s), "
+                    f"critical path: {' -> '.join(payload['critical_path'])}"
+                )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -20,6 +20,9 @@ async def main() -> None:
                 return
 
             payload = {"query": query}
+            limit_env = os.environ.get("SEARCH_LIMIT")  # page size
+            if limit_env:
+                payload["limit"] = int(limit_env)
             if fields_env:
                 fields = [f.strip() for f in fields_env.split(",") if f.strip()]
                 if fields:
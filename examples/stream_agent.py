@@ -0,0 +1,54 @@
+import os
+import time
+import asyncio
+from mcp import ClientSession
+from mcp.client.streamable_http import streamablehttp_client
+
+
+AOP_URL = os.environ.get("AOP_URL", "http://localhost:8000/mcp")
+
+
+async def main() -> None:
+    # Configure via environment variables (no CLI)
+    agent_name = os.environ.get("AGENT_NAME", "Clinical-Note-Summarizer-Agent")
+    task = os.environ.get(
+        "AGENT_TASK",
+        "Summarize: 64M with T2DM, HTN. BP 152/94, A1c 8.9. On metformin 1g BID, lisinopril 10mg.",
+    )
+
+    async with streamablehttp_client(AOP_URL) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+
+            first_chunk_at = None
+            chunks = 0
+            start = time.perf_counter()
+
+            # Passing a progress callback asks the server to stream output
+            # chunks as progress notifications
+            async def on_chunk(progress, total, message):
+                nonlocal first_chunk_at, chunks
+                if message is None:
+                    return
+                if first_chunk_at is None:
+                    first_chunk_at = time.perf_counter()
+                chunks += 1
+                print(message, end="", flush=True)
+
+            result = await session.call_tool(
+                agent_name, arguments={"task": task}, progress_callback=on_chunk
+            )
+            total = time.perf_counter() - start
+
+            print()
+            if result.isError:
+                print("Agent error:", result)
+            if first_chunk_at is not None:
+                print(f"Time to first chunk: {first_chunk_at - start:.3f}s")
+            else:
+                print("No chunks received (server did not stream this agent)")
+            print(f"Full latency:        {total:.3f}s ({chunks} chunks)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""Performance extensions for the Medical Agents AOP server.
+
+The AOP subclass lives in ``medical_aop.server`` and is imported from there
+explicitly, so the standalone components below stay importable (and
+benchmarkable) without constructing an MCP server.
+"""
+
+from medical_aop.batch import run_batch
+from medical_aop.cache import ResponseCache, make_cache_key
+from medical_aop.client import AOPClient
+from medical_aop.coalesce import SingleFlight
+from medical_aop.discovery import AgentIndex
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AgentSaturatedError, AsyncAgentExecutor
+from medical_aop.images import ImagePipeline
+from medical_aop.lazy import LazyAgent, build_agents
+from medical_aop.llm_client import RateLimiter, SharedLLMClient
+from medical_aop.metrics import Metrics
+from medical_aop.pipeline import PipelineError, run_pipeline
+from medical_aop.prompt_cache import PromptCache, PromptPrefix
+from medical_aop.resilience import CircuitOpenError, Resilience
+from medical_aop.scheduler import FairScheduler
+from medical_aop.sections import SectionParser, StructuredOutput, output_schema
+from medical_aop.streaming import SectionChunker, TokenStream
+from medical_aop.tasks import TaskManager, TaskStore
+from medical_aop.workers import WorkerPoolExecutor
+
+__all__ = [
+    "AOPClient",
+    "AgentDispatcher",
+    "AgentIndex",
+    "AgentSaturatedError",
+    "AsyncAgentExecutor",
+    "CircuitOpenError",
+    "FairScheduler",
+    "ImagePipeline",
+    "LazyAgent",
+    "Metrics",
+    "PipelineError",
+    "PromptCache",
+    "PromptPrefix",
+    "RateLimiter",
+    "Resilience",
+    "ResponseCache",
+    "SectionChunker",
+    "SectionParser",
+    "SharedLLMClient",
+    "SingleFlight",
+    "StructuredOutput",
+    "TaskManager",
+    "TaskStore",
+    "TokenStream",
+    "WorkerPoolExecutor",
+    "build_agents",
+    "make_cache_key",
+    "output_schema",
+    "run_batch",
+    "run_pipeline",
+]
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+Dispatch = Callable[..., Awaitable[Dict[str, Any]]]
+ResultCallback = Callable[[int, int, Dict[str, Any]], Awaitable[None]]
+
+
+async def _run_item(
+    dispatch: Dispatch,
+    tool_name: str,
+    index: int,
+    item: Any,
+    dispatch_kwargs: Dict[str, Any],
+) -> Dict[str, Any]:
+    item_id = item.get("id", index) if isinstance(item, dict) else index
+    start_time = time.perf_counter()
+    if not isinstance(item, dict) or not item.get("task"):
+        response = {"result": "", "success": False, "error": "No task provided"}
+    else:
+        kwargs = dict(dispatch_kwargs)
+        if item.get("priority") is not None:
+            kwargs["priority"] = item["priority"]
+        try:
+            response = await dispatch(
+                tool_name,
+                item["task"],
+                img=item.get("img"),
+                imgs=item.get("imgs"),
+                correct_answer=item.get("correct_answer"),
+                **kwargs,
+            )
+        except Exception as e:
+            response = {"result": "", "success": False, "error": str(e)}
+    return {
+        "id": item_id,
+        **response,
+        "duration": round(time.perf_counter() - start_time, 4),
+    }
+
+
+async def run_batch(
+    dispatch: Dispatch,
+    tool_name: str,
+    items: List[Dict[str, Any]],
+    max_concurrency: int = 8,
+    on_result: Optional[ResultCallback] = None,
+    dispatch_kwargs: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Fan a list of task payloads out to one agent with bounded concurrency.
+
+    Each item is ``{"id": ..., "task": ..., "img": ..., "imgs": ...,
+    "correct_answer": ..., "priority": ...}``; ``id`` defaults to the item's index. Failures
+    are reported per item and never abort the rest of the batch.
+
+    Args:
+        dispatch: Coroutine running a single call, e.g. ``MedicalAOP._dispatch``.
+        tool_name: Agent tool to run every item against.
+        items: Task payloads.
+        max_concurrency: Maximum items in flight at once.
+        on_result: Optional coroutine called as ``(completed, total, result)``
+            as soon as each item finishes.
+        dispatch_kwargs: Extra keyword arguments for every ``dispatch`` call
+            (e.g. ``tenant`` and a default ``priority``).
+
+    Returns:
+        Dict with per-item results in completion order and summary counts.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    start_time = time.perf_counter()
+
+    async def bounded(index: int, item: Any) -> Dict[str, Any]:
+        async with semaphore:
+            return await _run_item(
+                dispatch, tool_name, index, item, dispatch_kwargs or {}
+            )
+
+    pending = [
+        asyncio.ensure_future(bounded(index, item))
+        for index, item in enumerate(items)
+    ]
+    results: List[Dict[str, Any]] = []
+    try:
+        for future in asyncio.as_completed(pending):
+            result = await future
+            results.append(result)
+            if on_result is not None:
+                await on_result(len(results), len(items), result)
+    finally:
+        for future in pending:
+            future.cancel()
+
+    succeeded = sum(1 for r in results if r["success"])
+    return {
+        "success": succeeded == len(results),
+        "agent_name": tool_name,
+        "results": results,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "duration": round(time.perf_counter() - start_time, 4),
+    }
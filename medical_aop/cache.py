@@ -0,0 +1,369 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Commas inside numbers ("1,500 mg") are not separators.
+_LIST_SEPARATORS = re.compile(
+    r"\s*(?:(?<!\d),|,(?!\d)|;|\band\b|\+)\s*", re.IGNORECASE
+)
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s+")
+# One medication with an optional dose: a few words, no sentence punctuation
+# (a period only inside a number, as in "0.5 mg").
+_MEDICATION_ITEM = re.compile(r"^\w(?:[\w ,/%()-]|(?<=\d)\.(?=\d))*$")
+_MAX_ITEM_WORDS = 6
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace and case so trivially different tasks share a key."""
+    if not text:
+        return ""
+    return " ".join(text.split()).lower()
+
+
+def _is_medication_list(items: List[str]) -> bool:
+    return all(
+        _MEDICATION_ITEM.match(item) and len(item.split()) <= _MAX_ITEM_WORDS
+        for item in items
+    )
+
+
+def _sorted_items(items: List[str]) -> Optional[List[str]]:
+    """Items in sorted order, or ``None`` when they do not look like medications."""
+    normalized = [normalize_text(item) for item in items if item.strip()]
+    if not _is_medication_list(normalized):
+        return None
+    return sorted(normalized)
+
+
+def canonicalize_medication_list(task: str) -> str:
+    """Canonicalize a medication list so that item order does not matter.
+
+    Handles inline lists after a colon (``"Check: warfarin, aspirin and
+    ibuprofen"``) and bulleted/numbered lines. Items are only reordered
+    when every one of them looks like a medication with an optional
+    dose; anything else is only whitespace-normalized.
+
+    >>> canonicalize_medication_list("Check: warfarin, aspirin and ibuprofen")
+    'check:aspirin; ibuprofen; warfarin'
+    >>> canonicalize_medication_list(
+    ...     "Doses: 1,500 mg metformin, 2,000 mg sertraline"
+    ... ) != canonicalize_medication_list(
+    ...     "Doses: 2,500 mg metformin, 1,000 mg sertraline"
+    ... )
+    True
+    """
+    lines: List[str] = []
+    bullets: List[str] = []
+
+    def flush_bullets() -> None:
+        items = _sorted_items(bullets)
+        lines.extend(items if items is not None else map(normalize_text, bullets))
+        bullets.clear()
+
+    for raw_line in task.splitlines():
+        if _BULLET.match(raw_line):
+            bullets.append(_BULLET.sub("", raw_line))
+            continue
+        if bullets:
+            flush_bullets()
+        prefix, sep, body = raw_line.rpartition(":")
+        items = _LIST_SEPARATORS.split(body) if sep else []
+        ordered = _sorted_items(items) if len(items) > 1 else None
+        if ordered is not None:
+            lines.append(normalize_text(prefix) + ":" + "; ".join(ordered))
+        elif raw_line.strip():
+            lines.append(normalize_text(raw_line))
+    if bullets:
+        flush_bullets()
+    return "\n".join(lines)
+
+
+TASK_CANONICALIZERS: Dict[str, Callable[[str], str]] = {
+    "Drug-Interaction-Agent": canonicalize_medication_list,
+}
+
+
+def prompt_hash(system_prompt: Optional[str]) -> str:
+    return hashlib.sha256((system_prompt or "").encode("utf-8")).hexdigest()
+
+
+def make_cache_key(
+    agent_name: str,
+    system_prompt: Optional[str],
+    model_name: Optional[str],
+    task: str,
+    img: Optional[str] = None,
+    imgs: Optional[List[str]] = None,
+    correct_answer: Optional[str] = None,
+) -> str:
+    """Content-addressed key for one agent call.
+
+    The key covers the agent name, a hash of its system prompt, the model,
+    the normalized task payload and the expected answer passed to the
+    agent, so editing a prompt automatically invalidates every entry
+    produced with the old one.
+    """
+    canonicalize = TASK_CANONICALIZERS.get(agent_name, normalize_text)
+    payload = {
+        "agent": agent_name,
+        "prompt": prompt_hash(system_prompt),
+        "model": model_name or "",
+        "task": canonicalize(task or ""),
+        "img": img or "",
+        "imgs": list(imgs or []),
+        "correct_answer": correct_answer or "",
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU store with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(
+        self, key: str, value: str, agent_name: str, prompt: str, expires_at: float
+    ) -> int:
+        with self._lock:
+            self._entries[key] = (value, agent_name, prompt, expires_at)
+            self._entries.move_to_end(key)
+            evicted = 0
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def purge_stale(self, agent_name: str, current_prompt: str) -> int:
+        with self._lock:
+            stale = [
+                key
+                for key, (_, name, prompt, _) in self._entries.items()
+                if name == agent_name and prompt != current_prompt
+            ]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """On-disk LRU store that survives server restarts."""
+
+    def __init__(self, path: str, max_entries: int = 10000, touch_batch: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_batch = touch_batch
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                agent_name TEXT NOT NULL,
+                prompt_hash TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_access "
+            "ON response_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        # Hits only record their access time; the UPDATEs are written in
+        # one transaction with the next store, or every ``touch_batch`` hits,
+        # instead of one commit per hit on the event loop.
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None or row[1] < now:
+                # Expired rows are overwritten on the next store or evicted.
+                return None
+            self._touched[key] = now
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+            return row[0]
+
+    def _flush_touched(self) -> None:
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?",
+                [(at, key) for key, at in self._touched.items()],
+            )
+            self._touched.clear()
+
+    def set(
+        self, key: str, value: str, agent_name: str, prompt: str, expires_at: float
+    ) -> int:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache "
+                "(key, value, agent_name, prompt_hash, expires_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, agent_name, prompt, expires_at, time.time()),
+            )
+            self._touched.pop(key, None)
+            self._flush_touched()
+            cursor = self._conn.execute(
+                "DELETE FROM response_cache WHERE key IN ("
+                "SELECT key FROM response_cache ORDER BY last_access DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def purge_stale(self, agent_name: str, current_prompt: str) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM response_cache WHERE agent_name = ? AND prompt_hash != ?",
+                (agent_name, current_prompt),
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def clear(self) -> int:
+        with self._lock:
+            self._touched.clear()
+            cursor = self._conn.execute("DELETE FROM response_cache")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM response_cache"
+            ).fetchone()[0]
+
+
+class ResponseCache:
+    """Response cache in front of the agent tools.
+
+    Args:
+        max_entries: Maximum number of cached responses (LRU eviction).
+        ttl: Seconds a cached response stays valid.
+        path: Optional SQLite file; when set the cache survives restarts.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 3600,
+        path: Optional[str] = None,
+    ):
+        self.ttl = ttl
+        self.backend = (
+            SQLiteCacheBackend(path, max_entries)
+            if path
+            else MemoryCacheBackend(max_entries)
+        )
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, agent_name: str, field: str, amount: int = 1) -> None:
+        counters = self._counters.setdefault(
+            agent_name, {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        )
+        counters[field] += amount
+
+    def key_for(
+        self,
+        agent: Any,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+    ) -> str:
+        return make_cache_key(
+            agent.agent_name,
+            getattr(agent, "system_prompt", None),
+            getattr(agent, "model_name", None),
+            task,
+            img,
+            imgs,
+            correct_answer,
+        )
+
+    def get(self, agent_name: str, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        self._count(agent_name, "hits" if value is not None else "misses")
+        return value
+
+    def set(self, agent: Any, key: str, value: str) -> None:
+        evicted = self.backend.set(
+            key,
+            value,
+            agent.agent_name,
+            prompt_hash(getattr(agent, "system_prompt", None)),
+            time.time() + self.ttl,
+        )
+        self._count(agent.agent_name, "stores")
+        if evicted:
+            self._count(agent.agent_name, "evictions", evicted)
+
+    def invalidate_stale(self, agent: Any) -> int:
+        """Drop entries produced with an older system prompt for ``agent``."""
+        return self.backend.purge_stale(
+            agent.agent_name, prompt_hash(getattr(agent, "system_prompt", None))
+        )
+
+    def clear(self) -> int:
+        return self.backend.clear()
+
+    def get_stats(self, agent_name: Optional[str] = None) -> Dict[str, Any]:
+        if agent_name is not None:
+            return dict(
+                self._counters.get(
+                    agent_name,
+                    {"hits": 0, "misses": 0, "stores": 0, "evictions": 0},
+                )
+            )
+        totals = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        for counters in self._counters.values():
+            for field, value in counters.items():
+                totals[field] += value
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            **totals,
+            "hit_rate": round(totals["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self.backend),
+            "per_agent": {name: dict(c) for name, c in self._counters.items()},
+        }
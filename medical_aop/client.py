@@ -0,0 +1,426 @@
+import asyncio
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, TypeVar
+
+import anyio
+import httpx
+from loguru import logger
+from mcp import ClientSession, types
+from mcp.client.streamable_http import streamablehttp_client
+from mcp.shared.exceptions import McpError
+from mcp.shared.session import ProgressFnT
+
+T = TypeVar("T")
+
+# Failures that mean the session's connection is gone, not that the
+# server answered the call with an error.
+DISCONNECT_ERRORS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+# What the mcp client reports when the server answers 404 for the session
+# id, e.g. after a restart: the request never ran, the session is gone.
+SESSION_TERMINATED = 32600
+
+
+def _disconnected(exc: BaseException) -> bool:
+    if isinstance(exc, McpError):
+        return exc.error.code in (types.CONNECTION_CLOSED, SESSION_TERMINATED)
+    if isinstance(exc, DISCONNECT_ERRORS):
+        return True
+    # Transport failures can arrive wrapped in an exception group.
+    return any(_disconnected(inner) for inner in getattr(exc, "exceptions", ()))
+
+
+def _never_ran(exc: BaseException) -> bool:
+    """The server dropped the session before running the request."""
+    return isinstance(exc, McpError) and exc.error.code == SESSION_TERMINATED
+
+
+class _PooledSession:
+    """One initialized ``ClientSession``, owned by its own task.
+
+    The transport and session contexts are entered and exited in that task
+    (anyio requires it), so callers on any task can share the session.
+    """
+
+    def __init__(self, client: "AOPClient"):
+        self.client = client
+        self.session: Optional[ClientSession] = None
+        self.in_flight = 0
+        self.error: Optional[BaseException] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._dead = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and not self._dead.is_set()
+
+    @property
+    def dead(self) -> bool:
+        return self._dead.is_set()
+
+    async def open(self) -> None:
+        self._task = asyncio.ensure_future(self._hold())
+        await self.ready()
+
+    async def ready(self) -> None:
+        """Wait until the session is initialized; raise if it never was."""
+        await self._ready.wait()
+        if self.session is None:
+            error = self.error
+            while getattr(error, "exceptions", None):
+                error = error.exceptions[0]
+            raise ConnectionError(f"Could not connect to {self.client.url}: {error!r}") from self.error
+
+    async def _hold(self) -> None:
+        client = self.client
+        try:
+            async with streamablehttp_client(
+                client.url,
+                headers=client.headers,
+                timeout=client.timeout,
+                sse_read_timeout=client.sse_read_timeout,
+            ) as (read, write, _):
+                async with ClientSession(
+                    read, write, message_handler=client._on_message
+                ) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._ready.set()
+                    heartbeat = asyncio.ensure_future(self._heartbeat(session))
+                    closing = asyncio.ensure_future(self._closing.wait())
+                    try:
+                        await asyncio.wait({heartbeat, closing}, return_when=asyncio.FIRST_COMPLETED)
+                    finally:
+                        heartbeat.cancel()
+                        closing.cancel()
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self._dead.set()
+            self._ready.set()
+
+    async def _heartbeat(self, session: ClientSession) -> None:
+        # A call whose response stream breaks (the server was killed) is
+        # never answered by the transport, so while calls are in flight the
+        # session is pinged; a failed ping ends the session and its calls.
+        while True:
+            await asyncio.sleep(self.client.heartbeat_interval)
+            if not self.in_flight:
+                continue
+            try:
+                await asyncio.wait_for(session.send_ping(), self.client.timeout)
+            except Exception as exc:
+                self.error = exc
+                return
+
+    async def run(self, request: Callable[[ClientSession], Awaitable[T]]) -> T:
+        """Run ``request`` on this session, failing it if the session dies."""
+        call = asyncio.ensure_future(request(self.session))
+        dead = asyncio.ensure_future(self._dead.wait())
+        try:
+            done, _ = await asyncio.wait({call, dead}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            dead.cancel()
+            if not call.done():
+                call.cancel()
+        if call in done:
+            return call.result()
+        raise ConnectionError(f"Lost the session to {self.client.url}: {self.error!r}")
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, 5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+
+
+class AOPClient:
+    """Pooled client for the AOP server's MCP endpoint.
+
+    Keeps up to ``pool_size`` long-lived, initialized sessions instead of
+    a connect, ``initialize()`` and ``list_tools()`` round trip per call.
+    Concurrent calls share the sessions (MCP multiplexes requests on one
+    session), each going to the session with the fewest calls in flight;
+    sessions are opened on demand as concurrency grows, outside any lock,
+    so one slow connect does not hold up calls on the open sessions. The
+    tool list is fetched once and dropped when the server sends
+    ``notifications/tools/list_changed``. A call whose session lost its
+    connection is only retried on a fresh session if the server reports it
+    never ran it, or up to ``reconnect_attempts`` times when the caller
+    opts in; tool list fetches are always retried once.
+
+    Use as ``async with AOPClient(url) as client: await client.call(agent, task)``.
+
+    Args:
+        url: MCP endpoint, e.g. ``http://localhost:8000/mcp``.
+        pool_size: Maximum number of sessions kept open.
+        headers: Extra HTTP headers sent with every request (e.g.
+            ``X-Tenant-ID`` or an API key).
+        timeout: HTTP timeout in seconds for ordinary requests.
+        sse_read_timeout: Seconds to wait for the next event on a streamed
+            response; bounds the longest agent call.
+        reconnect_attempts: Retries of a call after its connection drops.
+            A dropped call may already have run on the server, so only
+            raise it from 0 for calls that are safe to run twice.
+        heartbeat_interval: Seconds between pings of a session with calls
+            in flight, so a server that died mid-call is noticed.
+    """
+
+    def __init__(
+        self,
+        url: str = "http://localhost:8000/mcp",
+        pool_size: int = 4,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 30,
+        sse_read_timeout: float = 300,
+        reconnect_attempts: int = 0,
+        heartbeat_interval: float = 5.0,
+    ):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        self.url = url
+        self.pool_size = pool_size
+        self.headers = headers
+        self.timeout = timeout
+        self.sse_read_timeout = sse_read_timeout
+        self.reconnect_attempts = reconnect_attempts
+        self.heartbeat_interval = heartbeat_interval
+        self._sessions: List[_PooledSession] = []
+        self._tools: Optional[List[types.Tool]] = None
+        self._tools_lock = asyncio.Lock()
+        self._closed = False
+        self._stats = {
+            "calls": 0,
+            "sessions_opened": 0,
+            "reconnects": 0,
+            "tool_list_fetches": 0,
+            "tool_list_invalidations": 0,
+        }
+
+    async def __aenter__(self) -> "AOPClient":
+        # Fail fast on a wrong URL instead of on the first call.
+        pooled = await self._acquire()
+        pooled.in_flight -= 1
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def _on_message(self, message: Any) -> None:
+        if isinstance(message, types.ServerNotification) and isinstance(
+            message.root, types.ToolListChangedNotification
+        ):
+            self.invalidate_tools()
+
+    def invalidate_tools(self) -> None:
+        """Drop the cached tool list; the next lookup fetches it again."""
+        if self._tools is not None:
+            self._stats["tool_list_invalidations"] += 1
+        self._tools = None
+
+    def _reserve(self, fresh: bool) -> Tuple[_PooledSession, bool]:
+        # No await in here, so picking a session and reserving its slot
+        # (in_flight) is atomic on the loop without a lock.
+        self._sessions = [pooled for pooled in self._sessions if not pooled.dead]
+        if self._sessions and not fresh:
+            least_busy = min(self._sessions, key=lambda pooled: pooled.in_flight)
+            if least_busy.in_flight == 0 or len(self._sessions) >= self.pool_size:
+                least_busy.in_flight += 1
+                return least_busy, False
+        pooled = _PooledSession(self)
+        pooled.in_flight += 1
+        self._sessions.append(pooled)
+        return pooled, True
+
+    async def _acquire(self, fresh: bool = False) -> _PooledSession:
+        """A session with a call slot reserved on it (``in_flight`` counted).
+
+        A new session is reserved in the pool first and connected after,
+        so concurrent callers either share it once it is up or use the
+        sessions already open.
+        """
+        if self._closed:
+            raise RuntimeError("AOPClient is closed")
+        pooled, new = self._reserve(fresh)
+        try:
+            if new:
+                await pooled.open()
+                self._stats["sessions_opened"] += 1
+            else:
+                await pooled.ready()
+        except BaseException:
+            pooled.in_flight -= 1
+            if pooled.dead and pooled in self._sessions:
+                self._sessions.remove(pooled)
+            raise
+        return pooled
+
+    async def _discard(self, pooled: _PooledSession) -> None:
+        # Idle sessions to the same server are most likely dead as well
+        # (a restart drops every session); busy ones find out themselves.
+        dropped = [pooled] + [other for other in self._sessions if other.in_flight == 0]
+        self._sessions = [other for other in self._sessions if other not in dropped]
+        await asyncio.gather(*(other.close() for other in dropped))
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        progress_callback: Optional[ProgressFnT] = None,
+        timeout: Optional[float] = None,
+    ) -> types.CallToolResult:
+        """Call any tool (agent or management) on a pooled session.
+
+        Args:
+            name: Tool name.
+            arguments: Tool arguments.
+            progress_callback: Receives progress notifications, i.e. streamed
+                output chunks and ``batch_run`` item results.
+            timeout: Seconds to wait for the result (None uses the
+                session default).
+
+        Returns:
+            The raw ``CallToolResult``.
+        """
+        read_timeout = timedelta(seconds=timeout) if timeout is not None else None
+        result = await self._on_session(
+            lambda session: session.call_tool(
+                name,
+                arguments or {},
+                read_timeout_seconds=read_timeout,
+                progress_callback=progress_callback,
+            )
+        )
+        self._stats["calls"] += 1
+        return result
+
+    async def _on_session(
+        self,
+        request: Callable[[ClientSession], Awaitable[T]],
+        reconnect_attempts: Optional[int] = None,
+    ) -> T:
+        """Run ``request`` on a pooled session, reconnecting if it dropped.
+
+        ``reconnect_attempts`` defaults to the client's; a request the
+        server never ran is retried once either way.
+        """
+        if reconnect_attempts is None:
+            reconnect_attempts = self.reconnect_attempts
+        attempt = 0
+        while True:
+            pooled = await self._acquire(fresh=attempt > 0)
+            try:
+                return await pooled.run(request)
+            except Exception as exc:
+                retry = _disconnected(exc) and (
+                    attempt < reconnect_attempts or (attempt == 0 and _never_ran(exc))
+                )
+                if not retry:
+                    raise
+                attempt += 1
+                self._stats["reconnects"] += 1
+                logger.warning(f"AOP session to {self.url} dropped ({exc!r}); reconnecting")
+                await self._discard(pooled)
+            finally:
+                pooled.in_flight -= 1
+
+    async def call(
+        self,
+        agent: str,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        progress_callback: Optional[ProgressFnT] = None,
+        timeout: Optional[float] = None,
+        **arguments: Any,
+    ) -> Dict[str, Any]:
+        """Call an agent tool.
+
+        Args:
+            agent: Agent tool name.
+            task: The task for the agent.
+            img: Optional image path or URL.
+            imgs: Optional list of image paths or URLs.
+            progress_callback: Receives streamed output chunks.
+            timeout: Seconds to wait for the result.
+            **arguments: Further tool arguments (``correct_answer``,
+                ``priority``, ``max_retries``, ...).
+
+        Returns:
+            The agent response: ``{"result", "success", "error"}`` plus any
+            extras the server adds (``structured``, ...).
+
+        Raises:
+            ValueError: If the server has no tool named ``agent``.
+        """
+        if agent not in await self.tool_names():
+            # The cached list may predate the agent; look once more.
+            self.invalidate_tools()
+            if agent not in await self.tool_names():
+                raise ValueError(f"Agent '{agent}' not found on {self.url}")
+        arguments = {"task": task, **arguments}
+        if img is not None:
+            arguments["img"] = img
+        if imgs is not None:
+            arguments["imgs"] = imgs
+        result = await self.call_tool(
+            agent, arguments, progress_callback=progress_callback, timeout=timeout
+        )
+        content = result.structuredContent or {}
+        response = content.get("result", content)
+        if result.isError or not isinstance(response, dict) or not response:
+            text = " ".join(
+                block.text for block in result.content if isinstance(block, types.TextContent)
+            )
+            return {"result": "", "success": False, "error": text or "Tool call failed"}
+        return response
+
+    async def list_tools(self, refresh: bool = False) -> List[types.Tool]:
+        """The server's tools, fetched once and cached until they change."""
+        if refresh:
+            self.invalidate_tools()
+        async with self._tools_lock:
+            if self._tools is None:
+                tools: List[types.Tool] = []
+                cursor = None
+                while True:
+                    # Listing is safe to repeat, so it reconnects regardless.
+                    page = await self._on_session(
+                        lambda session: session.list_tools(cursor=cursor),
+                        reconnect_attempts=max(self.reconnect_attempts, 1),
+                    )
+                    tools.extend(page.tools)
+                    cursor = page.nextCursor
+                    if not cursor:
+                        break
+                self._stats["tool_list_fetches"] += 1
+                self._tools = tools
+            return self._tools
+
+    async def tool_names(self) -> Set[str]:
+        return {tool.name for tool in await self.list_tools()}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Open sessions, calls in flight, reconnects and tool list fetches."""
+        sessions = [pooled for pooled in self._sessions if pooled.alive]
+        return {
+            **self._stats,
+            "sessions": len(sessions),
+            "in_flight": sum(pooled.in_flight for pooled in sessions),
+            "tools_cached": self._tools is not None,
+        }
+
+    async def close(self) -> None:
+        """Close every pooled session."""
+        self._closed = True
+        sessions, self._sessions = self._sessions, []
+        await asyncio.gather(*(pooled.close() for pooled in sessions))
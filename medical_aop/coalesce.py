@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Dict[str, Any]]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Collapse identical concurrent agent calls into one execution.
+
+    The first call for a key (agent plus task, images and expected answer)
+    runs as its own asyncio task; identical calls arriving while it is in
+    flight wait for the same result instead of calling the LLM again.
+    Every caller waits with its own timeout, and the execution is only
+    cancelled once no caller is waiting for it any more. Unlike the
+    response cache this needs no stored result and applies to every
+    agent, cached or not.
+
+    Args:
+        agents: Tool names calls are coalesced for (None for all).
+    """
+
+    def __init__(self, agents: Optional[List[str]] = None):
+        self.agents = set(agents) if agents is not None else None
+        self._flights: Dict[str, _Flight] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def applies_to(self, tool_name: str) -> bool:
+        return self.agents is None or tool_name in self.agents
+
+    def key_for(
+        self,
+        tool_name: str,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+    ) -> str:
+        # Calls in flight at the same moment share the agent's prompt and
+        # model, so only the request payload needs to be in the key. Unlike
+        # the cache key, the task is only whitespace-normalized, case kept
+        # (drug names, abbreviations): callers must have asked exactly the
+        # same question to share a result.
+        payload = {
+            "agent": tool_name,
+            "task": " ".join((task or "").split()),
+            "img": img or "",
+            "imgs": list(imgs or []),
+            "correct_answer": correct_answer or "",
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def _count(self, tool_name: str, counter: str) -> None:
+        stats = self._stats.setdefault(
+            tool_name, {"executions": 0, "coalesced": 0, "timeouts": 0, "cancelled": 0}
+        )
+        stats[counter] += 1
+
+    async def join(
+        self, key: str, tool_name: str, timeout: Optional[float] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Wait for the identical call in flight for ``key``, if there is one.
+
+        Returns:
+            Its tool response (or a timeout error response if ``timeout``
+            expires first), or None when no identical call is in flight.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            return None
+        self._count(tool_name, "coalesced")
+        return await self._wait(key, flight, tool_name, timeout)
+
+    async def run(
+        self,
+        key: str,
+        tool_name: str,
+        call: Callable[[], Awaitable[Dict[str, Any]]],
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Start ``call`` as the execution for ``key`` and wait for it.
+
+        Callers that ``join`` the same key meanwhile share its result.
+        ``timeout`` bounds this caller's wait only; None waits for as long
+        as the execution takes.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(call()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._finish(key, flight))
+            self._count(tool_name, "executions")
+        else:
+            self._count(tool_name, "coalesced")
+        return await self._wait(key, flight, tool_name, timeout)
+
+    async def _wait(
+        self, key: str, flight: _Flight, tool_name: str, timeout: Optional[float]
+    ) -> Dict[str, Any]:
+        flight.waiters += 1
+        try:
+            # Each caller gets its own copy of the shared response.
+            return dict(await asyncio.wait_for(asyncio.shield(flight.task), timeout))
+        except asyncio.TimeoutError:
+            self._count(tool_name, "timeouts")
+            return {
+                "result": "",
+                "success": False,
+                "error": f"Agent {tool_name} timed out after {timeout:.3g}s",
+            }
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result.
+                self._count(tool_name, "cancelled")
+                self._finish(key, flight)
+                flight.task.cancel()
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def get_stats(self, tool_name: Optional[str] = None) -> Dict[str, Any]:
+        """Executions, coalesced calls, per-caller timeouts and cancelled flights."""
+        per_agent = {name: dict(stats) for name, stats in self._stats.items()}
+        if tool_name is not None:
+            per_agent = {tool_name: per_agent.get(tool_name, {})}
+        executions = sum(s.get("executions", 0) for s in per_agent.values())
+        coalesced = sum(s.get("coalesced", 0) for s in per_agent.values())
+        calls = executions + coalesced
+        return {
+            "in_flight": len(self._flights),
+            "executions": executions,
+            "coalesced": coalesced,
+            "coalesced_ratio": round(coalesced / calls, 4) if calls else 0.0,
+            "per_agent": per_agent,
+        }
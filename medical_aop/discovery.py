@@ -0,0 +1,212 @@
+import bisect
+import math
+import re
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SEARCH_FIELDS = ("name", "description", "tags", "capabilities", "role")
+DEFAULT_SEARCH_FIELDS = ("name", "description", "tags", "capabilities")
+# A name or tag match says more about an agent than a word in its description.
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "capabilities": 2.0, "role": 1.0, "description": 1.0}
+PREFIX_MATCH_WEIGHT = 0.5
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: Any) -> List[str]:
+    """Lower-case word tokens; ``"ICD10-Symptom-Mapper"`` -> icd10, symptom, mapper."""
+    if isinstance(text, (list, tuple, set)):
+        text = " ".join(str(item) for item in text)
+    return _TOKEN.findall(str(text or "").lower())
+
+
+def _metadata(agent: Any, name: str, default: Any = None) -> Any:
+    # LazyAgent answers from its config instead of building the agent.
+    metadata = getattr(type(agent), "metadata", None)
+    if metadata is not None:
+        return agent.metadata(name, default)
+    return getattr(agent, name, default)
+
+
+def agent_discovery_info(tool_name: str, agent: Any) -> Dict[str, Any]:
+    """Discovery metadata of one agent, in the shape AOP's discovery tools return."""
+    system_prompt = _metadata(agent, "system_prompt") or ""
+    return {
+        "tool_name": tool_name,
+        "agent_name": _metadata(agent, "agent_name") or tool_name,
+        "description": _metadata(agent, "agent_description") or "No description available",
+        "short_system_prompt": (
+            system_prompt[:200] + "..." if len(system_prompt) > 200 else system_prompt
+        ),
+        "tags": list(_metadata(agent, "tags") or []),
+        "capabilities": list(_metadata(agent, "capabilities") or []),
+        "role": _metadata(agent, "role") or "worker",
+        "model_name": _metadata(agent, "model_name") or "Unknown",
+        "max_loops": _metadata(agent, "max_loops", 1),
+        "temperature": _metadata(agent, "temperature"),
+        "max_tokens": _metadata(agent, "max_tokens"),
+    }
+
+
+def project(info: Dict[str, Any], fields: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Keep only ``fields`` of a discovery record (all of it for None)."""
+    if not fields:
+        return info
+    return {field: info[field] for field in fields if field in info}
+
+
+def paginate(
+    items: Sequence[Any], offset: int = 0, limit: Optional[int] = None
+) -> Tuple[List[Any], Optional[int]]:
+    """Slice one page out of ``items``.
+
+    Returns:
+        The page and the offset of the next page (None on the last page).
+    """
+    offset = max(offset, 0)
+    end = len(items) if limit is None else offset + max(limit, 0)
+    return list(items[offset:end]), end if end < len(items) else None
+
+
+class AgentIndex:
+    """In-memory inverted index over the agents' discovery metadata.
+
+    Keeps one discovery record per tool and, per searchable field (``name``
+    covers the agent and tool names, ``description``, ``tags``,
+    ``capabilities``, ``role``), a posting list from token to tools plus a
+    sorted vocabulary for prefix matches. ``add`` and ``remove`` update it
+    incrementally, so a search touches only the postings of its query
+    tokens instead of every registered agent.
+
+    Every query token must match (exactly, or as a prefix of a token) in
+    one of the searched fields. Matches are ranked by field weight, exact
+    over prefix, and token rarity (IDF), then by registration order.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._order: Dict[str, int] = {}
+        self._terms: Dict[str, Dict[str, List[str]]] = {}
+        self._postings: Dict[str, Dict[str, Dict[str, int]]] = {
+            field: {} for field in SEARCH_FIELDS
+        }
+        self._vocabulary: Dict[str, List[str]] = {field: [] for field in SEARCH_FIELDS}
+        self._sequence = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, tool_name: str) -> bool:
+        return tool_name in self._records
+
+    @staticmethod
+    def _field_tokens(info: Dict[str, Any]) -> Dict[str, List[str]]:
+        return {
+            "name": tokenize(info["tool_name"]) + tokenize(info["agent_name"]),
+            "description": tokenize(info["description"]),
+            "tags": tokenize(info["tags"]),
+            "capabilities": tokenize(info["capabilities"]),
+            "role": tokenize(info["role"]),
+        }
+
+    def add(self, tool_name: str, agent: Any) -> Dict[str, Any]:
+        """Index (or re-index) one agent and return its discovery record."""
+        info = agent_discovery_info(tool_name, agent)
+        with self._lock:
+            if tool_name in self._records:
+                self._unindex(tool_name)
+            else:
+                self._order[tool_name] = self._sequence
+                self._sequence += 1
+            self._records[tool_name] = info
+            terms = self._field_tokens(info)
+            self._terms[tool_name] = terms
+            for field, tokens in terms.items():
+                postings, vocabulary = self._postings[field], self._vocabulary[field]
+                for token in tokens:
+                    tools = postings.get(token)
+                    if tools is None:
+                        tools = postings[token] = {}
+                        bisect.insort(vocabulary, token)
+                    tools[tool_name] = tools.get(tool_name, 0) + 1
+        return info
+
+    def remove(self, tool_name: str) -> bool:
+        """Drop one agent from the index; False if it was not indexed."""
+        with self._lock:
+            if tool_name not in self._records:
+                return False
+            self._unindex(tool_name)
+            del self._records[tool_name]
+            del self._order[tool_name]
+            return True
+
+    def _unindex(self, tool_name: str) -> None:
+        for field, tokens in self._terms.pop(tool_name).items():
+            postings, vocabulary = self._postings[field], self._vocabulary[field]
+            for token in set(tokens):
+                tools = postings[token]
+                tools.pop(tool_name, None)
+                if not tools:
+                    del postings[token]
+                    del vocabulary[bisect.bisect_left(vocabulary, token)]
+
+    def get(self, tool_name: str) -> Optional[Dict[str, Any]]:
+        return self._records.get(tool_name)
+
+    def names(self) -> List[str]:
+        """Tool names in registration order."""
+        with self._lock:
+            return list(self._records)
+
+    def records(self, tool_names: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """Discovery records of ``tool_names`` (every agent for None), skipping unknown names."""
+        with self._lock:
+            names = self.names() if tool_names is None else tool_names
+            return [self._records[name] for name in names if name in self._records]
+
+    def _matches(self, field: str, token: str) -> Iterable[Tuple[str, bool]]:
+        """Indexed tokens of ``field`` equal to or starting with ``token``."""
+        vocabulary = self._vocabulary[field]
+        for i in range(bisect.bisect_left(vocabulary, token), len(vocabulary)):
+            term = vocabulary[i]
+            if not term.startswith(token):
+                break
+            yield term, term == token
+
+    def search(
+        self, query: str, search_fields: Optional[Sequence[str]] = None
+    ) -> List[Tuple[str, float]]:
+        """Rank agents matching every token of ``query``.
+
+        Returns:
+            ``(tool_name, score)`` pairs, best first.
+        """
+        fields = [f for f in (search_fields or DEFAULT_SEARCH_FIELDS) if f in self._postings]
+        tokens = tokenize(query)
+        if not tokens or not fields:
+            return []
+        with self._lock:
+            total = max(len(self._records), 1)
+            scores: Optional[Dict[str, float]] = None
+            for token in dict.fromkeys(tokens):
+                token_scores: Dict[str, float] = {}
+                for field in fields:
+                    weight = FIELD_WEIGHTS[field]
+                    for term, exact in self._matches(field, token):
+                        tools = self._postings[field][term]
+                        idf = math.log(1 + total / len(tools))
+                        gain = weight * idf * (1.0 if exact else PREFIX_MATCH_WEIGHT)
+                        for tool_name in tools:
+                            if scores is None or tool_name in scores:
+                                token_scores[tool_name] = token_scores.get(tool_name, 0.0) + gain
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {name: scores[name] + gain for name, gain in token_scores.items()}
+                if not scores:
+                    return []
+            order = self._order
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], order[item[0]]))
+        return [(name, round(score, 4)) for name, score in ranked]
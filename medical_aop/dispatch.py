@@ -0,0 +1,346 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from medical_aop.cache import ResponseCache
+from medical_aop.coalesce import SingleFlight
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.images import ImageInputError, ImagePipeline
+from medical_aop.metrics import Metrics
+from medical_aop.scheduler import (
+    DeadlineExceeded,
+    FairScheduler,
+    SchedulerRejected,
+    lane_for_priority,
+)
+from medical_aop.sections import StructuredOutput
+from medical_aop.streaming import ChunkCallback, TokenStream
+
+
+class AgentDispatcher:
+    """The per-call pipeline shared by every agent tool.
+
+    Resolves the agent, consults the response cache, streams output when
+    the caller asked for it and runs the call on the executor. ``agents``
+    and ``tool_configs`` are the server's registries; any config object
+    with ``timeout`` and ``max_retries`` attributes works.
+
+    Args:
+        executor: Executor running the agent calls.
+        agents: Mapping of tool name to agent.
+        tool_configs: Mapping of tool name to tool config.
+        response_cache: Optional response cache.
+        cached_agents: Tool names the cache applies to (None for all).
+        streaming_agents: Tool names that stream output (None for all).
+        stream_mode: ``"sections"`` or ``"tokens"``.
+        scheduler: Optional admission control and fair ordering of calls.
+        agent_lanes: Default scheduler lane per tool name for calls that
+            carry no explicit priority (``"normal"`` otherwise).
+        metrics: Optional per-stage instrumentation (None disables it).
+        single_flight: Optional coalescing of identical concurrent calls
+            into one execution.
+        structured_output: Optional parsing of responses into typed
+            SECTION records, added as ``response["structured"]``.
+        image_pipeline: Optional preprocessing of ``img``/``imgs`` into
+            deduplicated, downscaled data URIs before the agent runs.
+    """
+
+    def __init__(
+        self,
+        executor: AsyncAgentExecutor,
+        agents: Optional[Dict[str, Any]] = None,
+        tool_configs: Optional[Dict[str, Any]] = None,
+        response_cache: Optional[ResponseCache] = None,
+        cached_agents: Optional[List[str]] = None,
+        streaming_agents: Optional[List[str]] = None,
+        stream_mode: str = "sections",
+        scheduler: Optional[FairScheduler] = None,
+        agent_lanes: Optional[Dict[str, str]] = None,
+        metrics: Optional[Metrics] = None,
+        single_flight: Optional[SingleFlight] = None,
+        structured_output: Optional[StructuredOutput] = None,
+        image_pipeline: Optional[ImagePipeline] = None,
+    ):
+        self.executor = executor
+        self.agents = agents if agents is not None else {}
+        self.tool_configs = tool_configs if tool_configs is not None else {}
+        self.response_cache = response_cache
+        self.cached_agents = set(cached_agents) if cached_agents else None
+        self.streaming_agents = (
+            set(streaming_agents) if streaming_agents is not None else None
+        )
+        self.stream_mode = stream_mode
+        self.scheduler = scheduler
+        self.agent_lanes = dict(agent_lanes or {})
+        self.metrics = metrics
+        self.single_flight = single_flight
+        self.structured_output = structured_output
+        self.image_pipeline = image_pipeline
+
+    def is_cached(self, tool_name: str) -> bool:
+        return self.response_cache is not None and (
+            self.cached_agents is None or tool_name in self.cached_agents
+        )
+
+    def is_streamed(self, tool_name: str) -> bool:
+        return self.streaming_agents is None or tool_name in self.streaming_agents
+
+    def is_structured(self, tool_name: str) -> bool:
+        return self.structured_output is not None and self.structured_output.applies_to(
+            tool_name
+        )
+
+    async def dispatch(
+        self,
+        tool_name: str,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        max_retries: Optional[int] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        tenant: str = "default",
+        priority: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Run one call against a registered agent and return the tool response.
+
+        Args:
+            on_chunk: Optional coroutine receiving output chunks as they are
+                produced; only used for agents in ``streaming_agents``.
+            tenant: Tenant the call is accounted to by the scheduler.
+            priority: Task priority; above 0 is red-flag, below 0 is bulk.
+            timeout: Client-side timeout in seconds. A call still queued when
+                it expires is dropped (defaults to the tool timeout).
+        """
+        call = self._run_call(
+            tool_name,
+            task,
+            img,
+            imgs,
+            correct_answer,
+            max_retries,
+            on_chunk,
+            tenant,
+            priority,
+            timeout,
+        )
+        if self.is_structured(tool_name):
+            call = self._with_structured(tool_name, call)
+        metrics = self.metrics
+        if metrics is None:
+            return await call
+        metrics.in_flight.inc((tool_name,), 1)
+        status = "error"
+        try:
+            with metrics.span(tool_name, "total"):
+                response = await call
+            status = _status(response)
+            return response
+        finally:
+            metrics.in_flight.inc((tool_name,), -1)
+            metrics.requests.inc((tool_name, status))
+
+    async def _run_call(
+        self,
+        tool_name: str,
+        task: str,
+        img: Optional[str],
+        imgs: Optional[List[str]],
+        correct_answer: Optional[str],
+        max_retries: Optional[int],
+        on_chunk: Optional[ChunkCallback],
+        tenant: str,
+        priority: Optional[int],
+        timeout: Optional[float],
+    ) -> Dict[str, Any]:
+        arrived = time.monotonic()
+        metrics = self.metrics
+        agent = self.agents.get(tool_name)
+        if agent is None:
+            return {
+                "result": "",
+                "success": False,
+                "error": f"Agent '{tool_name}' not found",
+            }
+        if not task:
+            return {"result": "", "success": False, "error": "No task provided"}
+
+        config = self.tool_configs[tool_name]
+        # Cache and coalescing keys name images by content, not by path.
+        ref_img, ref_imgs = img, imgs
+        if (img or imgs) and self.image_pipeline is not None and self.image_pipeline.applies_to(
+            tool_name
+        ):
+            prep_start = time.perf_counter()
+            try:
+                img, imgs, ref_img, ref_imgs = await self.image_pipeline.prepare(img, imgs)
+            except ImageInputError as exc:
+                return {"result": "", "success": False, "error": str(exc)}
+            if metrics is not None:
+                metrics.observe(tool_name, "image_prep", time.perf_counter() - prep_start)
+
+        cache_key = None
+        if self.is_cached(tool_name):
+            lookup_start = time.perf_counter()
+            cache_key = self.response_cache.key_for(
+                agent, task, ref_img, ref_imgs, correct_answer
+            )
+            cached = self.response_cache.get(tool_name, cache_key)
+            if metrics is not None:
+                metrics.observe(
+                    tool_name, "cache_lookup", time.perf_counter() - lookup_start
+                )
+                metrics.cache_lookups.inc(
+                    (tool_name, "miss" if cached is None else "hit")
+                )
+            if cached is not None:
+                if on_chunk is not None and self.is_streamed(tool_name):
+                    await on_chunk(cached)
+                return {"result": cached, "success": True, "error": None}
+
+        budget = config.timeout if timeout is None else min(timeout, config.timeout)
+
+        def remaining(limit: float) -> float:
+            return max(limit - (time.monotonic() - arrived), 0.001)
+
+        flight_key = None
+        if self.single_flight is not None and self.single_flight.applies_to(tool_name):
+            flight_key = self.single_flight.key_for(
+                tool_name, task, ref_img, ref_imgs, correct_answer
+            )
+            joined = await self.single_flight.join(flight_key, tool_name, remaining(budget))
+            if joined is not None:
+                if metrics is not None:
+                    metrics.coalesced.inc((tool_name,))
+                if on_chunk is not None and self.is_streamed(tool_name) and joined["success"]:
+                    await on_chunk(joined["result"])
+                return joined
+
+        stream = None
+        pump = None
+        if on_chunk is not None and self.is_streamed(tool_name):
+            # Streamed output is parsed as it arrives rather than at the end.
+            parser = (
+                self.structured_output.parser(tool_name, agent)
+                if self.is_structured(tool_name)
+                else None
+            )
+            stream = TokenStream(on_chunk, mode=self.stream_mode, parser=parser)
+            pump = asyncio.ensure_future(stream.pump())
+
+        # A shared execution may outlive its first caller's budget for
+        # callers that joined with a longer one.
+        run_budget = config.timeout if flight_key is not None else budget
+
+        async def execute() -> Dict[str, Any]:
+            # Time spent queued comes out of the caller's budget.
+            now = time.monotonic()
+            call = self.executor.execute(
+                tool_name,
+                agent,
+                task,
+                remaining(run_budget),
+                img=img,
+                imgs=imgs,
+                correct_answer=correct_answer,
+                max_retries=(
+                    config.max_retries if max_retries is None else max_retries
+                ),
+                streaming_callback=stream.push if stream is not None else None,
+            )
+            if metrics is None:
+                return await call
+            if self.scheduler is not None:
+                metrics.observe(tool_name, "queue_wait", now - arrived)
+            with metrics.span(tool_name, "agent_run"):
+                return await call
+
+        async def run() -> Dict[str, Any]:
+            if self.scheduler is None:
+                response = await execute()
+            else:
+                response = await self._schedule(
+                    execute, tool_name, tenant, priority, arrived + run_budget
+                )
+            if cache_key is not None and response["success"]:
+                self.response_cache.set(agent, cache_key, response["result"])
+            return response
+
+        try:
+            if flight_key is None:
+                response = await run()
+            else:
+                response = await self.single_flight.run(
+                    flight_key,
+                    tool_name,
+                    run,
+                    remaining(budget) if budget < run_budget else None,
+                )
+        except BaseException:
+            if pump is not None:
+                pump.cancel()
+            raise
+        if stream is not None:
+            # Agents that ignore the callback still deliver their output
+            # as chunks once it is complete.
+            flush_start = time.perf_counter()
+            stream.close(final_text=response["result"] if response["success"] else None)
+            await pump
+            if stream.parser is not None and response["success"]:
+                response["structured"] = stream.parser.close()
+            if metrics is not None:
+                metrics.observe(
+                    tool_name, "stream_flush", time.perf_counter() - flush_start
+                )
+        return response
+
+    async def _with_structured(
+        self, tool_name: str, call: Awaitable[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        response = await call
+        if response["success"] and "structured" not in response:
+            start = time.perf_counter()
+            response["structured"] = self.structured_output.parse(
+                tool_name, self.agents.get(tool_name), response["result"]
+            )
+            if self.metrics is not None:
+                self.metrics.observe(tool_name, "parse", time.perf_counter() - start)
+        return response
+
+    async def _schedule(
+        self,
+        execute: Callable[[], Awaitable[Dict[str, Any]]],
+        tool_name: str,
+        tenant: str,
+        priority: Optional[int],
+        deadline: float,
+    ) -> Dict[str, Any]:
+        lane = lane_for_priority(priority, self.agent_lanes.get(tool_name, "normal"))
+        try:
+            return await self.scheduler.run(
+                execute, tenant=tenant, lane=lane, deadline=deadline
+            )
+        except SchedulerRejected as e:
+            return {
+                "result": "",
+                "success": False,
+                "error": f"429 Too Many Requests: {e}",
+            }
+        except DeadlineExceeded as e:
+            return {
+                "result": "",
+                "success": False,
+                "error": f"504 Gateway Timeout: {e}",
+            }
+
+
+def _status(response: Dict[str, Any]) -> str:
+    if response["success"]:
+        return "success"
+    error = response["error"] or ""
+    if error.startswith(("429", "503")):
+        return "rejected"
+    if error.startswith("504"):
+        return "dropped"
+    return "error"
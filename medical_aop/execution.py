@@ -0,0 +1,385 @@
+import asyncio
+import contextvars
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from medical_aop.lazy import fresh_conversation
+from medical_aop.metrics import Metrics
+from medical_aop.resilience import Resilience
+
+
+def _has_native_arun(agent: Any) -> bool:
+    """Return True when the agent exposes its own coroutine ``arun``.
+
+    The stock swarms ``Agent.arun`` only wraps ``run`` in
+    ``asyncio.to_thread`` on the loop's small default executor, so for
+    those agents we dispatch ``run`` onto our own pool instead.
+    """
+    arun = getattr(type(agent), "arun", None)
+    if arun is None or not asyncio.iscoroutinefunction(arun):
+        return False
+    # Looked up lazily: only an already imported swarms can own the agent.
+    swarms_agent = getattr(sys.modules.get("swarms"), "Agent", None)
+    if swarms_agent is not None and arun is getattr(swarms_agent, "arun", None):
+        return False
+    return True
+
+
+class AgentSaturatedError(RuntimeError):
+    """Every concurrency slot of an agent is held by a call its caller gave up on.
+
+    Carries a 503 status, so the circuit breaker counts it as a backend
+    failure.
+    """
+
+    status_code = 503
+
+    def __init__(self, tool_name: str, slots: int):
+        self.tool_name = tool_name
+        super().__init__(
+            f"503 Agent {tool_name} has all {slots} slots held by calls that "
+            "timed out and are still running"
+        )
+
+
+def _shares_conversation(agent: Any) -> bool:
+    """Return True for a single stateful agent that must run one call at a time.
+
+    A swarms ``Agent`` sends its whole ``short_memory`` to the model on
+    every run, so concurrent calls on one instance would read each other's
+    tasks. A ``LazyAgent`` hands each call its own instance (``spawn``).
+    """
+    return getattr(type(agent), "spawn", None) is None and hasattr(agent, "short_memory")
+
+
+class AsyncAgentExecutor:
+    """Non-blocking execution path for agent tools.
+
+    Every call is awaited on the event loop: agents with a native async
+    ``arun`` are awaited directly, synchronous agents run on a dedicated
+    thread pool. A per-agent semaphore bounds the number of concurrent
+    LLM calls and each call, waiting for its slot included, is wrapped in
+    its tool's timeout. Once every slot of an agent is held by a call that
+    already timed out (a hung LLM request on a thread that cannot be
+    interrupted), further calls fail at once with ``AgentSaturatedError``
+    instead of waiting. A stateful agent that cannot hand each call its own
+    instance runs one call at a time, each on a fresh conversation.
+
+    Args:
+        max_concurrency_per_agent: Maximum in-flight calls per agent.
+        max_threads: Size of the thread pool used for synchronous agents.
+        retry_delay: Delay in seconds between retries of a failed call.
+        metrics: Optional instrumentation; counts retries.
+        resilience: Optional adaptive timeouts, hedging and circuit
+            breaking around each attempt (see ``Resilience``).
+        already_retried: Optional check for errors a lower layer has
+            already retried (``SharedLLMClient.already_retried``); those
+            are raised without another tool-level retry.
+    """
+
+    def __init__(
+        self,
+        max_concurrency_per_agent: int = 32,
+        max_threads: int = 64,
+        retry_delay: float = 1.0,
+        metrics: Optional[Metrics] = None,
+        resilience: Optional[Resilience] = None,
+        already_retried: Optional[Callable[[BaseException], bool]] = None,
+    ):
+        self.max_concurrency_per_agent = max_concurrency_per_agent
+        self.max_threads = max_threads
+        self.retry_delay = retry_delay
+        self.metrics = metrics
+        self.resilience = resilience
+        self.already_retried = already_retried
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._threads = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="agent-exec"
+        )
+        self._in_flight: Dict[str, int] = {}
+        self._limits: Dict[str, int] = {}
+        # Calls still running after their caller timed out or gave up.
+        self._stuck: Dict[str, int] = {}
+
+    def _semaphore(self, tool_name: str, agent: Any) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(tool_name)
+        if semaphore is None:
+            limit = 1 if _shares_conversation(agent) else self.max_concurrency_per_agent
+            semaphore = asyncio.Semaphore(limit)
+            self._semaphores[tool_name] = semaphore
+            self._limits[tool_name] = limit
+        return semaphore
+
+    def _start(
+        self,
+        agent: Any,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+        on_done: Optional[Callable[[], None]] = None,
+    ) -> "asyncio.Future[Any]":
+        """Start one agent call and return the future of its result.
+
+        ``on_done`` runs on the loop once the agent has really stopped.
+        Cancelling the future stops a native ``arun`` right away, but a
+        synchronous ``run`` already on its thread finishes regardless, so
+        ``on_done`` waits for it.
+        """
+        kwargs = {
+            "task": task,
+            "img": img,
+            "imgs": imgs,
+            "correct_answer": correct_answer,
+        }
+        if streaming_callback is not None:
+            kwargs["streaming_callback"] = streaming_callback
+        loop = asyncio.get_running_loop()
+        if _shares_conversation(agent):
+            # Serialized by its one-slot semaphore, so nothing else is running.
+            fresh_conversation(agent)
+        if _has_native_arun(agent):
+            future = asyncio.ensure_future(agent.arun(**kwargs))
+            if on_done is not None:
+                future.add_done_callback(lambda _: on_done())
+            return future
+        # Carry the caller's context into the thread so spans opened by
+        # instrumented agents nest under the tool call.
+        thread_future = self._threads.submit(
+            partial(contextvars.copy_context().run, agent.run, **kwargs)
+        )
+        if on_done is not None:
+
+            def finished(_: Any) -> None:
+                try:
+                    loop.call_soon_threadsafe(on_done)
+                except RuntimeError:
+                    # The loop is gone; nothing is left to release.
+                    pass
+
+            thread_future.add_done_callback(finished)
+        return asyncio.wrap_future(thread_future, loop=loop)
+
+    async def _limited(
+        self,
+        tool_name: str,
+        agent: Any,
+        start: Callable[[Callable[[], None]], Awaitable[Any]],
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run ``start(on_done)`` under the agent's concurrency limit.
+
+        ``timeout`` covers waiting for a slot and the call together. The
+        slot and the in-flight count are held until ``on_done`` reports
+        that the agent stopped, not just until this call returns, so a
+        timed-out or hedged-against synchronous call still counts against
+        the limit while its thread runs.
+
+        Raises:
+            asyncio.TimeoutError: If no slot freed up and the call finished
+                within ``timeout`` seconds.
+            AgentSaturatedError: If every slot is held by a call that was
+                given up on but is still running.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        semaphore = self._semaphore(tool_name, agent)
+        if self._stuck.get(tool_name, 0) >= self._limits[tool_name]:
+            raise AgentSaturatedError(tool_name, self._limits[tool_name])
+        await asyncio.wait_for(semaphore.acquire(), timeout)
+        self._in_flight[tool_name] = self._in_flight.get(tool_name, 0) + 1
+        finished = abandoned = False
+
+        def release() -> None:
+            nonlocal finished
+            finished = True
+            self._in_flight[tool_name] -= 1
+            if abandoned:
+                self._stuck[tool_name] -= 1
+            semaphore.release()
+
+        try:
+            call = start(release)
+        except BaseException:
+            release()
+            raise
+        try:
+            return await asyncio.wait_for(
+                call, None if deadline is None else max(deadline - loop.time(), 0)
+            )
+        except BaseException:
+            if not finished:
+                abandoned = True
+                self._stuck[tool_name] = self._stuck.get(tool_name, 0) + 1
+            raise
+
+    def _retried_below(self, error: BaseException) -> bool:
+        return self.already_retried is not None and self.already_retried(error)
+
+    async def run_agent(
+        self,
+        tool_name: str,
+        agent: Any,
+        task: str,
+        timeout: float,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        max_retries: int = 0,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+    ) -> Any:
+        """Run one agent call under its concurrency limit and timeout.
+
+        Streamed calls are never retried, since the caller has already
+        received part of the output. With ``resilience`` set, ``timeout``
+        bounds the whole call, retries included.
+
+        Raises:
+            TimeoutError: If a single attempt, waiting for its concurrency
+                slot included, exceeds ``timeout`` seconds.
+            CircuitOpenError: If the agent's backend is shedding calls.
+            AgentSaturatedError: If every slot of the agent is held by a
+                timed-out call that is still running.
+            Exception: The last error raised by the agent once retries
+                are exhausted.
+        """
+        start = partial(
+            self._start,
+            agent,
+            task,
+            img,
+            imgs,
+            correct_answer,
+            streaming_callback,
+        )
+        if self.resilience is not None:
+            return await self._run_resilient(
+                tool_name,
+                agent,
+                timeout,
+                max_retries,
+                start,
+                streamed=streaming_callback is not None,
+            )
+        attempt = 0
+        while True:
+            try:
+                return await self._limited(tool_name, agent, start, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Agent {tool_name} timed out after {timeout}s")
+            except Exception as e:
+                if (
+                    attempt >= max_retries
+                    or streaming_callback is not None
+                    or self._retried_below(e)
+                ):
+                    raise
+                logger.warning(
+                    f"Agent {tool_name} failed (attempt {attempt + 1}/{max_retries + 1}): {e}"
+                )
+                if self.metrics is not None:
+                    self.metrics.retries.inc((tool_name,))
+            attempt += 1
+            await asyncio.sleep(self.retry_delay)
+
+    async def _run_resilient(
+        self,
+        tool_name: str,
+        agent: Any,
+        timeout: float,
+        max_retries: int,
+        start: Callable[..., Awaitable[Any]],
+        streamed: bool,
+    ) -> Any:
+        resilience = self.resilience
+        backend = resilience.backend_for(tool_name, agent)
+        semaphore = self._semaphore(tool_name, agent)
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        while True:
+            resilience.admit(tool_name, backend)
+            attempt_timeout = resilience.attempt_timeout(
+                tool_name, deadline - time.monotonic()
+            )
+            try:
+                return await resilience.attempt(
+                    tool_name,
+                    backend,
+                    partial(self._limited, tool_name, agent, start),
+                    attempt_timeout,
+                    hedge=not streamed,
+                    saturated=semaphore.locked,
+                )
+            except Exception as e:
+                if isinstance(e, asyncio.TimeoutError):
+                    e = TimeoutError(
+                        f"Agent {tool_name} timed out after {attempt_timeout:.1f}s"
+                    )
+                left = deadline - time.monotonic() - self.retry_delay
+                if (
+                    attempt >= max_retries
+                    or streamed
+                    or left < resilience.min_timeout
+                    or resilience.circuit_open(backend)
+                    or self._retried_below(e)
+                ):
+                    raise e
+                logger.warning(
+                    f"Agent {tool_name} failed (attempt {attempt + 1}/{max_retries + 1}): {e}"
+                )
+                if self.metrics is not None:
+                    self.metrics.retries.inc((tool_name,))
+            attempt += 1
+            await asyncio.sleep(self.retry_delay)
+
+    async def execute(
+        self,
+        tool_name: str,
+        agent: Any,
+        task: str,
+        timeout: float,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        max_retries: int = 0,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """Execute an agent call and wrap it in the standard tool response."""
+        start_time = time.perf_counter()
+        try:
+            result = await self.run_agent(
+                tool_name,
+                agent,
+                task,
+                timeout,
+                img=img,
+                imgs=imgs,
+                correct_answer=correct_answer,
+                max_retries=max_retries,
+                streaming_callback=streaming_callback,
+            )
+            logger.debug(
+                f"Agent {tool_name} completed in {time.perf_counter() - start_time:.3f}s"
+            )
+            return {"result": str(result), "success": True, "error": None}
+        except Exception as e:
+            logger.error(f"Error executing agent {tool_name}: {e}")
+            return {"result": "", "success": False, "error": str(e)}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the in-flight calls per agent, and those already given up on."""
+        return {
+            "max_concurrency_per_agent": self.max_concurrency_per_agent,
+            "max_threads": self.max_threads,
+            "in_flight": dict(self._in_flight),
+            "stuck": {name: n for name, n in self._stuck.items() if n},
+        }
+
+    def shutdown(self) -> None:
+        self._threads.shutdown(wait=False, cancel_futures=True)
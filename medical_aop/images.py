@@ -0,0 +1,384 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import httpx
+from loguru import logger
+
+# Anthropic downsamples images whose long edge exceeds this, so larger
+# uploads only cost bandwidth and encode time.
+DEFAULT_MAX_EDGE = 1568
+READ_CHUNK = 1 << 20
+# Formats the model APIs accept as-is.
+_PASSTHROUGH = {"image/png", "image/jpeg", "image/gif", "image/webp"}
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+_BASE64 = frozenset(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/=\n\r")
+
+Buffer = Union[bytes, mmap.mmap, IO[bytes]]
+
+
+class ImageInputError(ValueError):
+    """An ``img``/``imgs`` entry cannot be read or is not an image."""
+
+
+class PreparedImages(NamedTuple):
+    """Model-ready images plus content references for cache keys."""
+
+    img: Optional[str]
+    imgs: Optional[List[str]]
+    ref_img: Optional[str]
+    ref_imgs: Optional[List[str]]
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """MIME type from an image's leading bytes (None if unrecognized)."""
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    return None
+
+
+def _head(buffer: Buffer, size: int = 16) -> bytes:
+    if isinstance(buffer, (bytes, mmap.mmap)):
+        return bytes(buffer[:size])
+    buffer.seek(0)
+    head = buffer.read(size)
+    buffer.seek(0)
+    return head
+
+
+class ImagePipeline:
+    """Content-addressed preprocessing of agent image inputs.
+
+    Each ``img``/``imgs`` entry (local path, ``file://`` URI, data URI or
+    raw base64; ``http(s)`` URLs too with ``fetch_urls``) becomes a
+    model-ready data URI before the agent runs, so the agent no longer
+    re-reads and re-encodes it on every call:
+
+    - Local files, read only under ``allowed_roots``, are memory-mapped
+      and hashed without copying them into Python memory; a file whose
+      path, size and mtime are unchanged is not hashed again. URLs are streamed to a spooled temporary file.
+    - The content hash keys a bounded LRU of finished encodings, so an
+      image seen before (under any name) is never decoded again, and the
+      same image in flight for two requests is encoded once.
+    - Images larger than ``max_edge`` are downscaled (16-bit grayscale,
+      as exported from DICOM, is reduced to 8-bit) and re-encoded as
+      ``image_format``; smaller images in a model-supported format are
+      passed through byte for byte. Downscaling needs Pillow; without it
+      images are passed through unchanged.
+    - The images of one request are prepared in parallel on a thread pool
+      (hashing, zlib and Pillow's resampling release the GIL).
+
+    Args:
+        agents: Tool names whose image inputs are prepared (None for all).
+        max_edge: Longest edge in pixels sent to the model.
+        image_format: Re-encoding format, ``"PNG"`` (lossless) or ``"JPEG"``.
+        jpeg_quality: Quality when ``image_format`` is ``"JPEG"``.
+        cache_max_bytes: Budget for cached encodings (data URI characters).
+        max_workers: Threads preparing images.
+        fetch_urls: Download ``http(s)`` images here instead of passing
+            the URL on to the model provider.
+        max_download_bytes: Largest accepted download.
+        allowed_roots: Directories local paths may be read from, e.g. an
+            upload directory. Paths are resolved (symlinks included)
+            before the check; with None no local file is read.
+    """
+
+    def __init__(
+        self,
+        agents: Optional[List[str]] = None,
+        max_edge: int = DEFAULT_MAX_EDGE,
+        image_format: str = "PNG",
+        jpeg_quality: int = 90,
+        cache_max_bytes: int = 256 * 2**20,
+        max_workers: int = 4,
+        fetch_urls: bool = False,
+        max_download_bytes: int = 64 * 2**20,
+        allowed_roots: Optional[List[str]] = None,
+    ):
+        self.agents = set(agents) if agents is not None else None
+        self.max_edge = max_edge
+        self.image_format = image_format.upper()
+        self.jpeg_quality = jpeg_quality
+        self.cache_max_bytes = cache_max_bytes
+        self.fetch_urls = fetch_urls
+        self.max_download_bytes = max_download_bytes
+        self.allowed_roots = [os.path.realpath(root) for root in allowed_roots or []]
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="aop-images")
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cache_bytes = 0
+        self._pending: Dict[str, "Future[str]"] = {}
+        # (realpath, size, mtime_ns) -> content digest.
+        self._file_digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+        self._stats = {
+            "images": 0,
+            "cache_hits": 0,
+            "deduplicated": 0,
+            "encoded": 0,
+            "resized": 0,
+            "passed_through": 0,
+            "evictions": 0,
+            "bytes_hashed": 0,
+            "file_digest_hits": 0,
+        }
+        try:
+            from PIL import Image
+        except ImportError:
+            logger.warning("Pillow is not installed; images are passed through without downscaling")
+            Image = None
+        self._image = Image
+
+    def applies_to(self, tool_name: str) -> bool:
+        return self.agents is None or tool_name in self.agents
+
+    async def prepare(
+        self, img: Optional[str] = None, imgs: Optional[List[str]] = None
+    ) -> PreparedImages:
+        """Prepare a request's images concurrently on the worker pool.
+
+        Raises:
+            ImageInputError: If an entry cannot be read or is not an image.
+        """
+        loop = asyncio.get_running_loop()
+        sources = ([img] if img else []) + list(imgs or [])
+        prepared = await asyncio.gather(
+            *(loop.run_in_executor(self._pool, self.prepare_one, source) for source in sources)
+        )
+        uris = [uri for uri, _ in prepared]
+        refs = [ref for _, ref in prepared]
+        if img:
+            return PreparedImages(uris[0], uris[1:] if imgs else imgs, refs[0], refs[1:] if imgs else imgs)
+        return PreparedImages(img, uris if imgs else imgs, img, refs if imgs else imgs)
+
+    def prepare_one(self, source: str) -> Tuple[str, str]:
+        """Prepare one image synchronously.
+
+        Returns:
+            ``(data_uri, ref)``; ``ref`` names the content and settings
+            (``"sha256:..."``), or is the source itself when it is passed on.
+        """
+        with self._lock:
+            self._stats["images"] += 1
+        if source.startswith(("http://", "https://")) and not self.fetch_urls:
+            return source, source
+        with self._open(source) as (digest, buffer):
+            key = f"sha256:{digest}:{self.max_edge}:{self.image_format}"
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    self._stats["cache_hits"] += 1
+                    return cached, key
+                pending = self._pending.get(key)
+                if pending is None:
+                    self._pending[key] = pending = Future()
+                    owner = True
+                else:
+                    self._stats["deduplicated"] += 1
+                    owner = False
+            if not owner:
+                return pending.result(), key
+            try:
+                uri = self._encode(buffer)
+            except Exception as exc:
+                pending.set_exception(exc)
+                raise
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+            self._store(key, uri)
+            pending.set_result(uri)
+            return uri, key
+
+    @contextmanager
+    def _open(self, source: str) -> Iterator[Tuple[str, Buffer]]:
+        if source.startswith("data:"):
+            header, _, payload = source.partition(",")
+            if ";base64" not in header:
+                raise ImageInputError("Only base64 data URIs are supported")
+            data = self._b64decode(payload)
+            yield self._digest(data), data
+        elif source.startswith(("http://", "https://")):
+            with self._download(source) as (digest, spooled):
+                yield digest, spooled
+        else:
+            path = source[7:] if source.startswith("file://") else source
+            real = os.path.realpath(path)
+            allowed = self._allowed(real)
+            if not allowed or not os.path.isfile(real):
+                if len(source) > 256 and set(source[:256].encode()) <= _BASE64:
+                    data = self._b64decode(source)
+                    yield self._digest(data), data
+                    return
+                if not allowed:
+                    raise ImageInputError(
+                        f"Image path is outside the allowed directories: {source[:200]}"
+                    )
+                raise ImageInputError(f"Image not found: {source[:200]}")
+            with self._map(real) as (digest, mapped):
+                yield digest, mapped
+
+    def _allowed(self, real: str) -> bool:
+        return any(
+            real == root or real.startswith(root.rstrip(os.sep) + os.sep)
+            for root in self.allowed_roots
+        )
+
+    @staticmethod
+    def _b64decode(payload: str) -> bytes:
+        try:
+            return base64.b64decode(payload, validate=False)
+        except (binascii.Error, ValueError) as exc:
+            raise ImageInputError(f"Invalid base64 image data: {exc}") from exc
+
+    def _digest(self, data: Any) -> str:
+        with self._lock:
+            self._stats["bytes_hashed"] += len(data)
+        return hashlib.sha256(data).hexdigest()
+
+    @contextmanager
+    def _map(self, path: str) -> Iterator[Tuple[str, Buffer]]:
+        real = os.path.realpath(path)
+        with open(real, "rb") as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                raise ImageInputError(f"Image is empty: {path}")
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                identity = (real, stat.st_size, stat.st_mtime_ns)
+                with self._lock:
+                    digest = self._file_digests.get(identity)
+                    if digest is not None:
+                        self._file_digests.move_to_end(identity)
+                        self._stats["file_digest_hits"] += 1
+                if digest is None:
+                    digest = self._digest(mapped)
+                    with self._lock:
+                        self._file_digests[identity] = digest
+                        if len(self._file_digests) > 4096:
+                            self._file_digests.popitem(last=False)
+                yield digest, mapped
+            finally:
+                mapped.close()
+
+    @contextmanager
+    def _download(self, url: str) -> Iterator[Tuple[str, Buffer]]:
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.SpooledTemporaryFile(max_size=8 * 2**20) as spooled:
+            try:
+                with httpx.stream("GET", url, follow_redirects=True, timeout=30) as response:
+                    response.raise_for_status()
+                    for chunk in response.iter_bytes(READ_CHUNK):
+                        size += len(chunk)
+                        if size > self.max_download_bytes:
+                            raise ImageInputError(
+                                f"Image larger than {self.max_download_bytes} bytes: {url[:200]}"
+                            )
+                        hasher.update(chunk)
+                        spooled.write(chunk)
+            except httpx.HTTPError as exc:
+                raise ImageInputError(f"Could not fetch image {url[:200]}: {exc}") from exc
+            with self._lock:
+                self._stats["bytes_hashed"] += size
+            spooled.seek(0)
+            yield hasher.hexdigest(), spooled
+
+    def _encode(self, buffer: Buffer) -> str:
+        mime = sniff_mime(_head(buffer))
+        Image = self._image
+        if Image is None:
+            if mime not in _PASSTHROUGH:
+                raise ImageInputError(f"Unsupported image format: {mime or 'unknown'}")
+            return self._passthrough(buffer, mime)
+        try:
+            image = Image.open(buffer if not isinstance(buffer, bytes) else io.BytesIO(buffer))
+        except Exception as exc:
+            raise ImageInputError(f"Not a readable image: {exc}") from exc
+        wide = image.mode in ("I", "I;16", "I;16B", "I;16L", "F")
+        if mime in _PASSTHROUGH and max(image.size) <= self.max_edge and not wide:
+            return self._passthrough(buffer, mime)
+        if image.format == "JPEG":
+            # Let the decoder skip detail that would be thrown away.
+            image.draft(image.mode, (self.max_edge, self.max_edge))
+        if wide:
+            # 16-bit / float grayscale: the model sees 8 bits per channel.
+            image = image.convert("I").point(lambda value: value * (1 / 256)).convert("L")
+        if max(image.size) > self.max_edge:
+            image.thumbnail((self.max_edge, self.max_edge), reducing_gap=2.0)
+            with self._lock:
+                self._stats["resized"] += 1
+        out = io.BytesIO()
+        if self.image_format == "JPEG":
+            if image.mode not in ("L", "RGB"):
+                image = image.convert("RGB")
+            image.save(out, "JPEG", quality=self.jpeg_quality)
+            mime = "image/jpeg"
+        else:
+            image.save(out, "PNG", compress_level=1)
+            mime = "image/png"
+        with self._lock:
+            self._stats["encoded"] += 1
+        return f"data:{mime};base64,{base64.b64encode(out.getbuffer()).decode('ascii')}"
+
+    def _passthrough(self, buffer: Buffer, mime: str) -> str:
+        with self._lock:
+            self._stats["passed_through"] += 1
+        if not isinstance(buffer, (bytes, mmap.mmap)):
+            buffer.seek(0)
+            buffer = buffer.read()
+        return f"data:{mime};base64,{base64.b64encode(buffer).decode('ascii')}"
+
+    def _store(self, key: str, uri: str) -> None:
+        if len(uri) > self.cache_max_bytes:
+            return
+        with self._lock:
+            if key in self._cache:
+                return
+            self._cache[key] = uri
+            self._cache_bytes += len(uri)
+            while self._cache_bytes > self.cache_max_bytes:
+                _, evicted = self._cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+                self._stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Images seen, cache hits, encodes, resizes and cache occupancy."""
+        with self._lock:
+            return {
+                **self._stats,
+                "cached_images": len(self._cache),
+                "cached_bytes": self._cache_bytes,
+                "cache_max_bytes": self.cache_max_bytes,
+                "pillow": self._image is not None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+            self._file_digests.clear()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
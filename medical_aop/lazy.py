@@ -0,0 +1,196 @@
+import socket
+import threading
+import time
+from typing import Any, Callable, Iterable, List, Optional
+
+from loguru import logger
+
+
+class LazyAgent:
+    """Placeholder for a swarms ``Agent`` that is built on first use.
+
+    Holds the constructor arguments, so registration and discovery can read
+    metadata (``agent_name``, ``agent_description``, ``system_prompt``,
+    ``model_name``, ``tags``, ``capabilities``, ...) without importing swarms
+    or creating the model client. The real agent is built, once, on the
+    first ``run`` or the first access to any attribute not in the config,
+    or ahead of time by ``build()``.
+
+    A swarms ``Agent`` keeps one conversation that each ``run`` appends to
+    and sends to the model, so concurrent calls on one instance would see
+    each other's tasks. ``run`` therefore takes an idle instance, builds
+    another from the same config when all are busy, and starts it on a
+    fresh conversation.
+
+    Args:
+        factory: Callable building the agent from the config (defaults to
+            ``swarms.Agent``, imported on first build).
+        **config: Keyword arguments for ``factory``.
+    """
+
+    def __init__(self, factory: Optional[Callable[..., Any]] = None, **config):
+        self._factory = factory
+        self._config = config
+        self._agent = None
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._on_build: List[Callable[[Any], None]] = []
+        self._built: List[Any] = []
+        self._idle: List[Any] = []
+
+    @property
+    def built(self) -> bool:
+        return self._agent is not None
+
+    @property
+    def instances(self) -> int:
+        """Agents built so far: the first one plus those ``spawn`` added."""
+        return len(self._built)
+
+    def _construct(self) -> Any:
+        factory = self._factory
+        if factory is None:
+            from swarms import Agent as factory
+        start_time = time.perf_counter()
+        agent = factory(**self._config)
+        with self._lock:
+            self._built.append(agent)
+            callbacks = list(self._on_build)
+        for callback in callbacks:
+            callback(agent)
+        logger.info(
+            f"Built agent {self._config.get('agent_name')} in "
+            f"{time.perf_counter() - start_time:.2f}s"
+        )
+        return agent
+
+    def build(self) -> Any:
+        """Build the real agent if needed and return it (thread-safe)."""
+        agent = self._agent
+        if agent is not None:
+            return agent
+        with self._build_lock:
+            if self._agent is None:
+                agent = self._construct()
+                with self._lock:
+                    self._idle.append(agent)
+                self._agent = agent
+        return self._agent
+
+    def spawn(self) -> Any:
+        """Build another, independent agent from the same config.
+
+        The ``when_built`` callbacks are applied to it as well.
+        """
+        return self._construct()
+
+    def when_built(self, callback: Callable[[Any], None]) -> None:
+        """Call ``callback(agent)`` once the real agent exists, and on
+        every agent ``spawn`` builds later."""
+        with self._lock:
+            self._on_build.append(callback)
+            built = list(self._built)
+        for agent in built:
+            callback(agent)
+
+    def _checkout(self) -> Any:
+        self.build()
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.spawn()
+
+    def metadata(self, name: str, default: Any = None) -> Any:
+        """Read ``name`` without building: the real agent's value once built,
+        else the config value, else ``default``."""
+        if self._agent is not None:
+            return getattr(self._agent, name, default)
+        return self._config.get(name, default)
+
+    def run(self, *args, **kwargs) -> Any:
+        agent = self._checkout()
+        try:
+            fresh_conversation(agent)
+            return agent.run(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._idle.append(agent)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names not set on the placeholder itself.
+        config = self.__dict__.get("_config")
+        if config is None or name.startswith("__"):
+            raise AttributeError(name)
+        if name in config:
+            return config[name]
+        return getattr(self.build(), name)
+
+    def __repr__(self) -> str:
+        state = "built" if self.built else "not built"
+        return f"LazyAgent({self._config.get('agent_name')!r}, {state})"
+
+
+def fresh_conversation(agent: Any) -> None:
+    """Give a swarms agent an empty conversation (its system prompt only).
+
+    Agents without ``short_memory_init`` are left untouched.
+    """
+    init = getattr(agent, "short_memory_init", None)
+    if callable(init):
+        agent.short_memory = init()
+
+
+def build_agents(agents: Iterable[Any]) -> int:
+    """Build every ``LazyAgent`` in ``agents`` that is not built yet.
+
+    Returns:
+        Number of agents built.
+    """
+    built = 0
+    for agent in agents:
+        if isinstance(agent, LazyAgent) and not agent.built:
+            try:
+                agent.build()
+                built += 1
+            except Exception as e:
+                logger.error(f"Could not build agent {agent.agent_name}: {e}")
+    return built
+
+
+def warm_when_listening(
+    agents: Callable[[], Iterable[Any]],
+    host: str,
+    port: int,
+    timeout: float = 120,
+) -> threading.Thread:
+    """Build lazy agents in the background once ``host:port`` accepts connections.
+
+    Args:
+        agents: Callable returning the agents to warm (read after bind, so
+            agents added late are included).
+        host: Address the server binds.
+        port: Port the server binds.
+        timeout: Give up waiting for the port after this many seconds.
+    """
+    connect_host = "127.0.0.1" if host in ("0.0.0.0", "", "::") else host
+
+    def warm() -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                socket.create_connection((connect_host, port), timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        else:
+            logger.warning(f"Port {port} not listening after {timeout}s; warming anyway")
+        start_time = time.perf_counter()
+        built = build_agents(agents())
+        if built:
+            logger.info(
+                f"Warmed {built} agents in {time.perf_counter() - start_time:.2f}s"
+            )
+
+    thread = threading.Thread(target=warm, name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
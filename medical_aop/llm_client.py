@@ -0,0 +1,443 @@
+import asyncio
+import importlib.util
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+from loguru import logger
+
+# 529 is Anthropic's "overloaded"; the rest are the usual transient statuses.
+RETRY_STATUSES = frozenset({408, 429, 500, 502, 503, 504, 529})
+RATE_LIMIT_STATUSES = frozenset({429, 529})
+# Failures where the request cannot have been processed (or a pooled
+# keep-alive connection was closed by the peer), so a retry is safe.
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+LIMIT_KINDS = ("requests", "tokens", "input-tokens", "output-tokens")
+
+_DURATION = re.compile(
+    r"(?:(?P<h>\d+(?:\.\d+)?)h)?(?:(?P<m>\d+(?:\.\d+)?)m(?!s))?"
+    r"(?:(?P<s>\d+(?:\.\d+)?)s)?(?:(?P<ms>\d+(?:\.\d+)?)ms)?"
+)
+
+
+def _seconds_until(value: Optional[str]) -> Optional[float]:
+    """Parse a reset/retry header: seconds, a duration like ``"1m30s"``,
+    an RFC 3339 timestamp or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    match = _DURATION.fullmatch(value)
+    if match and any(match.groupdict().values()):
+        parts = {k: float(v) for k, v in match.groupdict().items() if v}
+        return (
+            parts.get("h", 0) * 3600
+            + parts.get("m", 0) * 60
+            + parts.get("s", 0)
+            + parts.get("ms", 0) / 1000
+        )
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        return None
+    return max(moment.timestamp() - time.time(), 0.0)
+
+
+def _header_int(headers: httpx.Headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """Process-wide pacing driven by provider rate-limit headers.
+
+    Reads Anthropic (``anthropic-ratelimit-*``) and OpenAI-style
+    (``x-ratelimit-*``) headers plus ``retry-after``. The last reported
+    request budget, less the requests still in flight, is spent locally,
+    so once it runs out every request waits for the reset instead of
+    drawing a 429. A 429/529, or a token limit at zero, pauses every
+    request until ``retry-after`` or the reset.
+    """
+
+    # How often to look again when the budget is spent and no response has
+    # reported the new window yet.
+    poll_interval = 0.05
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pause_until = 0.0
+        self._limit: Optional[int] = None
+        self._remaining: Optional[int] = None
+        self._reset_at: Optional[float] = None
+        self._in_flight = 0
+
+    def acquire(self) -> float:
+        """Take a send slot: 0 when granted, else seconds to wait before asking again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._pause_until:
+                return self._pause_until - now
+            if self._reset_at is not None and now >= self._reset_at:
+                # Window reset: full budget again (unknown without a limit)
+                # until the next response reports the new window.
+                self._remaining = self._limit
+                self._reset_at = None
+            if self._remaining is not None:
+                if self._remaining <= 0:
+                    if self._reset_at is None:
+                        return self.poll_interval
+                    return self._reset_at - now
+                self._remaining -= 1
+            self._in_flight += 1
+            return 0.0
+
+    def release(self) -> None:
+        """Give back a slot whose request got no response."""
+        with self._lock:
+            self._in_flight -= 1
+
+    def update(self, status: int, headers: httpx.Headers) -> Optional[float]:
+        """Learn from a response (and release its slot).
+
+        Returns:
+            The response's ``retry-after`` in seconds, if any.
+        """
+        retry_after = _seconds_until(headers.get("retry-after"))
+        retry_after_ms = headers.get("retry-after-ms")
+        if retry_after_ms:
+            try:
+                retry_after = float(retry_after_ms) / 1000
+            except ValueError:
+                pass
+        pause = retry_after if status in RATE_LIMIT_STATUSES else None
+        budget = None
+        for kind in LIMIT_KINDS:
+            remaining = _header_int(headers, f"anthropic-ratelimit-{kind}-remaining")
+            if remaining is None:
+                remaining = _header_int(headers, f"x-ratelimit-remaining-{kind}")
+            reset = _seconds_until(
+                headers.get(f"anthropic-ratelimit-{kind}-reset")
+                or headers.get(f"x-ratelimit-reset-{kind}")
+            )
+            if remaining is None or reset is None:
+                continue
+            if kind == "requests":
+                limit = _header_int(
+                    headers, "anthropic-ratelimit-requests-limit"
+                ) or _header_int(headers, "x-ratelimit-limit-requests")
+                budget = (remaining, reset, limit)
+            elif remaining <= 0:
+                pause = max(pause or 0.0, reset)
+        with self._lock:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if pause:
+                self._pause_until = max(self._pause_until, now + pause)
+            if budget is not None:
+                remaining, reset, self._limit = budget
+                # Requests still in flight were (mostly) not counted yet.
+                self._remaining = remaining - self._in_flight
+                self._reset_at = now + reset
+        return retry_after
+
+    def paused_for(self) -> float:
+        """Seconds until a new request could be sent."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._pause_until - now
+            if self._remaining is not None and self._remaining <= 0:
+                wait = max(wait, (self._reset_at or now) - now)
+            return max(wait, 0.0)
+
+
+class _PooledTransport(httpx.BaseTransport):
+    def __init__(self, owner: "SharedLLMClient", inner: httpx.BaseTransport):
+        self._owner = owner
+        self._inner = inner
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.read()  # retries need a replayable body
+        attempt = 0
+        while True:
+            waited = 0.0
+            while True:
+                wait = self._owner.rate_limiter.acquire()
+                if not wait:
+                    break
+                waited += wait
+                time.sleep(wait)
+            self._owner._sent(waited)
+            try:
+                response = self._inner.handle_request(request)
+            except RETRY_ERRORS as e:
+                delay = self._owner._after_error(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                self._owner.rate_limiter.release()
+                raise
+            else:
+                delay = self._owner._after_response(response, attempt)
+                if delay is None:
+                    return response
+                response.close()
+            attempt += 1
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self._inner.close()
+
+
+class _AsyncPooledTransport(httpx.AsyncBaseTransport):
+    def __init__(self, owner: "SharedLLMClient", inner: httpx.AsyncBaseTransport):
+        self._owner = owner
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        attempt = 0
+        while True:
+            waited = 0.0
+            while True:
+                wait = self._owner.rate_limiter.acquire()
+                if not wait:
+                    break
+                waited += wait
+                await asyncio.sleep(wait)
+            self._owner._sent(waited)
+            try:
+                response = await self._inner.handle_async_request(request)
+            except RETRY_ERRORS as e:
+                delay = self._owner._after_error(e, attempt)
+                if delay is None:
+                    raise
+            except BaseException:
+                self._owner.rate_limiter.release()
+                raise
+            else:
+                delay = self._owner._after_response(response, attempt)
+                if delay is None:
+                    return response
+                await response.aclose()
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+class SharedLLMClient:
+    """One pooled HTTP client for every agent's LLM calls in this process.
+
+    Keeps a bounded pool of keep-alive connections (HTTP/2 when the ``h2``
+    package is installed), so agents reuse warm TLS connections instead of
+    each holding their own. Requests that fail with a transient status
+    (429, 529, 5xx) or a connection error are retried up to ``max_retries``
+    times with full-jitter exponential backoff, and all requests share one
+    ``RateLimiter`` so a rate limit seen by one agent throttles the others
+    instead of triggering a 429 storm.
+
+    ``install(agent)`` points a swarms agent (or ``LazyAgent``) at the sync
+    client through litellm's ``client`` argument and turns litellm's own
+    retries off; ``async_client`` gives asyncio code the same pool policy.
+    ``already_retried`` tells the executor which errors not to retry again,
+    so a transient failure costs at most ``1 + max_retries`` requests per
+    LLM call instead of that times every retry layer above.
+
+    Args:
+        max_connections: Maximum open connections.
+        max_keepalive_connections: Idle connections kept for reuse.
+        keepalive_expiry: Seconds an idle connection is kept.
+        http2: Negotiate HTTP/2 (falls back to HTTP/1.1 without ``h2``).
+        max_retries: Retries per HTTP request after a transient failure.
+        backoff_base: First retry's maximum delay in seconds.
+        backoff_max: Cap on any single retry delay.
+        timeout: Read timeout in seconds.
+        connect_timeout: Connect timeout in seconds.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 100,
+        keepalive_expiry: float = 30.0,
+        http2: bool = True,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20.0,
+        timeout: float = 600.0,
+        connect_timeout: float = 5.0,
+    ):
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.rate_limiter = RateLimiter()
+        self.client = httpx.Client(
+            transport=_PooledTransport(
+                self, httpx.HTTPTransport(http2=http2, limits=self.limits)
+            ),
+            timeout=self.timeout,
+        )
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._handler = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "connection_errors": 0,
+            "throttled": 0,
+            "throttle_seconds": 0.0,
+        }
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """Async client with the same pool limits, retries and rate limiter.
+
+        Created on first use; use it from a single event loop.
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                transport=_AsyncPooledTransport(
+                    self, httpx.AsyncHTTPTransport(http2=self.http2, limits=self.limits)
+                ),
+                timeout=self.timeout,
+            )
+        return self._async_client
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _sent(self, waited: float) -> None:
+        with self._lock:
+            self._stats["requests"] += 1
+            if waited:
+                self._stats["throttled"] += 1
+                self._stats["throttle_seconds"] += waited
+
+    def _after_response(self, response: httpx.Response, attempt: int) -> Optional[float]:
+        retry_after = self.rate_limiter.update(response.status_code, response.headers)
+        if response.status_code in RATE_LIMIT_STATUSES:
+            with self._lock:
+                self._stats["rate_limited"] += 1
+        if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+            return None
+        with self._lock:
+            self._stats["retries"] += 1
+        # The rate limiter already holds every request until retry-after
+        # or the reset; the jitter spreads the retries out once it lifts.
+        delay = self._backoff(attempt)
+        if retry_after is not None and response.status_code not in RATE_LIMIT_STATUSES:
+            delay += min(retry_after, self.backoff_max)
+        logger.debug(
+            f"LLM request got {response.status_code}; retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+        )
+        return delay
+
+    def _after_error(self, error: Exception, attempt: int) -> Optional[float]:
+        self.rate_limiter.release()
+        with self._lock:
+            self._stats["connection_errors"] += 1
+            if attempt >= self.max_retries:
+                return None
+            self._stats["retries"] += 1
+        logger.debug(f"LLM request failed ({error}); retry {attempt + 1}/{self.max_retries}")
+        return self._backoff(attempt)
+
+    def already_retried(self, error: BaseException) -> bool:
+        """Whether ``error`` is a failure this client has already retried.
+
+        Walks the cause chain, since litellm wraps the HTTP error.
+        """
+        if self.max_retries <= 0:
+            return False
+        seen = set()
+        while error is not None and id(error) not in seen:
+            seen.add(id(error))
+            if isinstance(error, RETRY_ERRORS):
+                return True
+            status = getattr(error, "status_code", None)
+            if status is None:
+                status = getattr(getattr(error, "response", None), "status_code", None)
+            if status in RETRY_STATUSES:
+                return True
+            error = error.__cause__ or error.__context__
+        return False
+
+    def litellm_handler(self) -> Any:
+        """litellm ``HTTPHandler`` wrapping the shared sync client."""
+        if self._handler is None:
+            from litellm.llms.custom_httpx.http_handler import HTTPHandler
+
+            self._handler = HTTPHandler(client=self.client)
+        return self._handler
+
+    def install(self, agent: Any) -> Any:
+        """Route a swarms agent's LLM calls through the shared client.
+
+        Sets litellm's ``client`` in the agent's ``llm_args`` and on its
+        already built LiteLLM wrapper, with litellm's ``retries`` at 0 since
+        this client retries. A ``LazyAgent`` is wired up when it is built;
+        agents without ``llm_args`` (custom ``llm=`` objects, stubs) are
+        left untouched.
+        """
+        if getattr(type(agent), "when_built", None) is not None:
+            agent.when_built(self.install)
+            return agent
+        if not hasattr(agent, "llm_args"):
+            return agent
+        handler = self.litellm_handler()
+        agent.llm_args = {**(agent.llm_args or {}), "client": handler, "retries": 0}
+        init_kwargs = getattr(getattr(agent, "llm", None), "init_kwargs", None)
+        if isinstance(init_kwargs, dict):
+            init_kwargs["client"] = handler
+            # The wrapper applied its retries to litellm when it was built.
+            import litellm
+
+            litellm.num_retries = 0
+        return agent
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["throttle_seconds"] = round(stats["throttle_seconds"], 3)
+        stats["paused_for"] = round(self.rate_limiter.paused_for(), 3)
+        stats["http2"] = self.http2
+        stats["max_connections"] = self.limits.max_connections
+        stats["max_keepalive_connections"] = self.limits.max_keepalive_connections
+        stats["max_retries"] = self.max_retries
+        return stats
+
+    def close(self) -> None:
+        self.client.close()
+        if self._async_client is not None:
+            try:
+                asyncio.get_running_loop().create_task(self._async_client.aclose())
+            except RuntimeError:
+                asyncio.run(self._async_client.aclose())
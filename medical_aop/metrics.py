@@ -0,0 +1,389 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def approx_tokens(text: Any) -> int:
+    """Cheap token estimate (about four characters per token)."""
+    return (len(text) + 3) // 4 if isinstance(text, str) else 0
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_format(value)}"
+
+
+class Gauge(Counter):
+    """Gauge with labels; ``collect`` may supply values at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[LabelValues, float]]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self.collect = collect
+
+    def set(self, labels: LabelValues, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def samples(self) -> Iterator[str]:
+        if self.collect is not None:
+            try:
+                collected = self.collect()
+            except Exception as e:
+                logger.warning(f"Could not collect gauge {self.name}: {e}")
+                collected = {}
+            with self._lock:
+                self._values.update(collected)
+        yield from super().samples()
+
+
+class Histogram:
+    """Fixed-bucket histogram with labels.
+
+    ``observe`` is a bisect plus two additions under an uncontended lock;
+    buckets are only made cumulative at scrape time.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: LabelValues, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One slot per bucket, one for +Inf, then sum and count.
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _format(bound)
+                bucket_labels = _labels(self.labelnames, labels, 'le="' + le + '"')
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {_format(values[-2])}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {_format(values[-1])}"
+
+
+class _StageTimer:
+    """Context manager recording the duration of a block in a histogram."""
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(self.labels, time.perf_counter() - self.start)
+
+
+class _AgentTimings(threading.local):
+    def __init__(self):
+        self.first_llm_start = None
+        self.last_llm_end = None
+
+
+class Metrics:
+    """Per-tool instrumentation for the agent hot path.
+
+    Records stage latencies (``image_prep``, ``cache_lookup``,
+    ``queue_wait``, ``prompt_build``, ``llm_call``, ``output_parse``,
+    ``agent_run``, ``stream_flush``, ``total``) in one histogram, plus
+    request, cache, retry, hedge, shed and token counters and in-flight
+    gauges, and renders them in the Prometheus text format for a
+    ``/metrics`` endpoint. With ``otel_endpoint`` set, every stage is also
+    exported as an OpenTelemetry span over OTLP/HTTP (requires
+    ``opentelemetry-sdk`` and
+    ``opentelemetry-exporter-otlp-proto-http``).
+
+    Components take ``metrics=None`` to switch instrumentation off entirely.
+
+    Args:
+        otel_endpoint: OTLP/HTTP traces endpoint, e.g.
+            ``"http://localhost:4318/v1/traces"``.
+        service_name: OpenTelemetry ``service.name`` resource attribute.
+        buckets: Histogram bucket upper bounds in seconds.
+    """
+
+    def __init__(
+        self,
+        otel_endpoint: Optional[str] = None,
+        service_name: str = "medical-aop",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.stage_seconds = Histogram(
+            "aop_stage_seconds",
+            "Time spent per agent tool call stage.",
+            ("tool", "stage"),
+            buckets,
+        )
+        self.requests = Counter(
+            "aop_requests_total", "Agent tool calls by outcome.", ("tool", "status")
+        )
+        self.cache_lookups = Counter(
+            "aop_cache_lookups_total", "Response cache lookups.", ("tool", "result")
+        )
+        self.coalesced = Counter(
+            "aop_coalesced_requests_total",
+            "Agent tool calls served by an identical call already in flight.",
+            ("tool",),
+        )
+        self.retries = Counter(
+            "aop_retries_total", "Agent call retries after a failure.", ("tool",)
+        )
+        self.hedges = Counter(
+            "aop_hedged_requests_total",
+            "Duplicate agent calls sent for attempts slower than usual.",
+            ("tool",),
+        )
+        self.shed = Counter(
+            "aop_shed_requests_total",
+            "Agent calls rejected because their backend's circuit was open.",
+            ("tool",),
+        )
+        self.tokens = Counter(
+            "aop_tokens_total",
+            "Estimated prompt and completion tokens.",
+            ("tool", "direction"),
+        )
+        self.input_tokens = Counter(
+            "aop_llm_input_tokens_total",
+            "Provider-reported input tokens, by prompt cache status.",
+            ("tool", "cache"),
+        )
+        self.llm_seconds = Histogram(
+            "aop_llm_call_seconds",
+            "LLM call latency by whether the prompt prefix was cached.",
+            ("tool", "prefix_cache"),
+            buckets,
+        )
+        self.in_flight = Gauge(
+            "aop_in_flight", "Agent tool calls currently in progress.", ("tool",)
+        )
+        self._metrics: List[Any] = [
+            self.stage_seconds,
+            self.requests,
+            self.cache_lookups,
+            self.coalesced,
+            self.retries,
+            self.hedges,
+            self.shed,
+            self.tokens,
+            self.input_tokens,
+            self.llm_seconds,
+            self.in_flight,
+        ]
+        self._timings = _AgentTimings()
+        self._tracer = self._init_tracer(otel_endpoint, service_name) if otel_endpoint else None
+
+    @staticmethod
+    def _init_tracer(endpoint: str, service_name: str) -> Any:
+        try:
+            from opentelemetry.exporter.otlp.proto.http.trace_exporter import (
+                OTLPSpanExporter,
+            )
+            from opentelemetry.sdk.resources import Resource
+            from opentelemetry.sdk.trace import TracerProvider
+            from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        except ImportError:
+            logger.warning(
+                "OpenTelemetry export requested but opentelemetry-sdk / "
+                "opentelemetry-exporter-otlp-proto-http are not installed; spans disabled"
+            )
+            return None
+        provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=endpoint)))
+        logger.info(f"Exporting agent tool spans to {endpoint}")
+        return provider.get_tracer("medical_aop")
+
+    def add_gauge(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str],
+        collect: Callable[[], Dict[LabelValues, float]],
+    ) -> None:
+        """Register a gauge whose values are read from ``collect`` at scrape time."""
+        self._metrics.append(Gauge(name, help, labelnames, collect))
+
+    def observe(
+        self, tool: str, stage: str, seconds: float, end: Optional[float] = None
+    ) -> None:
+        """Record a stage duration measured by the caller.
+
+        ``end`` is the stage's ``perf_counter`` end time when it finished
+        before now; it only matters for the exported span's timestamps.
+        """
+        self.stage_seconds.observe((tool, stage), seconds)
+        if self._tracer is not None:
+            end_ns = time.time_ns()
+            if end is not None:
+                end_ns -= int((time.perf_counter() - end) * 1e9)
+            self._tracer.start_span(
+                f"aop.{stage}",
+                attributes={"aop.tool": tool},
+                start_time=end_ns - int(seconds * 1e9),
+            ).end(end_time=end_ns)
+
+    def record_prompt_usage(
+        self, tool: str, input_tokens: int, cached_tokens: int, seconds: float
+    ) -> None:
+        """Record one LLM call's cached and uncached input tokens and latency."""
+        self.input_tokens.inc((tool, "cached"), cached_tokens)
+        self.input_tokens.inc((tool, "uncached"), input_tokens - cached_tokens)
+        self.llm_seconds.observe((tool, "hit" if cached_tokens else "miss"), seconds)
+
+    def span(self, tool: str, stage: str) -> Any:
+        """Time a block as ``stage``; nested spans become OpenTelemetry children."""
+        if self._tracer is None:
+            return _StageTimer(self.stage_seconds, (tool, stage))
+        return self._traced_span(tool, stage)
+
+    @contextmanager
+    def _traced_span(self, tool: str, stage: str) -> Iterator[None]:
+        with self._tracer.start_as_current_span(
+            f"aop.{stage}", attributes={"aop.tool": tool}
+        ), _StageTimer(self.stage_seconds, (tool, stage)):
+            yield
+
+    def instrument_agent(self, tool: str, agent: Any) -> Any:
+        """Split a swarms agent's ``run`` into prompt build, LLM call and parse.
+
+        Wraps the instance's ``run`` and ``call_llm``: time before the first
+        LLM call is ``prompt_build``, time after the last is
+        ``output_parse``. Also counts estimated tokens in and out. Agents
+        without ``call_llm`` are left untouched; a ``LazyAgent`` is
+        instrumented when it is built.
+        """
+        when_built = getattr(type(agent), "when_built", None)
+        if when_built is not None:
+            # LazyAgent: instrument the real agent once it is built.
+            agent.when_built(lambda built: self.instrument_agent(tool, built))
+            return agent
+        call_llm = getattr(agent, "call_llm", None)
+        run = getattr(agent, "run", None)
+        if call_llm is None or run is None or getattr(agent, "_aop_instrumented", False):
+            return agent
+        timings = self._timings
+
+        @wraps(call_llm)
+        def timed_call_llm(task: Any, *args, **kwargs) -> Any:
+            start = time.perf_counter()
+            if timings.first_llm_start is None:
+                timings.first_llm_start = start
+            self.tokens.inc((tool, "in"), approx_tokens(task))
+            try:
+                with self.span(tool, "llm_call"):
+                    response = call_llm(task, *args, **kwargs)
+            finally:
+                timings.last_llm_end = time.perf_counter()
+            self.tokens.inc((tool, "out"), approx_tokens(response))
+            return response
+
+        @wraps(run)
+        def timed_run(*args, **kwargs) -> Any:
+            timings.first_llm_start = timings.last_llm_end = None
+            start = time.perf_counter()
+            try:
+                return run(*args, **kwargs)
+            finally:
+                end = time.perf_counter()
+                if timings.first_llm_start is not None:
+                    self.observe(
+                        tool,
+                        "prompt_build",
+                        timings.first_llm_start - start,
+                        end=timings.first_llm_start,
+                    )
+                    self.observe(tool, "output_parse", end - timings.last_llm_end)
+
+        agent.call_llm = timed_call_llm
+        agent.run = timed_run
+        agent._aop_instrumented = True
+        return agent
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
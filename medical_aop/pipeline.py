@@ -0,0 +1,301 @@
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from medical_aop.sections import SECTION_MARKER, _header
+
+Dispatch = Callable[..., Awaitable[Dict[str, Any]]]
+NodeCallback = Callable[[int, int, Dict[str, Any]], Awaitable[None]]
+
+_PLACEHOLDER = re.compile(r"\{([A-Za-z0-9_-]+)(?:\.([^{}]+))?\}")
+
+# Clinical note -> ICD-10 codes and drug interactions in parallel -> treatment options.
+CASE_WORKUP_PIPELINE: List[Dict[str, Any]] = [
+    {"id": "summary", "agent": "Clinical-Note-Summarizer-Agent"},
+    {
+        "id": "icd10",
+        "agent": "ICD10-Symptom-Mapper-Agent",
+        "depends_on": ["summary"],
+        "sections": ["CLINICIAN SUMMARY", "DATA GAPS/UNCERTAINTY"],
+    },
+    {
+        "id": "interactions",
+        "agent": "Drug-Interaction-Agent",
+        "depends_on": ["summary"],
+        "sections": ["CLINICIAN SUMMARY"],
+    },
+    {
+        "id": "treatment",
+        "agent": "Treatment-Solutions-Agent",
+        "depends_on": ["icd10", "interactions"],
+        "sections": [
+            "TOP CODE CANDIDATES",
+            "INTERACTION TABLE",
+            "DUPLICATION/CONTRAINDICATIONS",
+        ],
+    },
+]
+
+
+class PipelineError(ValueError):
+    """The pipeline graph is malformed (unknown agent, bad dependency, cycle)."""
+
+
+def parse_sections(text: str) -> Dict[str, str]:
+    """Split ``SECTION: NAME`` blocks of an agent output into ``{NAME: body}``.
+
+    Headers are recognized as ``SectionParser`` does. Text before the first
+    marker is kept under ``""``; names are upper-cased and stripped of a
+    trailing ``(...)`` note such as ``RED FLAGS (if any)``.
+    """
+    sections: Dict[str, str] = {}
+    name, lines = "", []
+    for line in str(text or "").splitlines():
+        header = _header(line)
+        if header is not None:
+            if name or any(part.strip() for part in lines):
+                sections[name] = "\n".join(lines).strip()
+            name = header.split("(")[0].strip().upper()
+            lines = []
+        else:
+            lines.append(line)
+    if name or any(part.strip() for part in lines):
+        sections[name] = "\n".join(lines).strip()
+    return sections
+
+
+def validate_pipeline(
+    nodes: Sequence[Dict[str, Any]],
+    agents: Optional[Any] = None,
+    max_nodes: Optional[int] = None,
+) -> List[str]:
+    """Check a pipeline graph and return its node ids in topological order.
+
+    Raises:
+        PipelineError: On missing/duplicate ids, unknown agents or
+            dependencies, too many nodes, or a dependency cycle.
+    """
+    if not nodes:
+        raise PipelineError("Pipeline has no nodes")
+    if max_nodes is not None and len(nodes) > max_nodes:
+        raise PipelineError(f"Pipeline of {len(nodes)} nodes exceeds the limit of {max_nodes}")
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for node in nodes:
+        if not isinstance(node, dict) or not node.get("id") or not node.get("agent"):
+            raise PipelineError(f"Every node needs an 'id' and an 'agent': {node!r}")
+        if node["id"] in by_id:
+            raise PipelineError(f"Duplicate node id '{node['id']}'")
+        if agents is not None and node["agent"] not in agents:
+            raise PipelineError(f"Agent '{node['agent']}' not found (node '{node['id']}')")
+        by_id[node["id"]] = node
+    remaining = {}
+    for node_id, node in by_id.items():
+        depends_on = list(node.get("depends_on") or [])
+        for dependency in depends_on:
+            if dependency not in by_id:
+                raise PipelineError(f"Node '{node_id}' depends on unknown node '{dependency}'")
+        remaining[node_id] = set(depends_on)
+    order: List[str] = []
+    ready = [node_id for node_id, deps in remaining.items() if not deps]
+    while ready:
+        node_id = ready.pop(0)
+        order.append(node_id)
+        for other, deps in remaining.items():
+            if node_id in deps:
+                deps.discard(node_id)
+                if not deps:
+                    ready.append(other)
+    if len(order) != len(by_id):
+        cyclic = sorted(set(by_id) - set(order))
+        raise PipelineError(f"Dependency cycle between nodes {cyclic}")
+    return order
+
+
+def _upstream_text(result: Dict[str, Any], sections: Optional[Sequence[str]]) -> str:
+    if not sections:
+        return str(result.get("result", "")).strip()
+    parsed = result["sections"]
+    wanted = [name.upper() for name in sections]
+    picked = [f"{SECTION_MARKER} {name}\n{parsed[name]}" for name in wanted if name in parsed]
+    # An upstream agent with none of the wanted sections passes its whole output.
+    return "\n".join(picked) if picked else str(result.get("result", "")).strip()
+
+
+def build_task(
+    node: Dict[str, Any],
+    case: str,
+    nodes: Dict[str, Dict[str, Any]],
+    results: Dict[str, Dict[str, Any]],
+) -> str:
+    """The task sent to one node: its template, or the case plus upstream outputs.
+
+    A ``task`` template may use ``{case}``, ``{<node id>}`` for an upstream
+    node's whole output and ``{<node id>.<SECTION NAME>}`` for one section.
+    Without a template the task is the case followed by each upstream
+    output (only the node's ``sections`` of it, when given).
+    """
+    template = node.get("task")
+    if template:
+
+        def substitute(match: "re.Match[str]") -> str:
+            key, section = match.group(1), match.group(2)
+            if key == "case" and section is None:
+                return case
+            if key not in results:
+                return match.group(0)
+            if section is None:
+                return str(results[key].get("result", "")).strip()
+            return results[key]["sections"].get(section.strip().upper(), "")
+
+        return _PLACEHOLDER.sub(substitute, template)
+    parts = [case.strip()]
+    for dependency in node.get("depends_on") or []:
+        upstream = nodes[dependency]
+        parts.append(
+            f"--- Input from {upstream['agent']} ({dependency}) ---\n"
+            + _upstream_text(results[dependency], node.get("sections"))
+        )
+    return "\n\n".join(parts)
+
+
+def critical_path(
+    nodes: Dict[str, Dict[str, Any]], results: Dict[str, Dict[str, Any]]
+) -> List[str]:
+    """The chain of nodes that determined the pipeline's end time.
+
+    Starts at the node that finished last and walks back through the
+    dependency that finished last at each step.
+    """
+    timed = {node_id: r for node_id, r in results.items() if r.get("finished") is not None}
+    if not timed:
+        return []
+    node_id = max(timed, key=lambda n: timed[n]["finished"])
+    path = [node_id]
+    while True:
+        deps = [d for d in nodes[node_id].get("depends_on") or [] if d in timed]
+        if not deps:
+            break
+        node_id = max(deps, key=lambda d: timed[d]["finished"])
+        path.append(node_id)
+    return path[::-1]
+
+
+async def run_pipeline(
+    dispatch: Dispatch,
+    case: str,
+    nodes: Sequence[Dict[str, Any]],
+    agents: Optional[Any] = None,
+    max_concurrency: Optional[int] = None,
+    max_nodes: Optional[int] = None,
+    on_result: Optional[NodeCallback] = None,
+    dispatch_kwargs: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run a DAG of agent calls on one case, independent branches concurrently.
+
+    Each node is ``{"id", "agent", "depends_on": [...], "sections": [...],
+    "task": template, "priority": int}``. A node starts as soon as all of
+    its dependencies succeeded and gets their outputs in its task (see
+    ``build_task``); nodes downstream of a failure are skipped. The case
+    latency is the critical path rather than the sum of all calls.
+
+    Args:
+        dispatch: Coroutine running a single call, e.g. ``AgentDispatcher.dispatch``.
+        case: The case payload every node starts from.
+        nodes: The pipeline graph.
+        agents: Registered tool names to validate node agents against.
+        max_concurrency: Nodes in flight at once (None for the graph's width).
+        max_nodes: Largest accepted graph.
+        on_result: Optional coroutine called as ``(completed, total, node_result)``
+            as soon as each node finishes or is skipped.
+        dispatch_kwargs: Extra keyword arguments for every ``dispatch`` call.
+
+    Returns:
+        Dict with per-node results (output, parsed sections, start/finish
+        offsets and duration), the critical path, and overall timing.
+
+    Raises:
+        PipelineError: If the graph is invalid; nothing is run.
+    """
+    order = validate_pipeline(nodes, agents, max_nodes)
+    by_id = {node["id"]: node for node in nodes}
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+    results: Dict[str, Dict[str, Any]] = {}
+    done: Dict[str, asyncio.Event] = {node_id: asyncio.Event() for node_id in order}
+    completed: List[str] = []
+    start_time = time.perf_counter()
+
+    def offset() -> float:
+        return round(time.perf_counter() - start_time, 4)
+
+    async def call(node: Dict[str, Any], task: str) -> Dict[str, Any]:
+        kwargs = dict(dispatch_kwargs or {})
+        if node.get("priority") is not None:
+            kwargs["priority"] = node["priority"]
+        try:
+            return await dispatch(node["agent"], task, **kwargs)
+        except Exception as e:
+            return {"result": "", "success": False, "error": str(e)}
+
+    async def run_node(node_id: str) -> None:
+        node = by_id[node_id]
+        depends_on = list(node.get("depends_on") or [])
+        for dependency in depends_on:
+            await done[dependency].wait()
+        failed = [d for d in depends_on if not results[d]["success"]]
+        if failed:
+            result = {
+                "result": "",
+                "success": False,
+                "skipped": True,
+                "error": f"Upstream node(s) failed: {failed}",
+                "started": None,
+                "finished": None,
+                "duration": 0.0,
+            }
+        else:
+            task = build_task(node, case, by_id, results)
+            if semaphore is not None:
+                await semaphore.acquire()
+            started = offset()
+            try:
+                response = await call(node, task)
+            finally:
+                if semaphore is not None:
+                    semaphore.release()
+            finished = offset()
+            result = {
+                **response,
+                "sections": parse_sections(response.get("result", "")),
+                "started": started,
+                "finished": finished,
+                "duration": round(finished - started, 4),
+            }
+        result = {"id": node_id, "agent": node["agent"], **result}
+        results[node_id] = result
+        completed.append(node_id)
+        done[node_id].set()
+        if on_result is not None:
+            await on_result(len(completed), len(order), result)
+
+    pending = [asyncio.ensure_future(run_node(node_id)) for node_id in order]
+    try:
+        await asyncio.gather(*pending)
+    finally:
+        for future in pending:
+            future.cancel()
+
+    path = critical_path(by_id, results)
+    succeeded = sum(1 for r in results.values() if r["success"])
+    return {
+        "success": succeeded == len(order),
+        "results": {node_id: results[node_id] for node_id in order},
+        "completion_order": completed,
+        "critical_path": path,
+        "critical_path_duration": round(sum(results[n]["duration"] for n in path), 4),
+        "sum_of_calls": round(sum(r["duration"] for r in results.values()), 4),
+        "total": len(order),
+        "succeeded": succeeded,
+        "failed": len(order) - succeeded,
+        "duration": offset(),
+    }
@@ -0,0 +1,267 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from medical_aop.metrics import Metrics, approx_tokens
+
+
+def count_tokens(model_name: str, text: str) -> int:
+    """Token count from litellm's tokenizer for ``model_name``, or an estimate."""
+    try:
+        from litellm import token_counter
+
+        return int(token_counter(model=model_name, text=text))
+    except Exception:
+        return approx_tokens(text)
+
+
+class PromptPrefix:
+    """The static, cache-marked prefix of one agent's requests.
+
+    Built once per agent: the system prompt as a content block carrying an
+    ephemeral ``cache_control`` breakpoint, and its token count.
+
+    Args:
+        system_prompt: The agent's fixed system prompt.
+        model_name: Model used to count the prefix tokens.
+        ttl: Provider cache lifetime, ``"5m"`` or ``"1h"``.
+    """
+
+    def __init__(self, system_prompt: str, model_name: str, ttl: str = "5m"):
+        self.system_prompt = system_prompt.strip()
+        marker = {"type": "ephemeral"}
+        if ttl != "5m":
+            marker["ttl"] = ttl
+        self.message = {
+            "role": "system",
+            "content": [
+                {"type": "text", "text": self.system_prompt, "cache_control": marker}
+            ],
+        }
+        self.tokens = count_tokens(model_name, self.system_prompt)
+
+    def build(self, task: str) -> List[Dict[str, Any]]:
+        """Message body for one call: only the user task is new."""
+        return [{"role": "user", "content": task}]
+
+
+# swarms output types under which ``run`` returns just the final reply, so
+# the single-turn path can return the LLM response unchanged.
+FINAL_OUTPUT_TYPES = frozenset({"final", "last"})
+
+
+def _eligible(agent: Any) -> bool:
+    """Single-turn, tool-less swarms agents with a LiteLLM backend and a system prompt."""
+    llm = getattr(agent, "llm", None)
+    return (
+        callable(getattr(agent, "call_llm", None))
+        and isinstance(getattr(llm, "messages", None), list)
+        and hasattr(llm, "prompt_caching")
+        and bool((getattr(agent, "system_prompt", None) or "").strip())
+        and getattr(agent, "max_loops", 1) == 1
+        and not getattr(agent, "tools", None)
+        and not getattr(agent, "tools_list_dictionary", None)
+        and not getattr(agent, "mcp_enabled", False)
+        and getattr(agent, "transforms", None) is None
+    )
+
+
+class PromptCache:
+    """Provider-side prompt caching of every agent's static system prompt.
+
+    ``install`` marks the agent's system prompt with a ``cache_control``
+    breakpoint (Anthropic-family models; others cache automatically or not
+    at all) and gives the agent a single-turn ``run`` that sends the
+    prebuilt prefix plus the user task, instead of rebuilding the message
+    list from the agent's whole conversation memory on every call. Only
+    agents whose ``output_type`` is ``"final"`` or ``"last"`` take that
+    path, since for them ``run`` returns the bare reply; other output types
+    format the conversation history, so those agents, calls with images,
+    ``correct_answer`` or extra arguments, and agents that loop or use
+    tools keep the stock ``run`` (with the marked system prompt).
+
+    Provider-reported usage is split per agent into cached and uncached
+    input tokens, and LLM call latency into prefix cache hits and misses.
+
+    Args:
+        ttl: Provider cache lifetime, ``"5m"`` or ``"1h"`` (dearer writes).
+        min_cacheable_tokens: Providers ignore breakpoints on shorter
+            prefixes (the minimum is model-specific); shorter prefixes are
+            still sent through the fast path but logged.
+        metrics: Optional ``Metrics`` to record the split in.
+    """
+
+    def __init__(
+        self,
+        ttl: str = "5m",
+        min_cacheable_tokens: int = 1024,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.ttl = ttl
+        self.min_cacheable_tokens = min_cacheable_tokens
+        self.metrics = metrics
+        self.prefixes: Dict[str, PromptPrefix] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._usage = threading.local()
+
+    def install(self, tool_name: str, agent: Any) -> Any:
+        """Enable prefix caching and the single-turn request path on ``agent``.
+
+        A ``LazyAgent`` is set up when it is built; ineligible agents are
+        left untouched.
+        """
+        if getattr(type(agent), "when_built", None) is not None:
+            agent.when_built(lambda built: self.install(tool_name, built))
+            return agent
+        if getattr(agent, "_aop_prompt_cache", False) or not _eligible(agent):
+            return agent
+        prefix = PromptPrefix(agent.system_prompt, agent.model_name, self.ttl)
+        # Further instances of a ``LazyAgent`` share the tool's stats.
+        if tool_name not in self.prefixes and prefix.tokens < self.min_cacheable_tokens:
+            logger.info(
+                f"System prompt of {tool_name} is {prefix.tokens} tokens, below the "
+                f"{self.min_cacheable_tokens}-token caching minimum; the provider may not cache it"
+            )
+        cache_config = {
+            **(getattr(agent, "cache_config", None) or {}),
+            "ttl": self.ttl,
+            "cache_system_prompt": True,
+            # Only the static prefix is a breakpoint; the task is unique.
+            "cache_messages": False,
+        }
+        agent.prompt_caching = True
+        agent.cache_config = cache_config
+        self._prepare_llm(agent.llm, prefix, cache_config)
+        self.prefixes[tool_name] = prefix
+        with self._lock:
+            self._stats.setdefault(
+                tool_name,
+                {
+                    "prefix_tokens": prefix.tokens,
+                    "fast_path_calls": 0,
+                    "fallback_calls": 0,
+                    "input_tokens": 0,
+                    "cached_tokens": 0,
+                    "hit_calls": 0,
+                    "hit_seconds": 0.0,
+                    "miss_calls": 0,
+                    "miss_seconds": 0.0,
+                },
+            )
+
+        stock_run = agent.run
+
+        def run(
+            task: Optional[str] = None,
+            img: Optional[str] = None,
+            imgs: Optional[List[str]] = None,
+            correct_answer: Optional[str] = None,
+            streaming_callback: Optional[Callable[[Any], None]] = None,
+            *args,
+            **kwargs,
+        ) -> Any:
+            if (
+                img
+                or imgs
+                or correct_answer is not None
+                or args
+                or kwargs
+                or not task
+                or getattr(agent, "output_type", None) not in FINAL_OUTPUT_TYPES
+            ):
+                self._count(tool_name, "fallback_calls")
+                return stock_run(
+                    task, img, imgs, correct_answer, streaming_callback, *args, **kwargs
+                )
+            return self._call(tool_name, agent, prefix, cache_config, task, streaming_callback)
+
+        agent.run = run
+        agent._aop_prompt_cache = True
+        return agent
+
+    def _prepare_llm(self, llm: Any, prefix: PromptPrefix, cache_config: Dict[str, Any]) -> None:
+        """Point a LiteLLM wrapper at the prebuilt prefix and our usage hook."""
+        llm.prompt_caching = True
+        llm.cache_config = cache_config
+        llm.messages = [m for m in llm.messages if m.get("role") != "system"]
+        llm.messages.insert(0, prefix.message)
+        hook = getattr(llm, "usage_hook", None)
+        if getattr(hook, "_aop_prompt_cache", False):
+            return
+
+        def usage_hook(call_usage: Dict[str, Any]) -> None:
+            self._usage.last = call_usage
+            if hook is not None:
+                hook(call_usage)
+
+        usage_hook._aop_prompt_cache = True
+        llm.usage_hook = usage_hook
+
+    def _call(
+        self,
+        tool_name: str,
+        agent: Any,
+        prefix: PromptPrefix,
+        cache_config: Dict[str, Any],
+        task: str,
+        streaming_callback: Optional[Callable[[Any], None]],
+    ) -> Any:
+        llm = agent.llm
+        if llm.messages[:1] != [prefix.message]:
+            # The agent rebuilt its LiteLLM wrapper (e.g. a fallback model).
+            self._prepare_llm(llm, prefix, cache_config)
+        self._usage.last = None
+        start = time.perf_counter()
+        response = agent.call_llm(
+            task=task,
+            streaming_callback=streaming_callback,
+            messages=prefix.build(task),
+        )
+        self._record(tool_name, self._usage.last, time.perf_counter() - start)
+        return response
+
+    def _count(self, tool_name: str, key: str) -> None:
+        with self._lock:
+            self._stats[tool_name][key] += 1
+
+    def _record(self, tool_name: str, usage: Optional[Dict[str, Any]], seconds: float) -> None:
+        input_tokens = (usage or {}).get("input_tokens", 0)
+        cached = (usage or {}).get("cached_tokens", 0)
+        outcome = "hit" if cached else "miss"
+        with self._lock:
+            stats = self._stats[tool_name]
+            stats["fast_path_calls"] += 1
+            stats["input_tokens"] += input_tokens
+            stats["cached_tokens"] += cached
+            stats[f"{outcome}_calls"] += 1
+            stats[f"{outcome}_seconds"] += seconds
+        if self.metrics is not None:
+            self.metrics.record_prompt_usage(tool_name, input_tokens, cached, seconds)
+
+    def get_stats(self, tool_name: Optional[str] = None) -> Dict[str, Any]:
+        """Per-agent cached/uncached input tokens and hit/miss call latency."""
+        with self._lock:
+            snapshot = {
+                name: dict(stats)
+                for name, stats in self._stats.items()
+                if tool_name is None or name == tool_name
+            }
+        result = {}
+        for name, stats in snapshot.items():
+            hits, misses = stats.pop("hit_calls"), stats.pop("miss_calls")
+            hit_seconds, miss_seconds = stats.pop("hit_seconds"), stats.pop("miss_seconds")
+            stats["uncached_tokens"] = stats["input_tokens"] - stats["cached_tokens"]
+            stats["cached_ratio"] = (
+                round(stats["cached_tokens"] / stats["input_tokens"], 4)
+                if stats["input_tokens"]
+                else 0.0
+            )
+            stats["hits"] = hits
+            stats["misses"] = misses
+            stats["avg_hit_seconds"] = round(hit_seconds / hits, 4) if hits else None
+            stats["avg_miss_seconds"] = round(miss_seconds / misses, 4) if misses else None
+            result[name] = stats
+        return result
@@ -0,0 +1,443 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from medical_aop.metrics import Metrics
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+# 529 is Anthropic's "overloaded"; 408 is a timeout reported by the server.
+BACKEND_FAILURE_STATUSES = frozenset({408, 429, 529})
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    """Whether ``error`` says the backend is unhealthy, not that the call was bad.
+
+    Timeouts, connection errors and 429/5xx/529 responses count; anything
+    else (a bad request, an agent bug) says nothing about the backend.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, httpx.TransportError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and (
+        status in BACKEND_FAILURE_STATUSES or 500 <= status < 600
+    )
+
+
+class CircuitOpenError(RuntimeError):
+    """A call was shed because its backend's circuit is open."""
+
+    def __init__(self, backend: str, retry_in: float):
+        self.backend = backend
+        self.retry_in = retry_in
+        super().__init__(
+            f"503 Backend {backend} is failing; calls are shed for {retry_in:.1f}s"
+        )
+
+
+class LatencyWindow:
+    """The last ``size`` call latencies of one agent, for quantiles.
+
+    Quantiles come from a sorted snapshot refreshed every ``size // 16``
+    observations, so reading them on every call stays cheap.
+    """
+
+    def __init__(self, size: int = 1000):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._sorted: List[float] = []
+        self._stale = 0
+        self._refresh_every = max(size // 16, 1)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._stale += 1
+
+    def quantile(self, q: float) -> float:
+        if self._stale >= self._refresh_every or len(self._sorted) < len(self._samples) // 2:
+            self._sorted = sorted(self._samples)
+            self._stale = 0
+        if not self._sorted:
+            return 0.0
+        return self._sorted[min(int(q * len(self._sorted)), len(self._sorted) - 1)]
+
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one LLM backend.
+
+    Closed, it keeps the last ``window_calls`` attempt outcomes (dropping
+    those older than ``window`` seconds) and opens once at least
+    ``min_calls`` are kept and the failure share reaches ``failure_rate``.
+    Open, every call is rejected for ``reset_timeout`` seconds. It then lets ``half_open_calls`` probe
+    calls through: a success closes it, a failure opens it again. A probe
+    that never reports back (its caller went away) is replaced after
+    another ``reset_timeout``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        window_calls: int = 50,
+        window: float = 30.0,
+        reset_timeout: float = 5.0,
+        half_open_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self.window_calls = window_calls
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rejected": 0, "failures": 0, "successes": 0}
+
+    def allow(self) -> float:
+        """Take a call slot: 0 when admitted, else seconds until the next probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return 0.0
+            now = time.monotonic()
+            if self.state == OPEN:
+                retry_in = self._opened_at + self.reset_timeout - now
+                if retry_in > 0:
+                    self.stats["rejected"] += 1
+                    return retry_in
+                self.state = HALF_OPEN
+                self._probes = 0
+            if self._probes >= self.half_open_calls:
+                if now - self._probe_at < self.reset_timeout:
+                    self.stats["rejected"] += 1
+                    return self._probe_at + self.reset_timeout - now
+                self._probes = 0
+            self._probes += 1
+            self._probe_at = now
+            return 0.0
+
+    def record(self, ok: bool) -> None:
+        with self._lock:
+            self.stats["successes" if ok else "failures"] += 1
+            now = time.monotonic()
+            if self.state != CLOSED:
+                if self.state == HALF_OPEN:
+                    self._probes -= 1
+                    if ok:
+                        self.state = CLOSED
+                        self._outcomes.clear()
+                        self._failures = 0
+                        logger.info(f"Circuit for backend {self.name} closed")
+                    else:
+                        self._trip(now)
+                return
+            self._outcomes.append((now, ok))
+            self._failures += not ok
+            while self._outcomes and (
+                len(self._outcomes) > self.window_calls
+                or self._outcomes[0][0] < now - self.window
+            ):
+                self._failures -= not self._outcomes.popleft()[1]
+            if (
+                len(self._outcomes) >= self.min_calls
+                and self._failures >= self.failure_rate * len(self._outcomes)
+            ):
+                self._trip(now)
+
+    def release(self) -> None:
+        """Give back a call slot without an outcome (the error was not the backend's)."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _trip(self, now: float) -> None:
+        if self.state == CLOSED:
+            logger.warning(
+                f"Circuit for backend {self.name} opened: {self._failures}/"
+                f"{len(self._outcomes)} recent attempts failed"
+            )
+        self.state = OPEN
+        self._opened_at = now
+        self.stats["opened"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "state": self.state, "window_calls": len(self._outcomes)}
+
+
+class Resilience:
+    """Adaptive timeouts, hedged requests and circuit breaking for agent calls.
+
+    Sits in ``AsyncAgentExecutor`` around each attempt:
+
+    - **Adaptive timeouts.** Once an agent has ``min_samples`` latencies,
+      each attempt times out at ``timeout_multiplier`` times its observed
+      ``timeout_quantile`` (never below ``min_timeout`` or above the tool
+      timeout), and the tool timeout becomes the budget for the whole call,
+      retries included. A stuck completion is cut off and retried instead
+      of holding the caller for the full tool timeout.
+    - **Hedging.** For agents in ``hedged_agents`` an attempt still running
+      at the agent's ``hedge_quantile`` latency gets a duplicate; the first
+      to succeed wins and the other is cancelled. A synchronous agent's
+      thread cannot be interrupted, so its losing call runs to the end in
+      the background (and keeps its concurrency slot until then). Hedges are budgeted to
+      ``hedge_budget`` of calls and skipped while the agent is at its
+      concurrency limit or its backend is unhealthy, so they cannot
+      amplify an overload. Streamed calls are never hedged.
+    - **Circuit breaking.** Attempt outcomes are tracked per backend (the
+      agent's ``model_name``); only timeouts, connection errors and
+      429/5xx/529 responses count as failures. A backend failing at ``failure_rate`` or
+      more gets its calls rejected immediately with a 503 error for
+      ``reset_timeout`` seconds, and retries stop, instead of piling up.
+
+    Args:
+        adaptive_timeouts: Derive attempt timeouts from observed latency.
+        timeout_quantile: Latency quantile the attempt timeout is based on.
+        timeout_multiplier: Attempt timeout as a multiple of that quantile.
+        min_timeout: Lower bound on adaptive attempt timeouts in seconds.
+        min_samples: Latencies needed before timeouts adapt or hedges fire.
+        window_size: Latencies kept per agent.
+        hedging: Send hedged duplicates for slow attempts.
+        hedged_agents: Tool names hedging applies to (None for all).
+        hedge_quantile: Latency quantile after which a hedge is sent.
+        hedge_budget: Hedges allowed per call, on average.
+        circuit_breaker: Shed calls to failing backends.
+        failure_rate: Failure share that opens a backend's circuit.
+        min_calls: Attempts in the window before the circuit can open.
+        breaker_window: Recent attempts the failure share covers.
+        reset_timeout: Seconds an open circuit rejects calls before probing.
+        metrics: Optional instrumentation; counts hedges and shed calls.
+    """
+
+    def __init__(
+        self,
+        adaptive_timeouts: bool = True,
+        timeout_quantile: float = 0.99,
+        timeout_multiplier: float = 3.0,
+        min_timeout: float = 1.0,
+        min_samples: int = 50,
+        window_size: int = 1000,
+        hedging: bool = False,
+        hedged_agents: Optional[List[str]] = None,
+        hedge_quantile: float = 0.95,
+        hedge_budget: float = 0.1,
+        circuit_breaker: bool = True,
+        failure_rate: float = 0.5,
+        min_calls: int = 20,
+        breaker_window: int = 50,
+        reset_timeout: float = 5.0,
+        metrics: Optional[Metrics] = None,
+    ):
+        self.adaptive_timeouts = adaptive_timeouts
+        self.timeout_quantile = timeout_quantile
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.hedging = hedging
+        self.hedged_agents = set(hedged_agents) if hedged_agents is not None else None
+        self.hedge_quantile = hedge_quantile
+        self.hedge_budget = hedge_budget
+        self.circuit_breaker = circuit_breaker
+        self.breaker_options = {
+            "failure_rate": failure_rate,
+            "min_calls": min_calls,
+            "window_calls": breaker_window,
+            "reset_timeout": reset_timeout,
+        }
+        self.metrics = metrics
+        self._latencies: Dict[str, LatencyWindow] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Token bucket: every call earns ``hedge_budget`` of a hedge.
+        self._hedge_tokens = 10.0
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def is_hedged(self, tool_name: str) -> bool:
+        return self.hedging and (
+            self.hedged_agents is None or tool_name in self.hedged_agents
+        )
+
+    @staticmethod
+    def backend_for(tool_name: str, agent: Any) -> str:
+        return getattr(agent, "model_name", None) or tool_name
+
+    def _window(self, tool_name: str) -> LatencyWindow:
+        window = self._latencies.get(tool_name)
+        if window is None:
+            window = self._latencies[tool_name] = LatencyWindow(self.window_size)
+        return window
+
+    def _breaker(self, backend: str) -> CircuitBreaker:
+        breaker = self._breakers.get(backend)
+        if breaker is None:
+            breaker = self._breakers[backend] = CircuitBreaker(
+                backend, **self.breaker_options
+            )
+        return breaker
+
+    def _count(self, tool_name: str, key: str) -> None:
+        stats = self._stats.setdefault(
+            tool_name,
+            {"attempts": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "shed": 0},
+        )
+        stats[key] += 1
+
+    def attempt_timeout(self, tool_name: str, ceiling: float) -> float:
+        """Timeout for the next attempt of ``tool_name``, at most ``ceiling``."""
+        window = self._window(tool_name)
+        if not self.adaptive_timeouts or len(window) < self.min_samples:
+            return ceiling
+        adaptive = self.timeout_multiplier * window.quantile(self.timeout_quantile)
+        return min(max(adaptive, self.min_timeout), ceiling)
+
+    def admit(self, tool_name: str, backend: str) -> None:
+        """Raise ``CircuitOpenError`` if ``backend`` is shedding calls."""
+        if not self.circuit_breaker:
+            return
+        retry_in = self._breaker(backend).allow()
+        if retry_in:
+            self._count(tool_name, "shed")
+            if self.metrics is not None:
+                self.metrics.shed.inc((tool_name,))
+            raise CircuitOpenError(backend, retry_in)
+
+    def circuit_open(self, backend: str) -> bool:
+        """Whether ``backend`` is currently shedding calls (no retries then)."""
+        return self.circuit_breaker and self._breaker(backend).state == OPEN
+
+    def _may_hedge(self, backend: str) -> bool:
+        if self._hedge_tokens < 1:
+            return False
+        if self.circuit_breaker and self._breaker(backend).state != CLOSED:
+            return False
+        self._hedge_tokens -= 1
+        return True
+
+    async def attempt(
+        self,
+        tool_name: str,
+        backend: str,
+        invoke: Callable[[], Awaitable[Any]],
+        timeout: float,
+        hedge: bool = True,
+        saturated: Callable[[], bool] = lambda: False,
+    ) -> Any:
+        """Run one attempt, possibly hedged, and record its outcome.
+
+        ``admit`` must have been called for it.
+
+        Args:
+            invoke: Starts one backend call; called again for a hedge.
+            timeout: Seconds the attempt may take, hedge included.
+            hedge: Whether this call may be hedged at all.
+            saturated: Returns True when no capacity is left for a hedge.
+
+        Raises:
+            asyncio.TimeoutError: If no call succeeded within ``timeout``.
+            Exception: The error of the last failed call; only backend
+                failures (see ``is_backend_failure``) count against the
+                circuit.
+        """
+        loop = asyncio.get_running_loop()
+        self._count(tool_name, "attempts")
+        self._hedge_tokens = min(self._hedge_tokens + self.hedge_budget, 10.0)
+        window = self._window(tool_name)
+        # Running calls: start time and whether the call is a hedge.
+        running: Dict["asyncio.Future[Any]", Tuple[float, bool]] = {}
+
+        def launch(is_hedge: bool) -> None:
+            running[asyncio.ensure_future(invoke())] = (loop.time(), is_hedge)
+
+        launch(False)
+        deadline = loop.time() + timeout
+        hedge_at = None
+        if hedge and self.is_hedged(tool_name) and len(window) >= self.min_samples:
+            hedge_at = loop.time() + window.quantile(self.hedge_quantile)
+        error: Optional[BaseException] = None
+        try:
+            while running:
+                wake = deadline if hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(
+                    running,
+                    timeout=max(wake - loop.time(), 0),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for call in done:
+                    began, is_hedge = running.pop(call)
+                    if call.exception() is not None:
+                        error = call.exception()
+                        continue
+                    window.observe(loop.time() - began)
+                    if is_hedge:
+                        self._count(tool_name, "hedge_wins")
+                    self._record(backend, True)
+                    return call.result()
+                now = loop.time()
+                if done or now < wake:
+                    continue
+                if now >= deadline:
+                    break
+                hedge_at = None
+                if not saturated() and self._may_hedge(backend):
+                    self._count(tool_name, "hedges")
+                    if self.metrics is not None:
+                        self.metrics.hedges.inc((tool_name,))
+                    launch(True)
+        finally:
+            now = loop.time()
+            for call, (began, _) in running.items():
+                # Still running: its latency is at least this long.
+                window.observe(now - began)
+                call.cancel()
+        if error is not None and not running:
+            if is_backend_failure(error):
+                self._record(backend, False)
+            elif self.circuit_breaker:
+                self._breaker(backend).release()
+            raise error
+        self._record(backend, False)
+        self._count(tool_name, "timeouts")
+        raise asyncio.TimeoutError()
+
+    def _record(self, backend: str, ok: bool) -> None:
+        if self.circuit_breaker:
+            self._breaker(backend).record(ok)
+
+    def get_stats(self, agent_name: Optional[str] = None) -> Dict[str, Any]:
+        """Per-agent latency quantiles, timeouts and hedges, and breaker states."""
+
+        def agent_stats(name: str) -> Dict[str, Any]:
+            window = self._window(name)
+            stats = dict(self._stats.get(name, {}))
+            stats["samples"] = len(window)
+            if len(window):
+                stats["p50"] = round(window.quantile(0.5), 4)
+                stats["hedge_after"] = round(window.quantile(self.hedge_quantile), 4)
+                stats["p99"] = round(window.quantile(0.99), 4)
+            return stats
+
+        if agent_name is not None:
+            return agent_stats(agent_name)
+        return {
+            "agents": {name: agent_stats(name) for name in list(self._latencies)},
+            "backends": {
+                backend: breaker.get_stats() for backend, breaker in self._breakers.items()
+            },
+            "hedge_tokens": round(self._hedge_tokens, 2),
+        }
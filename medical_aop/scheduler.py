@@ -0,0 +1,258 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+LANES = ("red_flag", "normal", "bulk")
+
+
+class SchedulerRejected(Exception):
+    """Raised when a call is refused at admission (the 429 case)."""
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a queued call's deadline passes before it could start."""
+
+
+def lane_for_priority(priority: Optional[int], default: str = "normal") -> str:
+    """Map an AOP-style task priority (higher is more urgent) to a lane."""
+    if priority is None:
+        return default
+    if priority > 0:
+        return "red_flag"
+    if priority < 0:
+        return "bulk"
+    return "normal"
+
+
+class _Entry:
+    __slots__ = ("future", "tenant", "lane", "deadline", "enqueued_at", "queued")
+
+    def __init__(self, future, tenant, lane, deadline):
+        self.future = future
+        self.tenant = tenant
+        self.lane = lane
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.queued = True
+
+
+class _Lane:
+    def __init__(self):
+        self.queues: Dict[str, Deque[_Entry]] = {}
+        self.finish_tags: Dict[str, float] = {}
+        self.clock = 0.0
+
+    def push(self, entry: _Entry) -> None:
+        queue = self.queues.setdefault(entry.tenant, deque())
+        if not queue:
+            # A tenant returning from idle starts at the lane clock, so it
+            # cannot bank credit while it had nothing queued.
+            self.finish_tags[entry.tenant] = max(
+                self.finish_tags.get(entry.tenant, 0.0), self.clock
+            )
+        queue.append(entry)
+
+    def pop(self, weight: Callable[[str], float]) -> Optional[_Entry]:
+        backlogged = [tenant for tenant, queue in self.queues.items() if queue]
+        if not backlogged:
+            return None
+        tenant = min(backlogged, key=lambda t: self.finish_tags[t])
+        entry = self.queues[tenant].popleft()
+        self.clock = self.finish_tags[tenant]
+        self.finish_tags[tenant] += 1.0 / weight(tenant)
+        if not self.queues[tenant]:
+            del self.queues[tenant]
+        return entry
+
+    def remove(self, entry: _Entry) -> None:
+        queue = self.queues[entry.tenant]
+        queue.remove(entry)
+        if not queue:
+            del self.queues[entry.tenant]
+
+
+class FairScheduler:
+    """Admission control and fair ordering in front of the agent executor.
+
+    Calls run immediately while fewer than ``max_concurrent`` are active.
+    Beyond that they queue in strict-priority lanes (``red_flag`` before
+    ``normal`` before ``bulk``). Inside a lane, tenants share capacity by
+    weighted fair queuing (start-time fair queuing on per-call cost), so
+    one tenant's bulk job cannot starve the others. Queues are bounded,
+    overflow is rejected immediately, and calls whose deadline passes
+    while queued, or that can no longer finish before it given the recent
+    average call duration, are dropped without ever reaching the model.
+
+    Args:
+        max_concurrent: Calls allowed to run at once.
+        max_queue_depth: Calls allowed to wait across all lanes.
+        max_tenant_queue_depth: Calls one tenant may have waiting (None for
+            no per-tenant limit).
+        tenant_weights: Relative share per tenant (default 1.0).
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 64,
+        max_queue_depth: int = 1000,
+        max_tenant_queue_depth: Optional[int] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queue_depth = max_queue_depth
+        self.max_tenant_queue_depth = max_tenant_queue_depth
+        self.tenant_weights = dict(tenant_weights or {})
+        self._lanes: Dict[str, _Lane] = {lane: _Lane() for lane in LANES}
+        self._running = 0
+        self._queued = 0
+        self._tenant_queued: Dict[str, int] = {}
+        # Moving average of call duration, used to drop calls that would
+        # only start in time to hit their deadline.
+        self._service_time = 0.0
+        self._stats: Dict[str, Dict[str, Any]] = {
+            lane: {
+                "admitted": 0,
+                "rejected": 0,
+                "deadline_dropped": 0,
+                "completed": 0,
+                "queue_wait_total": 0.0,
+                "queue_wait_max": 0.0,
+            }
+            for lane in LANES
+        }
+
+    def _weight(self, tenant: str) -> float:
+        return max(self.tenant_weights.get(tenant, 1.0), 1e-6)
+
+    def _dequeued(self, entry: _Entry) -> None:
+        entry.queued = False
+        self._queued -= 1
+        self._tenant_queued[entry.tenant] -= 1
+
+    def _grant(self) -> None:
+        now = time.monotonic()
+        while self._running < self.max_concurrent:
+            entry = None
+            for lane in LANES:
+                entry = self._lanes[lane].pop(self._weight)
+                if entry is not None:
+                    break
+            if entry is None:
+                return
+            self._dequeued(entry)
+            if entry.future.cancelled():
+                # Its caller went away and has not unwound yet.
+                continue
+            stats = self._stats[entry.lane]
+            if entry.deadline is not None and now + self._service_time >= entry.deadline:
+                stats["deadline_dropped"] += 1
+                entry.future.set_exception(
+                    DeadlineExceeded(
+                        f"Deadline would be missed after {now - entry.enqueued_at:.2f}s "
+                        f"in the {entry.lane} queue"
+                    )
+                )
+                continue
+            wait = now - entry.enqueued_at
+            stats["queue_wait_total"] += wait
+            stats["queue_wait_max"] = max(stats["queue_wait_max"], wait)
+            self._running += 1
+            entry.future.set_result(None)
+
+    def _release(self) -> None:
+        self._running -= 1
+        self._grant()
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        tenant: str = "default",
+        lane: str = "normal",
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """Run ``call`` once the scheduler grants it a slot.
+
+        Args:
+            call: Zero-argument coroutine function doing the actual work.
+            tenant: Tenant or API key the call is accounted to.
+            lane: One of ``"red_flag"``, ``"normal"``, ``"bulk"``.
+            deadline: ``time.monotonic()`` value after which a still-queued
+                call is dropped.
+
+        Raises:
+            SchedulerRejected: The queue (or the tenant's share of it) is full.
+            DeadlineExceeded: The deadline passed while the call was queued.
+        """
+        if lane not in self._lanes:
+            raise ValueError(f"Unknown lane {lane!r}; expected one of {LANES}")
+        stats = self._stats[lane]
+        if self._running < self.max_concurrent and self._queued == 0:
+            self._running += 1
+        else:
+            if self._queued >= self.max_queue_depth:
+                stats["rejected"] += 1
+                raise SchedulerRejected(
+                    f"Server busy: {self._queued} calls already queued"
+                )
+            tenant_queued = self._tenant_queued.get(tenant, 0)
+            if (
+                self.max_tenant_queue_depth is not None
+                and tenant_queued >= self.max_tenant_queue_depth
+            ):
+                stats["rejected"] += 1
+                raise SchedulerRejected(
+                    f"Tenant '{tenant}' already has {tenant_queued} calls queued"
+                )
+            entry = _Entry(
+                asyncio.get_running_loop().create_future(), tenant, lane, deadline
+            )
+            self._lanes[lane].push(entry)
+            self._queued += 1
+            self._tenant_queued[tenant] = tenant_queued + 1
+            try:
+                await entry.future
+            except asyncio.CancelledError:
+                if entry.queued:
+                    self._lanes[lane].remove(entry)
+                    self._dequeued(entry)
+                elif not entry.future.cancelled() and entry.future.exception() is None:
+                    # Granted a slot just as the caller went away. A call
+                    # dropped for its deadline never held one.
+                    self._release()
+                raise
+        stats["admitted"] += 1
+        started = time.monotonic()
+        try:
+            return await call()
+        finally:
+            stats["completed"] += 1
+            self._service_time += 0.1 * (
+                time.monotonic() - started - self._service_time
+            )
+            self._release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane, stats in self._stats.items():
+            started = stats["admitted"]
+            lanes[lane] = {
+                "admitted": started,
+                "rejected": stats["rejected"],
+                "deadline_dropped": stats["deadline_dropped"],
+                "completed": stats["completed"],
+                "queued": sum(len(q) for q in self._lanes[lane].queues.values()),
+                "avg_queue_wait": round(stats["queue_wait_total"] / started, 4)
+                if started
+                else 0.0,
+                "max_queue_wait": round(stats["queue_wait_max"], 4),
+            }
+        return {
+            "running": self._running,
+            "queued": self._queued,
+            "max_concurrent": self.max_concurrent,
+            "max_queue_depth": self.max_queue_depth,
+            "avg_service_time": round(self._service_time, 4),
+            "tenants_queued": {t: n for t, n in self._tenant_queued.items() if n},
+            "lanes": lanes,
+        }
@@ -0,0 +1,352 @@
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SECTION_MARKER = "SECTION:"
+
+SectionSpec = Dict[str, Any]
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_BULLET = re.compile(r"(?:[-*•+]|\d{1,3}[.)])\s+")
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)")
+_LABELLED = re.compile(r"([A-Za-z][\w /&-]{0,40}?)\s*[:=]\s*(.+)")
+_SEPARATORS = re.compile(r"\s+[—–|]\s+|\s*;\s+")
+_CODE = re.compile(r"[A-Z0-9][A-Z0-9.\-]{1,9}")
+_EMPHASIS = re.compile(r"([*_`]{1,3})(.+?)\1")
+_NUMERIC_HINT = re.compile(r"\s*\d+(?:\.\d+)?\s*[–—-]\s*\d+(?:\.\d+)?\s*$")
+_LIST_SECTIONS = {"sources"}
+
+
+def field_key(label: str) -> str:
+    """``"TOP CODE CANDIDATES (...)"`` -> ``"top_code_candidates"``."""
+    return _NON_WORD.sub("_", label.split("(")[0].lower()).strip("_")
+
+
+def _header(line: str) -> Optional[str]:
+    """The section name if ``line`` is a ``SECTION:`` header, else None."""
+    # Tolerates markdown around the marker: "## SECTION: X", "**SECTION: X**".
+    stripped = line.lstrip(" \t#*>")
+    if stripped[:8].upper() != SECTION_MARKER:
+        return None
+    return stripped[8:].strip(" \t*#:")
+
+
+def _plain(value: str) -> str:
+    """``"**I20.9**"`` -> ``"I20.9"``: drop markdown emphasis around a value."""
+    value = value.strip()
+    emphasis = _EMPHASIS.fullmatch(value)
+    return emphasis.group(2).strip() if emphasis else value
+
+
+def _field_spec(spec: str) -> Dict[str, str]:
+    spec = spec.strip()
+    numeric = _NUMERIC_HINT.search(spec)
+    label = spec[: numeric.start()] if numeric else spec
+    return {"key": field_key(label), "label": label.strip(), "type": "number" if numeric else "text"}
+
+
+def output_schema(system_prompt: str) -> List[SectionSpec]:
+    """Derive an agent's output schema from the ``SECTION:`` lines of its prompt.
+
+    A section is ``"text"`` by default. A note in parentheses refines it:
+    ``(bulleted)`` makes a ``"list"`` of strings, ``(list items with: a, b)``
+    or a column list ``(a, b, c)`` makes ``"records"`` with those fields
+    (``confidence 0–1`` is a number field), and ``(if any)`` marks it
+    optional. ``SOURCES`` is always a list.
+    """
+    schema: List[SectionSpec] = []
+    for line in (system_prompt or "").splitlines():
+        name = _header(line)
+        if not name:
+            continue
+        title = name.split("(")[0].strip()
+        note = name[len(title):].strip().strip("()").strip()
+        lowered = note.lower()
+        spec: SectionSpec = {
+            "name": title,
+            "key": field_key(title),
+            "type": "list" if field_key(title) in _LIST_SECTIONS else "text",
+            "optional": "if any" in lowered,
+            "fields": [],
+        }
+        columns = note.split(":", 1)[1] if "list items with" in lowered else note
+        if lowered.startswith("bullet"):
+            spec["type"] = "list"
+        elif columns.count(",") >= 1 and "if any" not in lowered:
+            spec["type"] = "records"
+            spec["fields"] = [_field_spec(part) for part in columns.split(",") if part.strip()]
+        schema.append(spec)
+    return schema
+
+
+class SectionParser:
+    """Single-pass, incremental parser from ``SECTION:`` text to typed records.
+
+    ``feed`` takes text in arbitrary pieces (whole responses or streamed
+    tokens) and only looks at each complete line once; ``close`` finishes
+    the last section and returns the result. Sections follow ``schema``
+    (see ``output_schema``): ``"text"`` sections become a string,
+    ``"list"`` sections a list of item strings and ``"records"`` sections a
+    list of dicts keyed by field, read from markdown table rows,
+    ``label: value`` parts or positional ``—`` / ``|`` / ``;`` separated
+    parts, with number fields coerced to floats. Sections not in the
+    schema are kept as text.
+    """
+
+    def __init__(self, schema: List[SectionSpec]):
+        self._specs = {spec["key"]: spec for spec in schema}
+        # "confidence 0.6" / "confidence: 0.6" in free text, per number field.
+        self._number_labels = {
+            (spec["key"], field["key"]): re.compile(
+                re.escape(field["label"]) + r"\W{0,3}(" + _NUMBER.pattern + ")", re.I
+            )
+            for spec in schema
+            for field in spec.get("fields", [])
+            if field["type"] == "number"
+        }
+        self._labels: Dict[Tuple[str, str], Optional[str]] = {}
+        self._parts: List[str] = []
+        self._spec: Optional[SectionSpec] = None
+        self._key = ""
+        self._lines: List[str] = []
+        self._items: List[Any] = []
+        self._columns: Optional[List[str]] = None
+        self._preamble: List[str] = []
+        self.sections: Dict[str, Any] = {}
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Parse ``text``; returns the sections completed by it as ``(key, value)``."""
+        if "\n" not in text:
+            self._parts.append(text)
+            return []
+        self._parts.append(text)
+        data = "".join(self._parts)
+        end = data.rfind("\n")
+        self._parts = [data[end + 1 :]] if end + 1 < len(data) else []
+        done: List[Tuple[str, Any]] = []
+        start = 0
+        while start <= end:
+            # Walk lines in place rather than copying and splitting the text.
+            stop = data.index("\n", start)
+            self._line(data[start:stop], done)
+            start = stop + 1
+        return done
+
+    def close(self) -> Dict[str, Any]:
+        """Finish parsing and return ``{"sections", "missing", "unexpected", "preamble"}``."""
+        if self._parts:
+            done: List[Tuple[str, Any]] = []
+            self._line("".join(self._parts), done)
+            self._parts = []
+        self._finish()
+        return {
+            "sections": self.sections,
+            "missing": [
+                key
+                for key, spec in self._specs.items()
+                if key not in self.sections and not spec["optional"]
+            ],
+            "unexpected": [key for key in self.sections if key not in self._specs],
+            "preamble": "\n".join(self._preamble).strip(),
+        }
+
+    def _line(self, line: str, done: List[Tuple[str, Any]]) -> None:
+        name = _header(line)
+        if name is not None:
+            finished = self._finish()
+            if finished is not None:
+                done.append(finished)
+            self._key = field_key(name) or "section"
+            self._spec = self._specs.get(self._key)
+            return
+        if not self._key:
+            self._preamble.append(line)
+        elif self._spec is None or self._spec["type"] == "text":
+            self._lines.append(line)
+        elif self._spec["type"] == "list":
+            self._list_line(line)
+        else:
+            self._record_line(line)
+
+    def _list_line(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped:
+            return
+        bullet = _BULLET.match(stripped)
+        if bullet is not None:
+            self._items.append(stripped[bullet.end() :])
+        elif self._items and line[:1] in (" ", "\t"):
+            self._items[-1] += " " + stripped
+        else:
+            self._items.append(stripped)
+
+    def _record_line(self, line: str) -> None:
+        stripped = line.strip()
+        if not stripped:
+            return
+        fields = self._spec["fields"]
+        if stripped[0] == "|":
+            cells = [cell.strip() for cell in stripped.strip("|").split("|")]
+            if all(not cell.strip(":- ") for cell in cells):
+                return
+            if not self._items and self._columns is None:
+                # Only a table's first row can be its header.
+                keys = [field_key(cell) for cell in cells]
+                known = {field["key"] for field in fields}
+                if sum(key in known for key in keys) * 2 >= len(keys):
+                    self._columns = keys
+                    return
+            columns = self._columns or [field["key"] for field in fields]
+            record = {"text": stripped}
+            for key, cell in zip(columns, cells):
+                if cell:
+                    record[key] = _plain(cell)
+            self._items.append(record)
+            return
+        bullet = _BULLET.match(stripped)
+        if bullet is None and self._items and line[:1] in (" ", "\t"):
+            # Continuation: "   Confidence: 0.4" or more text for the item.
+            record = self._items[-1]
+            record["text"] += " " + stripped
+            labelled = _LABELLED.fullmatch(stripped)
+            key = self._match_field(labelled.group(1)) if labelled else None
+            if key is not None:
+                record[key] = _plain(labelled.group(2))
+            return
+        self._items.append(self._record(stripped[bullet.end() :] if bullet else stripped))
+
+    def _match_field(self, label: str) -> Optional[str]:
+        cache_key = (self._key, label)
+        if cache_key not in self._labels:
+            self._labels[cache_key] = self._find_field(label)
+        return self._labels[cache_key]
+
+    def _find_field(self, label: str) -> Optional[str]:
+        key = field_key(label)
+        if not key:
+            return None
+        for field in self._spec["fields"]:
+            if field["key"] == key or field["key"].startswith(key) or key.startswith(field["key"]):
+                return field["key"]
+        for field in self._spec["fields"]:
+            # "excludes: ..." for "key excludes/includes".
+            if len(key) > 3 and key in field["key"].split("_"):
+                return field["key"]
+        return None
+
+    def _record(self, text: str) -> Dict[str, Any]:
+        fields = self._spec["fields"]
+        record: Dict[str, Any] = {"text": text}
+        numbers = [
+            (field["key"], self._number_labels[(self._key, field["key"])])
+            for field in fields
+            if field["type"] == "number"
+        ]
+        positional = []
+        for part in _SEPARATORS.split(text):
+            part = part.strip()
+            if not part:
+                continue
+            labelled = _LABELLED.fullmatch(part)
+            key = self._match_field(labelled.group(1)) if labelled else None
+            if key is not None:
+                record[key] = _plain(labelled.group(2))
+                continue
+            for number_key, pattern in numbers:
+                # A bare "confidence 0.55" part.
+                if pattern.match(part):
+                    record[number_key] = part
+                    break
+            else:
+                positional.append(part)
+        if positional and fields and fields[0]["key"] == "code" and "code" not in record:
+            # "R07.9 Chest pain, unspecified": a leading code-like token.
+            head, _, rest = positional[0].partition(" ")
+            head = _plain(head)
+            if rest and _CODE.fullmatch(head) and any(ch.isdigit() for ch in head):
+                positional[:1] = [head, rest]
+        open_fields = [field["key"] for field in fields if field["key"] not in record]
+        for key, value in zip(open_fields, positional):
+            record[key] = _plain(value)
+        for number_key, pattern in numbers:
+            # "... (confidence 0.6)" inside free text.
+            if number_key not in record:
+                found = pattern.search(text)
+                if found:
+                    record[number_key] = found.group(1)
+        return record
+
+    def _finish(self) -> Optional[Tuple[str, Any]]:
+        if not self._key:
+            return None
+        spec = self._spec
+        if spec is None or spec["type"] == "text":
+            value: Any = "\n".join(self._lines).strip()
+        elif spec["type"] == "list":
+            value = self._items
+        else:
+            numbers = [field["key"] for field in spec["fields"] if field["type"] == "number"]
+            for record in self._items:
+                for key in numbers:
+                    if isinstance(record.get(key), str):
+                        number = _NUMBER.search(record[key])
+                        if number:
+                            record[key] = float(number.group(0))
+            value = self._items
+        key = self._key
+        if key in self.sections and isinstance(value, list) and isinstance(self.sections[key], list):
+            self.sections[key].extend(value)
+        elif key in self.sections and value:
+            self.sections[key] = f"{self.sections[key]}\n{value}"
+        elif key not in self.sections:
+            self.sections[key] = value
+        self._key, self._spec = "", None
+        self._lines, self._items, self._columns = [], [], None
+        return key, value
+
+
+def parse_structured(text: str, schema: List[SectionSpec]) -> Dict[str, Any]:
+    """Parse a complete response with ``SectionParser``."""
+    parser = SectionParser(schema)
+    parser.feed(text)
+    return parser.close()
+
+
+class StructuredOutput:
+    """Attach typed SECTION records to agent responses.
+
+    Each agent's schema is derived from its system prompt (``output_schema``)
+    unless given in ``schemas``, and re-derived when the prompt changes.
+
+    Args:
+        agents: Tool names whose responses are parsed (None for all).
+        schemas: Explicit schemas per tool name.
+    """
+
+    def __init__(
+        self,
+        agents: Optional[List[str]] = None,
+        schemas: Optional[Dict[str, List[SectionSpec]]] = None,
+    ):
+        self.agents = set(agents) if agents is not None else None
+        self.schemas = dict(schemas or {})
+        self._derived: Dict[str, Tuple[Optional[str], List[SectionSpec]]] = {}
+
+    def applies_to(self, tool_name: str) -> bool:
+        return self.agents is None or tool_name in self.agents
+
+    def schema_for(self, tool_name: str, agent: Any) -> List[SectionSpec]:
+        if tool_name in self.schemas:
+            return self.schemas[tool_name]
+        metadata = getattr(agent, "metadata", None)
+        prompt = metadata("system_prompt") if callable(metadata) else getattr(agent, "system_prompt", None)
+        cached = self._derived.get(tool_name)
+        if cached is None or cached[0] is not prompt:
+            cached = (prompt, output_schema(prompt or ""))
+            self._derived[tool_name] = cached
+        return cached[1]
+
+    def parser(self, tool_name: str, agent: Any) -> SectionParser:
+        return SectionParser(self.schema_for(tool_name, agent))
+
+    def parse(self, tool_name: str, agent: Any, text: str) -> Dict[str, Any]:
+        return parse_structured(text, self.schema_for(tool_name, agent))
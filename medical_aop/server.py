@@ -0,0 +1,719 @@
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+from swarms import AOP
+
+from medical_aop.cache import ResponseCache
+from medical_aop.coalesce import SingleFlight
+from medical_aop.discovery import AgentIndex
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.images import DEFAULT_MAX_EDGE, ImagePipeline
+from medical_aop.lazy import warm_when_listening
+from medical_aop.llm_client import SharedLLMClient
+from medical_aop.metrics import Metrics
+from medical_aop.prompt_cache import PromptCache
+from medical_aop.resilience import Resilience
+from medical_aop.scheduler import FairScheduler
+from medical_aop.sections import StructuredOutput
+from medical_aop.tasks import TaskManager, TaskStore
+from medical_aop.tools import (
+    register_agent_tool,
+    register_batch_tool,
+    register_discovery_tools,
+    register_metrics_route,
+    register_pipeline_tool,
+    register_task_tools,
+    run_on_startup,
+)
+from medical_aop.workers import WorkerPoolExecutor
+
+
+class MedicalAOP(AOP):
+    """AOP server with an asyncio-native execution path for agent tools.
+
+    With ``execution_mode="async"`` (and queues disabled) each agent tool is
+    registered as a coroutine, so slow LLM calls no longer block the MCP
+    event loop. Any other mode falls back to the stock AOP behaviour.
+
+    Args:
+        execution_mode: ``"async"`` for the non-blocking path, ``"sync"``
+            for the default AOP tool handlers.
+        max_concurrency_per_agent: Maximum in-flight calls per agent.
+        max_threads: Thread pool size for synchronous ``Agent.run`` calls.
+        cache_enabled: Serve repeated calls from the response cache.
+        cached_agents: Tool names the cache applies to (None for all).
+        cache_max_entries: Maximum number of cached responses.
+        cache_ttl: Seconds a cached response stays valid.
+        cache_path: Optional SQLite file so the cache survives restarts.
+        coalesce_requests: Let identical concurrent calls (same agent, task
+            and images) share one in-flight execution, each caller keeping
+            its own timeout. Off by default.
+        coalesced_agents: Tool names coalescing applies to (None for all).
+        structured_output: Add ``structured`` to agent responses: the
+            output's SECTION blocks parsed into typed records following
+            each agent's output schema (derived from the ``SECTION:`` lines
+            of its system prompt).
+        structured_agents: Tool names structured output applies to (None
+            for all).
+        output_schemas: Explicit output schemas per tool name, overriding
+            the derived ones (see ``medical_aop.sections.output_schema``).
+        image_preprocessing: Turn ``img``/``imgs`` into deduplicated,
+            downscaled data URIs before the agent runs, so a repeated image
+            is read and encoded once (downscaling requires Pillow).
+        image_agents: Tool names image preprocessing applies to (None for all).
+        image_max_edge: Longest image edge in pixels sent to the model.
+        image_cache_max_bytes: Memory budget for cached image encodings.
+        image_workers: Threads preparing the images of multi-image calls.
+        image_allowed_roots: Directories image paths may be read from (e.g.
+            an upload directory); None rejects every local path.
+        batch_max_concurrency: Default items in flight per ``batch_run`` call.
+        batch_max_items: Maximum number of items accepted per ``batch_run`` call.
+        streaming_agents: Tool names whose output is streamed to clients
+            that send a progress token (None for all).
+        stream_mode: ``"sections"`` to stream whole SECTION blocks,
+            ``"tokens"`` to stream tokens as they arrive.
+        workers: Number of worker processes running the agents; 0 runs
+            them in the server process.
+        worker_agent_factory: ``"module:attribute"`` spec each worker uses
+            to build its agents (must be importable without side effects).
+        worker_dispatch: ``"least_loaded"`` or ``"hash"`` (pin agents to workers).
+        max_inflight_per_worker: Backpressure limit per worker process.
+        scheduler_enabled: Put admission control and per-tenant fair
+            queuing in front of the executor.
+        max_concurrent_calls: Agent calls the scheduler lets run at once.
+        max_queue_depth: Calls allowed to wait; beyond it calls are
+            rejected with a 429 error.
+        max_tenant_queue_depth: Calls one tenant may have waiting (None
+            for no per-tenant limit).
+        tenant_weights: Relative capacity share per tenant (default 1.0).
+        agent_lanes: Default lane (``"red_flag"``, ``"normal"``, ``"bulk"``)
+            per tool name for calls without an explicit priority.
+        tenant_header: HTTP header identifying the tenant; falls back to
+            the API key.
+        metrics_enabled: Record per-stage latency histograms, counters and
+            gauges and serve them on ``/metrics``. Off by default, which
+            leaves no instrumentation hook in the call path.
+        otel_endpoint: Optional OTLP/HTTP endpoint to export the stage spans
+            to, e.g. ``"http://localhost:4318/v1/traces"``.
+        warm_agents: Build ``LazyAgent`` agents in a background thread once
+            the port is listening; False builds each on its first call.
+        shared_llm_client: Route every agent's LLM calls through one pooled
+            ``SharedLLMClient`` (per process with ``workers``). Off by
+            default; agents then keep litellm's own client and retries.
+        llm_max_connections: Connection pool size of the shared client.
+        llm_max_keepalive: Idle keep-alive connections kept for reuse.
+        llm_keepalive_expiry: Seconds an idle connection is kept.
+        llm_http2: Use HTTP/2 when the ``h2`` package is installed.
+        llm_max_retries: Retries per LLM HTTP request after a 429, 529, 5xx
+            or connection error, with jittered backoff. These failures are
+            then not retried again at the tool level or by litellm, so each
+            LLM call sends at most ``1 + llm_max_retries`` requests for them.
+        resilience_enabled: Time agent attempts out at a multiple of their
+            observed p99 within the tool timeout, and shed calls to a
+            backend (model) whose attempts keep failing instead of retrying
+            them (per process with ``workers``).
+        hedged_agents: Tool names whose attempts slower than their p95 get
+            one hedged duplicate, within a budget of 10% extra calls
+            (requires ``resilience_enabled``; None hedges nothing).
+        breaker_failure_rate: Failure share of a backend's last 50 attempts
+            (20 at least) that opens its circuit.
+        breaker_reset_timeout: Seconds an open circuit sheds calls before
+            letting a probe through.
+        prompt_caching: Mark each agent's static system prompt for
+            provider-side prompt caching and send it prebuilt with only the
+            user task appended (single-turn, tool-less agents whose
+            ``output_type`` is ``"final"``). Off by default.
+        prompt_cache_ttl: Provider cache lifetime, ``"5m"`` or ``"1h"``.
+        indexed_discovery: Serve ``discover_agents``, ``search_agents``,
+            ``list_agents`` and ``get_agents_info`` from an inverted index
+            kept up to date on ``add_agent`` / ``remove_agent``, with
+            ranked search, paging and field projection.
+        discovery_max_page_size: Cap on records per discovery response
+            (None for no cap).
+        pipelines: Named agent graphs ``run_pipeline`` can run by name
+            (see ``medical_aop.pipeline.CASE_WORKUP_PIPELINE``).
+        pipeline_max_nodes: Largest graph ``run_pipeline`` accepts.
+        background_tasks: Register ``submit_task`` / ``get_task_status`` /
+            ``wait_for_task`` / ``list_tasks`` for calls that return a task
+            id at once and run in the background. Off by default.
+        task_store_path: SQLite file the background tasks are kept in, so
+            unfinished ones are resumed after a restart (None keeps them in
+            memory only).
+        task_max_resumes: Times a task interrupted mid-call by a restart is
+            re-run before it is marked failed.
+        *args: Passed through to ``AOP``.
+        **kwargs: Passed through to ``AOP``.
+    """
+
+    def __init__(
+        self,
+        *args,
+        execution_mode: str = "async",
+        max_concurrency_per_agent: int = 32,
+        max_threads: int = 64,
+        cache_enabled: bool = False,
+        cached_agents: Optional[List[str]] = None,
+        cache_max_entries: int = 1024,
+        cache_ttl: float = 3600,
+        cache_path: Optional[str] = None,
+        coalesce_requests: bool = False,
+        coalesced_agents: Optional[List[str]] = None,
+        structured_output: bool = False,
+        structured_agents: Optional[List[str]] = None,
+        output_schemas: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        image_preprocessing: bool = False,
+        image_agents: Optional[List[str]] = None,
+        image_max_edge: int = DEFAULT_MAX_EDGE,
+        image_cache_max_bytes: int = 256 * 2**20,
+        image_workers: int = 4,
+        image_allowed_roots: Optional[List[str]] = None,
+        batch_max_concurrency: int = 8,
+        batch_max_items: int = 1000,
+        streaming_agents: Optional[List[str]] = None,
+        stream_mode: str = "sections",
+        workers: int = 0,
+        worker_agent_factory: str = "medical_agents:agents",
+        worker_dispatch: str = "least_loaded",
+        max_inflight_per_worker: int = 64,
+        scheduler_enabled: bool = False,
+        max_concurrent_calls: int = 64,
+        max_queue_depth: int = 1000,
+        max_tenant_queue_depth: Optional[int] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        agent_lanes: Optional[Dict[str, str]] = None,
+        tenant_header: str = "x-tenant-id",
+        metrics_enabled: bool = False,
+        otel_endpoint: Optional[str] = None,
+        warm_agents: bool = True,
+        shared_llm_client: bool = False,
+        llm_max_connections: int = 100,
+        llm_max_keepalive: int = 100,
+        llm_keepalive_expiry: float = 30.0,
+        llm_http2: bool = True,
+        llm_max_retries: int = 2,
+        resilience_enabled: bool = False,
+        hedged_agents: Optional[List[str]] = None,
+        breaker_failure_rate: float = 0.5,
+        breaker_reset_timeout: float = 5.0,
+        prompt_caching: bool = False,
+        prompt_cache_ttl: str = "5m",
+        indexed_discovery: bool = True,
+        discovery_max_page_size: Optional[int] = None,
+        pipelines: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        pipeline_max_nodes: int = 32,
+        background_tasks: bool = False,
+        task_store_path: Optional[str] = None,
+        task_max_resumes: int = 2,
+        **kwargs,
+    ):
+        if execution_mode not in ("async", "sync"):
+            raise ValueError(
+                f"execution_mode must be 'async' or 'sync', got {execution_mode!r}"
+            )
+        if workers and (execution_mode != "async" or kwargs.get("queue_enabled", True)):
+            raise ValueError(
+                "workers require execution_mode='async' and queue_enabled=False"
+            )
+        self.execution_mode = execution_mode
+        self.metrics = Metrics(otel_endpoint=otel_endpoint) if metrics_enabled else None
+        llm_client_options = (
+            {
+                "max_connections": llm_max_connections,
+                "max_keepalive_connections": llm_max_keepalive,
+                "keepalive_expiry": llm_keepalive_expiry,
+                "http2": llm_http2,
+                "max_retries": llm_max_retries,
+            }
+            if shared_llm_client
+            else None
+        )
+        # Workers build their own client from the options.
+        self.llm_client = (
+            SharedLLMClient(**llm_client_options)
+            if llm_client_options is not None and not workers
+            else None
+        )
+        prompt_cache_options = {"ttl": prompt_cache_ttl} if prompt_caching else None
+        resilience_options = (
+            {
+                "hedging": hedged_agents is not None,
+                "hedged_agents": hedged_agents,
+                "failure_rate": breaker_failure_rate,
+                "reset_timeout": breaker_reset_timeout,
+            }
+            if resilience_enabled
+            else None
+        )
+        self.resilience = (
+            Resilience(**resilience_options, metrics=self.metrics)
+            if resilience_options is not None and not workers
+            else None
+        )
+        self.prompt_cache = (
+            PromptCache(**prompt_cache_options, metrics=self.metrics)
+            if prompt_cache_options is not None and not workers
+            else None
+        )
+        if workers:
+            self.executor = WorkerPoolExecutor(
+                worker_agent_factory,
+                workers=workers,
+                dispatch=worker_dispatch,
+                max_inflight_per_worker=max_inflight_per_worker,
+                max_concurrency_per_agent=max_concurrency_per_agent,
+                max_threads=max_threads,
+                retry_delay=kwargs.get("retry_delay", 1.0),
+                llm_client_options=llm_client_options,
+                prompt_cache_options=prompt_cache_options,
+                resilience_options=resilience_options,
+            )
+            self.executor.start(wait=False)
+        else:
+            self.executor = AsyncAgentExecutor(
+                max_concurrency_per_agent=max_concurrency_per_agent,
+                max_threads=max_threads,
+                retry_delay=kwargs.get("retry_delay", 1.0),
+                metrics=self.metrics,
+                resilience=self.resilience,
+                already_retried=(
+                    self.llm_client.already_retried if self.llm_client is not None else None
+                ),
+            )
+        self.response_cache = (
+            ResponseCache(
+                max_entries=cache_max_entries, ttl=cache_ttl, path=cache_path
+            )
+            if cache_enabled
+            else None
+        )
+        self.single_flight = (
+            SingleFlight(agents=coalesced_agents) if coalesce_requests else None
+        )
+        self.structured_output = (
+            StructuredOutput(agents=structured_agents, schemas=output_schemas)
+            if structured_output
+            else None
+        )
+        self.image_pipeline = (
+            ImagePipeline(
+                agents=image_agents,
+                max_edge=image_max_edge,
+                cache_max_bytes=image_cache_max_bytes,
+                max_workers=image_workers,
+                allowed_roots=image_allowed_roots,
+            )
+            if image_preprocessing
+            else None
+        )
+        self.scheduler = (
+            FairScheduler(
+                max_concurrent=max_concurrent_calls,
+                max_queue_depth=max_queue_depth,
+                max_tenant_queue_depth=max_tenant_queue_depth,
+                tenant_weights=tenant_weights,
+            )
+            if scheduler_enabled
+            else None
+        )
+        self.tenant_header = tenant_header
+        # The agent registries only exist once AOP.__init__ has run; they
+        # are bound to the dispatcher right after.
+        self.dispatcher = AgentDispatcher(
+            self.executor,
+            response_cache=self.response_cache,
+            cached_agents=cached_agents,
+            streaming_agents=streaming_agents,
+            stream_mode=stream_mode,
+            scheduler=self.scheduler,
+            agent_lanes=agent_lanes,
+            metrics=self.metrics,
+            single_flight=self.single_flight,
+            structured_output=self.structured_output,
+            image_pipeline=self.image_pipeline,
+        )
+        self.agent_index = AgentIndex() if indexed_discovery else None
+        self.discovery_max_page_size = discovery_max_page_size
+        self.warm_agents = warm_agents
+        self._bind_address = (kwargs.get("host", "localhost"), kwargs.get("port", 8000))
+        self._warmup_thread = None
+        self.batch_max_concurrency = batch_max_concurrency
+        self.batch_max_items = batch_max_items
+        self.pipelines = pipelines or {}
+        self.pipeline_max_nodes = pipeline_max_nodes
+        super().__init__(*args, **kwargs)
+        self.dispatcher.agents = self.agents
+        self.dispatcher.tool_configs = self.tool_configs
+        self.task_manager = (
+            TaskManager(
+                TaskStore(task_store_path or ":memory:"),
+                self.dispatcher.dispatch,
+                max_resumes=task_max_resumes,
+            )
+            if background_tasks and self._async_tools
+            else None
+        )
+        self._register_medical_management_tools()
+
+    def _start_warmup(self) -> None:
+        # With workers the agents run (and are warmed) in the worker processes.
+        if (
+            self.warm_agents
+            and self._warmup_thread is None
+            and not isinstance(self.executor, WorkerPoolExecutor)
+        ):
+            host, port = self._bind_address
+            self._warmup_thread = warm_when_listening(
+                lambda: list(self.agents.values()), host, port
+            )
+
+    def start_server(self, *args, **kwargs) -> Any:
+        self._start_warmup()
+        return super().start_server(*args, **kwargs)
+
+    def run(self, *args, **kwargs) -> Any:
+        self._start_warmup()
+        return super().run(*args, **kwargs)
+
+    @property
+    def _async_tools(self) -> bool:
+        return self.execution_mode == "async" and not self.queue_enabled
+
+    async def _dispatch(
+        self,
+        tool_name: str,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        max_retries: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Run one call against a registered agent and return the tool response."""
+        return await self.dispatcher.dispatch(
+            tool_name,
+            task,
+            img=img,
+            imgs=imgs,
+            correct_answer=correct_answer,
+            max_retries=max_retries,
+        )
+
+    def remove_agent(self, tool_name: str) -> bool:
+        removed = super().remove_agent(tool_name)
+        if removed and self.agent_index is not None:
+            self.agent_index.remove(tool_name)
+        return removed
+
+    def _register_tool(self, tool_name: str, agent: Any) -> None:
+        if self.agent_index is not None:
+            self.agent_index.add(tool_name, agent)
+        if self.llm_client is not None:
+            self.llm_client.install(agent)
+        if self.prompt_cache is not None:
+            self.prompt_cache.install(tool_name, agent)
+        if not self._async_tools:
+            return super()._register_tool(tool_name, agent)
+
+        config = self.tool_configs[tool_name]
+        if self.dispatcher.is_cached(tool_name):
+            purged = self.response_cache.invalidate_stale(agent)
+            if purged:
+                logger.info(
+                    f"Dropped {purged} cached responses for {tool_name} (system prompt changed)"
+                )
+        if self.metrics is not None and not isinstance(
+            self.executor, WorkerPoolExecutor
+        ):
+            # Workers build their own agents, so the in-agent stages are
+            # only visible when agents run in this process.
+            self.metrics.instrument_agent(tool_name, agent)
+        register_agent_tool(
+            self.mcp_server,
+            self.dispatcher,
+            tool_name,
+            config.tool_description,
+            tenant_header=self.tenant_header,
+        )
+
+    def _register_metrics(self) -> None:
+        """Expose ``/metrics`` with gauges for the scheduler, cache and workers."""
+        metrics = self.metrics
+        register_metrics_route(self.mcp_server, metrics)
+        if self.scheduler is not None:
+            metrics.add_gauge(
+                "aop_scheduler_queued",
+                "Calls waiting in the scheduler per lane.",
+                ("lane",),
+                lambda: {
+                    (lane,): stats["queued"]
+                    for lane, stats in self.scheduler.get_stats()["lanes"].items()
+                },
+            )
+            metrics.add_gauge(
+                "aop_scheduler_running",
+                "Calls the scheduler has admitted and not yet finished.",
+                (),
+                lambda: {(): self.scheduler.get_stats()["running"]},
+            )
+        if self.response_cache is not None:
+            metrics.add_gauge(
+                "aop_cache_entries",
+                "Entries in the response cache.",
+                (),
+                lambda: {(): len(self.response_cache.backend)},
+            )
+        if self.llm_client is not None:
+            metrics.add_gauge(
+                "aop_llm_rate_limit_pause_seconds",
+                "Seconds until the provider rate limit lets LLM requests through.",
+                (),
+                lambda: {(): self.llm_client.rate_limiter.paused_for()},
+            )
+        if isinstance(self.executor, WorkerPoolExecutor):
+            metrics.add_gauge(
+                "aop_worker_in_flight",
+                "Calls in flight per worker process.",
+                ("worker",),
+                lambda: {
+                    (str(w["index"]),): w["in_flight"]
+                    for w in self.executor.get_stats()["workers"]
+                },
+            )
+
+    def _register_medical_management_tools(self) -> None:
+        """Register the management tools added by this server."""
+
+        if self.metrics is not None:
+            self._register_metrics()
+
+        if self.agent_index is not None:
+            register_discovery_tools(
+                self.mcp_server, self.agent_index, max_page_size=self.discovery_max_page_size
+            )
+
+        if self._async_tools:
+            register_batch_tool(
+                self.mcp_server,
+                self.dispatcher,
+                default_concurrency=self.batch_max_concurrency,
+                max_items=self.batch_max_items,
+                tenant_header=self.tenant_header,
+            )
+            register_pipeline_tool(
+                self.mcp_server,
+                self.dispatcher,
+                pipelines=self.pipelines,
+                max_nodes=self.pipeline_max_nodes,
+                tenant_header=self.tenant_header,
+            )
+
+        if self.task_manager is not None:
+            register_task_tools(
+                self.mcp_server,
+                self.task_manager,
+                self.agents,
+                tenant_header=self.tenant_header,
+            )
+            # Tasks left unfinished by the previous process resume once serving.
+            run_on_startup(self.mcp_server, self.task_manager.recover)
+
+            @self.mcp_server.tool(
+                name="get_task_stats",
+                description="Get background task counts per status and task store write batching.",
+            )
+            def get_task_stats_tool() -> Dict[str, Any]:
+                """
+                Get background task statistics.
+
+                Returns:
+                    Dict containing task counts per status, running and resumed tasks, and store writes
+                """
+                return {"success": True, "stats": self.task_manager.get_stats()}
+
+        if self.scheduler is not None:
+
+            @self.mcp_server.tool(
+                name="get_scheduler_stats",
+                description="Get queue depth, rejections, deadline drops and queue wait per priority lane.",
+            )
+            def get_scheduler_stats_tool() -> Dict[str, Any]:
+                """
+                Get scheduler statistics.
+
+                Returns:
+                    Dict containing running/queued counts and per-lane counters
+                """
+                return {"success": True, "stats": self.scheduler.get_stats()}
+
+        if self.llm_client is not None:
+
+            @self.mcp_server.tool(
+                name="get_llm_client_stats",
+                description="Get request, retry, rate-limit and throttling counters of the shared LLM client.",
+            )
+            def get_llm_client_stats_tool() -> Dict[str, Any]:
+                """
+                Get shared LLM client statistics.
+
+                Returns:
+                    Dict containing request/retry/429 counters, throttle time and pool settings
+                """
+                return {"success": True, "stats": self.llm_client.get_stats()}
+
+        if self.prompt_cache is not None:
+
+            @self.mcp_server.tool(
+                name="get_prompt_cache_stats",
+                description="Get cached vs uncached input tokens and prefix cache hit/miss latency, overall or for one agent.",
+            )
+            def get_prompt_cache_stats_tool(agent_name: str = None) -> Dict[str, Any]:
+                """
+                Get prompt-prefix caching statistics.
+
+                Args:
+                    agent_name: Optional agent name. If None, returns every agent.
+
+                Returns:
+                    Dict containing per-agent prefix size, token split and hit/miss latency
+                """
+                return {
+                    "success": True,
+                    "agent_name": agent_name,
+                    "stats": self.prompt_cache.get_stats(agent_name),
+                }
+
+        if self.single_flight is not None:
+
+            @self.mcp_server.tool(
+                name="get_coalescing_stats",
+                description="Get how many agent calls shared an identical in-flight call, overall or for one agent.",
+            )
+            def get_coalescing_stats_tool(agent_name: str = None) -> Dict[str, Any]:
+                """
+                Get request coalescing statistics.
+
+                Args:
+                    agent_name: Optional agent name. If None, returns totals and per-agent counters.
+
+                Returns:
+                    Dict containing executions, coalesced calls, per-caller timeouts and cancelled flights
+                """
+                return {
+                    "success": True,
+                    "agent_name": agent_name,
+                    "stats": self.single_flight.get_stats(agent_name),
+                }
+
+        if self.structured_output is not None:
+
+            @self.mcp_server.tool(
+                name="get_output_schema",
+                description="Get the SECTION output schema an agent's structured responses follow.",
+            )
+            def get_output_schema_tool(agent_name: str) -> Dict[str, Any]:
+                """
+                Get an agent's structured output schema.
+
+                Args:
+                    agent_name: Name of the agent
+
+                Returns:
+                    Dict containing the agent's sections with their type, fields and whether they are optional
+                """
+                if agent_name not in self.agents:
+                    return {"success": False, "error": f"Agent '{agent_name}' not found"}
+                return {
+                    "success": True,
+                    "agent_name": agent_name,
+                    "structured": self.structured_output.applies_to(agent_name),
+                    "output_schema": self.structured_output.schema_for(
+                        agent_name, self.agents[agent_name]
+                    ),
+                }
+
+        if self.resilience is not None:
+
+            @self.mcp_server.tool(
+                name="get_resilience_stats",
+                description="Get observed agent latency quantiles, hedges, timeouts and backend circuit states.",
+            )
+            def get_resilience_stats_tool(agent_name: str = None) -> Dict[str, Any]:
+                """
+                Get adaptive timeout, hedging and circuit breaker statistics.
+
+                Args:
+                    agent_name: Optional agent name. If None, returns every agent and backend.
+
+                Returns:
+                    Dict containing latency quantiles, attempts, hedges, timeouts, shed calls and circuit states
+                """
+                return {
+                    "success": True,
+                    "agent_name": agent_name,
+                    "stats": self.resilience.get_stats(agent_name),
+                }
+
+        if self.image_pipeline is not None:
+
+            @self.mcp_server.tool(
+                name="get_image_stats",
+                description="Get image preprocessing cache hits, deduplicated encodes and downscaled images.",
+            )
+            def get_image_stats_tool() -> Dict[str, Any]:
+                """
+                Get image preprocessing statistics.
+
+                Returns:
+                    Dict containing images seen, cache hits, encodes, resizes and cache occupancy
+                """
+                return {"success": True, "stats": self.image_pipeline.get_stats()}
+
+        if isinstance(self.executor, WorkerPoolExecutor):
+
+            @self.mcp_server.tool(
+                name="get_worker_stats",
+                description="Get per-process load, restarts and health of the agent worker pool.",
+            )
+            def get_worker_stats_tool() -> Dict[str, Any]:
+                """
+                Get agent worker pool statistics.
+
+                Returns:
+                    Dict containing per-worker pid, liveness, in-flight and completed counts
+                """
+                return {"success": True, "stats": self.executor.get_stats()}
+
+        if self.response_cache is not None:
+
+            @self.mcp_server.tool(
+                name="get_cache_stats",
+                description="Get response cache hit/miss counters, overall or for one agent.",
+            )
+            def get_cache_stats_tool(agent_name: str = None) -> Dict[str, Any]:
+                """
+                Get response cache statistics.
+
+                Args:
+                    agent_name: Optional agent name. If None, returns totals and per-agent counters.
+
+                Returns:
+                    Dict containing the cache statistics
+                """
+                return {
+                    "success": True,
+                    "agent_name": agent_name,
+                    "stats": self.response_cache.get_stats(agent_name),
+                }
+
+            @self.mcp_server.tool(
+                name="clear_response_cache",
+                description="Remove every entry from the response cache.",
+            )
+            def clear_response_cache_tool() -> Dict[str, Any]:
+                """
+                Clear the response cache.
+
+                Returns:
+                    Dict containing the number of entries removed
+                """
+                return {"success": True, "cleared": self.response_cache.clear()}
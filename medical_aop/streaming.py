@@ -0,0 +1,126 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+from medical_aop.sections import _header
+
+ChunkCallback = Callable[[str], Awaitable[None]]
+
+
+def token_text(token: Any) -> str:
+    """Extract the text of a streamed token (plain string or ``{"token": ...}``)."""
+    if isinstance(token, str):
+        return token
+    if isinstance(token, dict):
+        return token.get("token") or token.get("content") or ""
+    return ""
+
+
+class SectionChunker:
+    """Group streamed tokens into whole ``SECTION:`` blocks.
+
+    Text is released one section at a time, as soon as the header of the
+    next section arrives (headers are recognized as ``SectionParser``
+    does, markdown around the marker included); ``flush`` releases
+    whatever is left.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        # Start of the first line not yet checked for a header.
+        self._line_start = 0
+
+    def feed(self, text: str) -> List[str]:
+        self._buffer += text
+        chunks = []
+        while True:
+            start = self._line_start
+            end = self._buffer.find("\n", start)
+            line = self._buffer[start:] if end == -1 else self._buffer[start:end]
+            if start and _header(line) is not None:
+                # Headers are known by their prefix, before the line ends.
+                chunks.append(self._buffer[:start])
+                self._buffer = self._buffer[start:]
+                self._line_start = start = 0
+                end = self._buffer.find("\n")
+            if end == -1:
+                return chunks
+            self._line_start = end + 1
+
+    def flush(self) -> List[str]:
+        chunk, self._buffer = self._buffer, ""
+        self._line_start = 0
+        return [chunk] if chunk else []
+
+
+class TokenChunker:
+    """Pass tokens through as they arrive."""
+
+    def feed(self, text: str) -> List[str]:
+        return [text] if text else []
+
+    def flush(self) -> List[str]:
+        return []
+
+
+class TokenStream:
+    """Bridge an agent's synchronous ``streaming_callback`` to async chunks.
+
+    ``push`` is safe to call from the agent's worker thread; ``pump`` runs
+    on the event loop and forwards chunks to ``on_chunk``. Tokens that
+    queue up while a chunk is being delivered are coalesced.
+
+    Args:
+        on_chunk: Coroutine receiving each chunk of text.
+        mode: ``"sections"`` to emit whole SECTION blocks, ``"tokens"`` to
+            emit tokens as they arrive.
+        parser: Optional incremental parser (``feed(text)``) that sees the
+            text as it streams, e.g. a ``SectionParser``.
+    """
+
+    _DONE = object()
+
+    def __init__(
+        self, on_chunk: ChunkCallback, mode: str = "sections", parser: Optional[Any] = None
+    ):
+        if mode not in ("sections", "tokens"):
+            raise ValueError(f"mode must be 'sections' or 'tokens', got {mode!r}")
+        self.on_chunk = on_chunk
+        self.chunker = SectionChunker() if mode == "sections" else TokenChunker()
+        self.parser = parser
+        self.tokens_received = 0
+        self.chunks_sent = 0
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def push(self, token: Any) -> None:
+        text = token_text(token)
+        if text:
+            self.tokens_received += 1
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, text)
+
+    def close(self, final_text: Optional[str] = None) -> None:
+        """Finish the stream; ``final_text`` is streamed if no tokens arrived."""
+        if final_text and not self.tokens_received:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, final_text)
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, self._DONE)
+
+    async def _emit(self, chunks: List[str]) -> None:
+        for chunk in chunks:
+            self.chunks_sent += 1
+            await self.on_chunk(chunk)
+
+    async def pump(self) -> None:
+        done = False
+        while not done:
+            parts = [await self._queue.get()]
+            while not self._queue.empty():
+                parts.append(self._queue.get_nowait())
+            if parts[-1] is self._DONE:
+                parts.pop()
+                done = True
+            if parts:
+                text = "".join(parts)
+                if self.parser is not None:
+                    self.parser.feed(text)
+                await self._emit(self.chunker.feed(text))
+        await self._emit(self.chunker.flush())
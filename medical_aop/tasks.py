@@ -0,0 +1,403 @@
+import asyncio
+import atexit
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from loguru import logger
+
+Dispatch = Callable[..., Awaitable[Dict[str, Any]]]
+
+PENDING, PROCESSING, COMPLETED, FAILED = "pending", "processing", "completed", "failed"
+FINISHED = (COMPLETED, FAILED)
+
+
+class TaskStore:
+    """Durable task records in SQLite (WAL mode) with batched writes.
+
+    ``save`` only queues a record; a writer thread commits everything
+    queued since its last commit in one transaction (group commit), and
+    several saves of the same task in one batch collapse into one row
+    write. Reads see queued records immediately.
+
+    Args:
+        path: SQLite file, or ``":memory:"`` for a store that does not
+            survive restarts.
+        batch_size: Most records per transaction.
+        flush_interval: Seconds the writer waits to collect a batch.
+        retention: Seconds finished tasks are kept (None keeps them).
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        batch_size: int = 512,
+        flush_interval: float = 0.005,
+        retention: Optional[float] = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention = retention
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                agent_name TEXT NOT NULL,
+                tenant TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_updated ON tasks (updated_at)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_tenant ON tasks (tenant, created_at)"
+        )
+        self._conn.commit()
+        self._db_lock = threading.Lock()
+        lock = threading.Lock()
+        self._cond = threading.Condition(lock)
+        self._committed = threading.Condition(lock)
+        self._queued: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, Dict[str, Any]] = {}
+        self._batch_done: Future = Future()
+        self._closing = False
+        self._stats = {"saves": 0, "rows_written": 0, "batches": 0, "pruned": 0}
+        self._writer = threading.Thread(target=self._write_loop, name="task-store-writer", daemon=True)
+        self._writer.start()
+        self._last_prune = 0.0
+        atexit.register(self.close)
+
+    def save(self, record: Dict[str, Any]) -> Future:
+        """Queue ``record`` for writing.
+
+        Returns:
+            A future resolved once the batch holding it is committed.
+        """
+        record["updated_at"] = time.time()
+        with self._cond:
+            if self._closing:
+                raise RuntimeError("Task store is closed")
+            self._queued[record["task_id"]] = dict(record)
+            self._stats["saves"] += 1
+            done = self._batch_done
+            self._cond.notify()
+        return done
+
+    def _write_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queued and not self._closing:
+                    self._cond.wait()
+                if not self._queued and self._closing:
+                    return
+            if self.flush_interval and not self._closing:
+                time.sleep(self.flush_interval)
+            with self._cond:
+                if len(self._queued) <= self.batch_size:
+                    batch, self._queued = self._queued, {}
+                    done, self._batch_done = self._batch_done, Future()
+                else:
+                    # The batch future stays with the records left behind.
+                    keys = list(self._queued)[: self.batch_size]
+                    batch = {key: self._queued.pop(key) for key in keys}
+                    done = None
+                self._inflight = batch
+            try:
+                self._write(list(batch.values()))
+            except Exception as e:
+                logger.error(f"Task store write of {len(batch)} records failed: {e}")
+                with self._cond:
+                    for task_id, record in batch.items():
+                        self._queued.setdefault(task_id, record)
+                    self._inflight = {}
+                    if done is not None:
+                        # Released once the retry commits.
+                        self._batch_done.add_done_callback(lambda _, done=done: done.set_result(None))
+                time.sleep(0.1)
+                continue
+            with self._cond:
+                self._inflight = {}
+                self._committed.notify_all()
+            if done is not None:
+                done.set_result(None)
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        rows = [
+            (
+                r["task_id"],
+                r["agent_name"],
+                r["tenant"],
+                r["status"],
+                r["created_at"],
+                r["updated_at"],
+                json.dumps(r),
+            )
+            for r in records
+        ]
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tasks "
+                "(task_id, agent_name, tenant, status, created_at, updated_at, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._prune()
+            self._conn.commit()
+        self._stats["rows_written"] += len(rows)
+        self._stats["batches"] += 1
+
+    def _prune(self) -> None:
+        now = time.time()
+        if self.retention is None or now - self._last_prune < 60:
+            return
+        self._last_prune = now
+        cursor = self._conn.execute(
+            "DELETE FROM tasks WHERE status IN (?, ?) AND updated_at < ?",
+            (*FINISHED, now - self.retention),
+        )
+        self._stats["pruned"] += cursor.rowcount
+
+    def flush(self, timeout: Optional[float] = None) -> None:
+        """Block until every record saved so far is committed."""
+        with self._cond:
+            self._committed.wait_for(lambda: not self._queued and not self._inflight, timeout)
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._cond:
+            record = self._queued.get(task_id) or self._inflight.get(task_id)
+        if record is not None:
+            return dict(record)
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT data FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(
+        self,
+        statuses: Optional[List[str]] = None,
+        agent_name: Optional[str] = None,
+        tenant: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Records by status, agent and tenant, newest first (queued writes included)."""
+        self.flush()
+        clauses, params = [], []
+        if statuses:
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        if agent_name:
+            clauses.append("agent_name = ?")
+            params.append(agent_name)
+        if tenant:
+            clauses.append("tenant = ?")
+            params.append(tenant)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        params.append(-1 if limit is None else limit)
+        with self._db_lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM tasks {where} ORDER BY created_at DESC LIMIT ?", params
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """Committed records per status."""
+        with self._db_lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM tasks GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["queued"] = len(self._queued)
+        stats["avg_batch_rows"] = (
+            round(stats["rows_written"] / stats["batches"], 1) if stats["batches"] else 0.0
+        )
+        stats["path"] = self.path
+        return stats
+
+    def close(self) -> None:
+        """Commit everything queued and stop the writer."""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify()
+        self._writer.join(timeout=10)
+        with self._db_lock:
+            self._conn.close()
+
+
+class TaskManager:
+    """Fire-and-forget agent calls with durable status, backed by ``TaskStore``.
+
+    ``submit`` records the task and returns its id at once; the call runs
+    in the background through ``dispatch`` (so it goes through the same
+    scheduler, cache and retries as a direct tool call). Clients poll
+    ``get`` or block on ``wait``. ``recover`` re-queues tasks that were
+    pending or processing when the previous process stopped.
+
+    Args:
+        store: Where task records are kept.
+        dispatch: Coroutine running one call, e.g. ``AgentDispatcher.dispatch``.
+        durable_submit: Only acknowledge a submit once its record is
+            committed (shared with concurrent submits), so an accepted task
+            survives a crash right after.
+        max_resumes: Times a task interrupted while processing is re-run
+            before it is marked failed.
+    """
+
+    def __init__(
+        self,
+        store: TaskStore,
+        dispatch: Dispatch,
+        durable_submit: bool = True,
+        max_resumes: int = 2,
+    ):
+        self.store = store
+        self.dispatch = dispatch
+        self.durable_submit = durable_submit
+        self.max_resumes = max_resumes
+        self._events: Dict[str, asyncio.Event] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._recovered = 0
+
+    async def submit(
+        self,
+        agent_name: str,
+        task: str,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        priority: Optional[int] = None,
+        tenant: str = "anonymous",
+    ) -> Dict[str, Any]:
+        """Record a task and start it in the background; returns the record."""
+        now = time.time()
+        record = {
+            "task_id": uuid.uuid4().hex,
+            "agent_name": agent_name,
+            "task": task,
+            "img": img,
+            "imgs": imgs,
+            "correct_answer": correct_answer,
+            "priority": priority,
+            "tenant": tenant,
+            "status": PENDING,
+            "result": None,
+            "error": None,
+            "retry_count": 0,
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+        }
+        committed = self.store.save(record)
+        if self.durable_submit:
+            await asyncio.wrap_future(committed)
+        self._start(record)
+        return record
+
+    def _start(self, record: Dict[str, Any]) -> None:
+        self._events.setdefault(record["task_id"], asyncio.Event())
+        job = asyncio.ensure_future(self._run(record))
+        self._running.add(job)
+        job.add_done_callback(self._running.discard)
+
+    async def _run(self, record: Dict[str, Any]) -> None:
+        record = dict(record, status=PROCESSING, started_at=time.time())
+        self.store.save(record)
+        try:
+            response = await self.dispatch(
+                record["agent_name"],
+                record["task"],
+                img=record["img"],
+                imgs=record["imgs"],
+                correct_answer=record["correct_answer"],
+                tenant=record["tenant"],
+                priority=record["priority"],
+            )
+        except Exception as e:
+            response = {"result": "", "success": False, "error": str(e)}
+        record.update(
+            status=COMPLETED if response.get("success") else FAILED,
+            result=response.get("result"),
+            error=response.get("error"),
+            finished_at=time.time(),
+        )
+        self.store.save(record)
+        event = self._events.pop(record["task_id"], None)
+        if event is not None:
+            event.set()
+
+    async def recover(self) -> int:
+        """Re-queue tasks left unfinished by the previous process.
+
+        Returns:
+            Number of tasks resumed.
+        """
+        unfinished = await asyncio.to_thread(self.store.query, [PENDING, PROCESSING])
+        resumed = 0
+        for record in reversed(unfinished):
+            if record["task_id"] in self._events:
+                continue
+            if record["status"] == PROCESSING:
+                record["retry_count"] += 1
+                if record["retry_count"] > self.max_resumes:
+                    record.update(
+                        status=FAILED,
+                        error=f"Interrupted {record['retry_count']} times while processing",
+                        finished_at=time.time(),
+                    )
+                    self.store.save(record)
+                    continue
+            record["status"] = PENDING
+            self.store.save(record)
+            self._start(record)
+            resumed += 1
+        self._recovered += resumed
+        if resumed:
+            logger.info(f"Resumed {resumed} unfinished tasks from {self.store.path}")
+        return resumed
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """A task's record, read off the event loop."""
+        return await asyncio.to_thread(self.store.get, task_id)
+
+    async def wait(self, task_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Wait until a task finishes (or ``timeout``); returns its record."""
+        record = await self.get(task_id)
+        if record is None or record["status"] in FINISHED:
+            return record
+        event = self._events.get(task_id)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return await self.get(task_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "running": len(self._running),
+            "recovered": self._recovered,
+            "by_status": self.store.counts(),
+            "store": self.store.get_stats(),
+        }
+
+    def close(self) -> None:
+        self.store.close()
@@ -0,0 +1,616 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.fastmcp.exceptions import ToolError
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from medical_aop.batch import run_batch
+from medical_aop.discovery import (
+    DEFAULT_SEARCH_FIELDS,
+    SEARCH_FIELDS,
+    AgentIndex,
+    paginate,
+    project,
+)
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.pipeline import PipelineError, run_pipeline
+from medical_aop.metrics import Metrics
+from medical_aop.streaming import ChunkCallback
+from medical_aop.tasks import FINISHED, TaskManager
+
+
+def progress_chunk_callback(ctx: Optional[Context]) -> Optional[ChunkCallback]:
+    """Chunk callback that forwards output as MCP progress notifications.
+
+    Returns None when the client did not send a progress token, so clients
+    that do not listen for progress pay nothing for streaming.
+    """
+    if ctx is None:
+        return None
+    meta = ctx.request_context.meta
+    if meta is None or meta.progressToken is None:
+        return None
+    sent = 0
+
+    async def on_chunk(chunk: str) -> None:
+        nonlocal sent
+        sent += 1
+        await ctx.report_progress(sent, None, message=chunk)
+
+    return on_chunk
+
+
+def request_tenant(ctx: Optional[Context], header: str = "x-tenant-id") -> str:
+    """Identify the tenant behind an MCP request for scheduling.
+
+    Uses the ``header`` value when present, otherwise a short hash of the
+    API key (``x-api-key`` or ``Authorization``), otherwise ``"anonymous"``.
+    """
+    request = getattr(ctx.request_context, "request", None) if ctx is not None else None
+    headers = getattr(request, "headers", None)
+    if headers is None:
+        return "anonymous"
+    tenant = headers.get(header)
+    if tenant:
+        return tenant
+    api_key = headers.get("x-api-key") or headers.get("authorization")
+    if api_key:
+        return "key:" + hashlib.sha256(api_key.encode()).hexdigest()[:12]
+    return "anonymous"
+
+
+def register_agent_tool(
+    server: FastMCP,
+    dispatcher: AgentDispatcher,
+    tool_name: str,
+    description: Optional[str] = None,
+    tenant_header: str = "x-tenant-id",
+) -> None:
+    """Register one agent as an async MCP tool backed by ``dispatcher``."""
+
+    @server.tool(name=tool_name, description=description)
+    async def agent_tool(
+        task: str = None,
+        img: str = None,
+        imgs: List[str] = None,
+        correct_answer: str = None,
+        max_retries: int = None,
+        priority: int = None,
+        timeout: float = None,
+        ctx: Context = None,
+    ) -> Dict[str, Any]:
+        """
+        Execute the agent with the provided parameters.
+
+        Args:
+            task: The task or prompt to execute with this agent
+            img: Optional image to be processed by the agent
+            imgs: Optional list of images to be processed by the agent
+            correct_answer: Optional correct answer for validation or comparison
+            max_retries: Maximum number of retries (uses config default if None)
+            priority: Task priority; above 0 is urgent (red-flag), below 0 is bulk
+            timeout: Client-side timeout in seconds; the call is dropped if it
+                is still queued when this expires (uses config default if None)
+            ctx: MCP request context; output is streamed as progress
+                notifications when the client sends a progress token
+
+        Returns:
+            Dict containing the agent's response and execution status
+        """
+        return await dispatcher.dispatch(
+            tool_name,
+            task,
+            img=img,
+            imgs=imgs,
+            correct_answer=correct_answer,
+            max_retries=max_retries,
+            on_chunk=progress_chunk_callback(ctx),
+            tenant=request_tenant(ctx, tenant_header),
+            priority=priority,
+            timeout=timeout,
+        )
+
+
+def register_batch_tool(
+    server: FastMCP,
+    dispatcher: AgentDispatcher,
+    default_concurrency: int = 8,
+    max_items: int = 1000,
+    tenant_header: str = "x-tenant-id",
+) -> None:
+    """Register the ``batch_run`` tool backed by ``dispatcher``."""
+
+    @server.tool(
+        name="batch_run",
+        description=(
+            "Run many tasks against one agent in a single call. Items are "
+            "{id, task, img, imgs, correct_answer, priority}; results are "
+            "streamed as progress notifications as each item finishes. Items "
+            "run in the bulk lane unless a priority is given."
+        ),
+    )
+    async def batch_run_tool(
+        agent_name: str,
+        items: List[Dict[str, Any]],
+        max_concurrency: int = None,
+        priority: int = -1,
+        ctx: Context = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a batch of tasks against one agent with bounded concurrency.
+
+        Args:
+            agent_name: Name of the agent tool to run every item against
+            items: List of task payloads, each with an optional caller-supplied id
+            max_concurrency: Items in flight at once (uses server default if None)
+            priority: Default priority for items without one (bulk lane by default)
+            ctx: MCP request context used to stream per-item results
+
+        Returns:
+            Dict containing per-item results and summary counts
+        """
+        if agent_name not in dispatcher.agents:
+            return {
+                "success": False,
+                "error": f"Agent '{agent_name}' not found",
+                "results": [],
+            }
+        if len(items) > max_items:
+            return {
+                "success": False,
+                "error": f"Batch of {len(items)} items exceeds the limit of {max_items}",
+                "results": [],
+            }
+
+        async def stream_result(
+            completed: int, total: int, result: Dict[str, Any]
+        ) -> None:
+            if ctx is not None:
+                await ctx.report_progress(completed, total, message=json.dumps(result))
+
+        return await run_batch(
+            dispatcher.dispatch,
+            agent_name,
+            items,
+            max_concurrency=max_concurrency or default_concurrency,
+            on_result=stream_result,
+            dispatch_kwargs={
+                "tenant": request_tenant(ctx, tenant_header),
+                "priority": priority,
+            },
+        )
+
+
+def register_pipeline_tool(
+    server: FastMCP,
+    dispatcher: AgentDispatcher,
+    pipelines: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+    max_nodes: int = 32,
+    tenant_header: str = "x-tenant-id",
+) -> None:
+    """Register the ``run_pipeline`` tool backed by ``dispatcher``.
+
+    ``pipelines`` maps names to predefined graphs clients can run by name
+    instead of sending ``nodes``.
+    """
+    pipelines = pipelines or {}
+
+    @server.tool(
+        name="run_pipeline",
+        description=(
+            "Run one case through a graph of agents in a single call. Nodes are "
+            "{id, agent, depends_on, sections, task, priority}; independent nodes run "
+            "concurrently and each node gets the case plus its upstream outputs "
+            "(optionally only some SECTIONs). Node results are streamed as progress "
+            "notifications. Predefined graphs: "
+            + (", ".join(sorted(pipelines)) or "none")
+            + "."
+        ),
+    )
+    async def run_pipeline_tool(
+        case: str,
+        nodes: List[Dict[str, Any]] = None,
+        pipeline: str = None,
+        max_concurrency: int = None,
+        priority: int = None,
+        ctx: Context = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a DAG of agent calls on one case.
+
+        Args:
+            case: The case payload (clinical note, labs, medication list, ...)
+            nodes: The graph to run; each node names an agent and its dependencies
+            pipeline: Name of a predefined graph, used when nodes is not given
+            max_concurrency: Nodes in flight at once (all ready nodes if None)
+            priority: Default priority for nodes without one
+            ctx: MCP request context used to stream per-node results
+
+        Returns:
+            Dict containing per-node results and timing, the critical path and totals
+        """
+        if not nodes:
+            if pipeline not in pipelines:
+                return {
+                    "success": False,
+                    "error": f"Unknown pipeline {pipeline!r}; send nodes or use one of {sorted(pipelines)}",
+                    "results": {},
+                }
+            nodes = pipelines[pipeline]
+
+        async def stream_result(
+            completed: int, total: int, result: Dict[str, Any]
+        ) -> None:
+            if ctx is not None:
+                await ctx.report_progress(completed, total, message=json.dumps(result))
+
+        dispatch_kwargs: Dict[str, Any] = {"tenant": request_tenant(ctx, tenant_header)}
+        if priority is not None:
+            dispatch_kwargs["priority"] = priority
+        try:
+            return await run_pipeline(
+                dispatcher.dispatch,
+                case,
+                nodes,
+                agents=dispatcher.agents,
+                max_concurrency=max_concurrency,
+                max_nodes=max_nodes,
+                on_result=stream_result,
+                dispatch_kwargs=dispatch_kwargs,
+            )
+        except PipelineError as e:
+            return {"success": False, "error": str(e), "results": {}}
+
+
+DISCOVERY_TOOLS = ("discover_agents", "get_agents_info", "list_agents", "search_agents")
+
+
+def register_discovery_tools(
+    server: FastMCP, index: AgentIndex, max_page_size: Optional[int] = None
+) -> None:
+    """Serve the AOP discovery tools from ``index``, with pagination and projection.
+
+    Replaces ``discover_agents``, ``get_agents_info``, ``list_agents`` and
+    ``search_agents`` (keeping their arguments and response keys) with
+    versions that read precomputed records instead of rebuilding every
+    agent's metadata per call. Each takes ``offset`` / ``limit`` and
+    returns ``total`` and ``next_offset``; ``fields`` projects the records,
+    e.g. ``["tool_name", "tags"]``.
+    """
+    for name in DISCOVERY_TOOLS:
+        try:
+            server.remove_tool(name)
+        except ToolError:
+            pass
+
+    def page(
+        items: List[Any], offset: int, limit: Optional[int]
+    ) -> Tuple[List[Any], Optional[int]]:
+        if max_page_size is not None:
+            limit = min(limit or max_page_size, max_page_size)
+        return paginate(items, offset, limit)
+
+    @server.tool(
+        name="discover_agents",
+        description=(
+            "Discover agents in the cluster: name, description, short system prompt, "
+            "tags and capabilities. Supports offset/limit paging and a fields projection."
+        ),
+    )
+    def discover_agents_tool(
+        agent_name: str = None,
+        offset: int = 0,
+        limit: int = None,
+        fields: List[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Discover information about agents.
+
+        Args:
+            agent_name: Optional agent name. If None, returns every agent (paged).
+            offset: Index of the first agent to return
+            limit: Maximum number of agents to return (all if None)
+            fields: Optional record fields to return, e.g. ["tool_name", "tags"]
+
+        Returns:
+            Dict containing the agents page, the total count and the next offset
+        """
+        if agent_name:
+            info = index.get(agent_name)
+            if info is None:
+                return {
+                    "success": False,
+                    "error": f"Agent '{agent_name}' not found",
+                    "agents": [],
+                }
+            return {
+                "success": True,
+                "agents": [project(info, fields)],
+                "total": 1,
+                "next_offset": None,
+            }
+        names = index.names()
+        page_names, next_offset = page(names, offset, limit)
+        return {
+            "success": True,
+            "agents": [project(info, fields) for info in index.records(page_names)],
+            "total": len(names),
+            "next_offset": next_offset,
+        }
+
+    @server.tool(
+        name="get_agents_info",
+        description="Get discovery information for several agents at once, optionally projected to some fields.",
+    )
+    def get_agents_info_tool(
+        agent_names: List[str], fields: List[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get information about multiple agents.
+
+        Args:
+            agent_names: Names of the agents to look up
+            fields: Optional record fields to return
+
+        Returns:
+            Dict containing the records found and the names not found
+        """
+        found = [project(info, fields) for info in index.records(agent_names)]
+        return {
+            "success": True,
+            "agents_info": found,
+            "not_found": [name for name in agent_names if name not in index],
+            "total_found": len(found),
+        }
+
+    @server.tool(
+        name="list_agents",
+        description="List the names of the available agents, with offset/limit paging.",
+    )
+    def list_agents_tool(offset: int = 0, limit: int = None) -> Dict[str, Any]:
+        """
+        List agent names.
+
+        Args:
+            offset: Index of the first name to return
+            limit: Maximum number of names to return (all if None)
+
+        Returns:
+            Dict containing the names page, the total count and the next offset
+        """
+        names = index.names()
+        agent_names, next_offset = page(names, offset, limit)
+        return {
+            "success": True,
+            "agent_names": agent_names,
+            "count": len(names),
+            "next_offset": next_offset,
+        }
+
+    @server.tool(
+        name="search_agents",
+        description=(
+            "Search agents by keywords in their name, description, tags, capabilities "
+            "or role. Results are ranked; supports offset/limit paging and a fields projection."
+        ),
+    )
+    def search_agents_tool(
+        query: str,
+        search_fields: List[str] = None,
+        offset: int = 0,
+        limit: int = None,
+        fields: List[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Search agents by keywords.
+
+        Args:
+            query: Keywords; every word must match a word (or word prefix) in a searched field
+            search_fields: Fields to search: name, description, tags, capabilities, role
+            offset: Index of the first match to return
+            limit: Maximum number of matches to return (all if None)
+            fields: Optional record fields to return, e.g. ["tool_name", "tags"]
+
+        Returns:
+            Dict containing the ranked matches page, the total count and the next offset
+        """
+        unknown = [field for field in search_fields or () if field not in SEARCH_FIELDS]
+        if unknown:
+            return {
+                "success": False,
+                "error": f"Unknown search fields {unknown}; use {list(SEARCH_FIELDS)}",
+                "matching_agents": [],
+            }
+        ranked = index.search(query, search_fields)
+        matches, next_offset = page(ranked, offset, limit)
+        return {
+            "success": True,
+            "matching_agents": [
+                {**project(info, fields), "score": score}
+                for info, score in ((index.get(name), score) for name, score in matches)
+                if info is not None
+            ],
+            "total_matches": len(ranked),
+            "next_offset": next_offset,
+            "query": query,
+            "search_fields": search_fields or list(DEFAULT_SEARCH_FIELDS),
+        }
+
+
+def register_task_tools(
+    server: FastMCP,
+    manager: TaskManager,
+    agents: Dict[str, Any],
+    max_wait: float = 300,
+    tenant_header: str = "x-tenant-id",
+) -> None:
+    """Register ``submit_task``, ``get_task_status``, ``wait_for_task`` and ``list_tasks``.
+
+    Tasks are only visible to the tenant that submitted them.
+    """
+
+    def visible(record: Optional[Dict[str, Any]], ctx: Optional[Context]) -> bool:
+        return record is not None and record["tenant"] == request_tenant(ctx, tenant_header)
+
+    def task_response(task_id: str, record: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if record is None:
+            return {"success": False, "task_id": task_id, "error": f"Task '{task_id}' not found"}
+        return {"success": True, "finished": record["status"] in FINISHED, "task": record}
+
+    @server.tool(
+        name="submit_task",
+        description=(
+            "Submit an agent call to run in the background and return its task_id "
+            "at once. The task is stored durably and resumed after a server restart; "
+            "poll get_task_status or block on wait_for_task for the result."
+        ),
+    )
+    async def submit_task_tool(
+        agent_name: str,
+        task: str,
+        img: str = None,
+        imgs: List[str] = None,
+        correct_answer: str = None,
+        priority: int = None,
+        ctx: Context = None,
+    ) -> Dict[str, Any]:
+        """
+        Submit a background agent task.
+
+        Args:
+            agent_name: Name of the agent tool to run
+            task: The task to execute
+            img: Optional image to be processed by the agent
+            imgs: Optional list of images to be processed by the agent
+            correct_answer: Optional correct answer for validation or comparison
+            priority: Optional task priority; above 0 is red-flag, below 0 is bulk
+            ctx: MCP request context used to identify the tenant
+
+        Returns:
+            Dict containing the task_id and its initial status
+        """
+        if agent_name not in agents:
+            return {"success": False, "error": f"Agent '{agent_name}' not found"}
+        record = await manager.submit(
+            agent_name,
+            task,
+            img=img,
+            imgs=imgs,
+            correct_answer=correct_answer,
+            priority=priority,
+            tenant=request_tenant(ctx, tenant_header),
+        )
+        return {
+            "success": True,
+            "task_id": record["task_id"],
+            "agent_name": agent_name,
+            "status": record["status"],
+        }
+
+    @server.tool(
+        name="get_task_status",
+        description="Get the status of a submitted task, with its result once it has finished.",
+    )
+    async def get_task_status_tool(task_id: str, ctx: Context = None) -> Dict[str, Any]:
+        """
+        Get the status of a submitted task.
+
+        Args:
+            task_id: ID returned by submit_task
+            ctx: MCP request context used to identify the tenant
+
+        Returns:
+            Dict containing the task record (status, result, error, timestamps)
+        """
+        record = await manager.get(task_id)
+        return task_response(task_id, record if visible(record, ctx) else None)
+
+    @server.tool(
+        name="wait_for_task",
+        description=(
+            f"Wait until a submitted task finishes (at most timeout seconds, capped at "
+            f"{max_wait:g}) and return its status and result."
+        ),
+    )
+    async def wait_for_task_tool(
+        task_id: str, timeout: float = 30, ctx: Context = None
+    ) -> Dict[str, Any]:
+        """
+        Wait for a submitted task to finish.
+
+        Args:
+            task_id: ID returned by submit_task
+            timeout: Seconds to wait before returning the current status
+            ctx: MCP request context used to identify the tenant
+
+        Returns:
+            Dict containing the task record and whether it has finished
+        """
+        if not visible(await manager.get(task_id), ctx):
+            return task_response(task_id, None)
+        record = await manager.wait(task_id, min(max(timeout, 0), max_wait))
+        return task_response(task_id, record)
+
+    @server.tool(
+        name="list_tasks",
+        description="List your submitted tasks, newest first, optionally filtered by status and agent.",
+    )
+    async def list_tasks_tool(
+        status: str = None, agent_name: str = None, limit: int = 50, ctx: Context = None
+    ) -> Dict[str, Any]:
+        """
+        List submitted tasks.
+
+        Args:
+            status: Optional status filter (pending, processing, completed, failed)
+            agent_name: Optional agent name filter
+            limit: Maximum number of tasks to return
+            ctx: MCP request context used to identify the tenant
+
+        Returns:
+            Dict containing task summaries without their results
+        """
+        records = await asyncio.to_thread(
+            manager.store.query,
+            [status] if status else None,
+            agent_name,
+            request_tenant(ctx, tenant_header),
+            max(limit, 0),
+        )
+        tasks = [
+            {key: record[key] for key in ("task_id", "agent_name", "status", "created_at", "finished_at")}
+            for record in records
+        ]
+        return {"success": True, "tasks": tasks, "count": len(tasks)}
+
+
+def run_on_startup(server: FastMCP, hook: Callable[[], Awaitable[Any]]) -> None:
+    """Await ``hook`` on the server's event loop before it starts serving.
+
+    Wraps the transport entry points ``FastMCP.run`` calls, so background
+    work started by ``hook`` lives on the loop that serves requests.
+    """
+    for name in ("run_stdio_async", "run_sse_async", "run_streamable_http_async"):
+        serve = getattr(server, name)
+
+        async def run_async(*args, serve=serve, **kwargs) -> None:
+            await hook()
+            await serve(*args, **kwargs)
+
+        setattr(server, name, run_async)
+
+
+def register_metrics_route(
+    server: FastMCP, metrics: Metrics, path: str = "/metrics"
+) -> None:
+    """Serve ``metrics`` in the Prometheus text format next to the MCP endpoint."""
+
+    @server.custom_route(path, methods=["GET"], include_in_schema=False)
+    async def metrics_endpoint(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(
+            metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
@@ -0,0 +1,398 @@
+import asyncio
+import importlib
+import itertools
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from medical_aop.execution import AsyncAgentExecutor
+from medical_aop.lazy import build_agents
+from medical_aop.llm_client import SharedLLMClient
+from medical_aop.prompt_cache import PromptCache
+from medical_aop.resilience import Resilience
+from medical_aop.streaming import token_text
+
+
+def load_agents(spec: str) -> Dict[str, Any]:
+    """Resolve an agent factory spec like ``"medical_agents:agents"``.
+
+    The attribute may be a list of agents or a callable returning one.
+
+    Returns:
+        Mapping of ``agent_name`` to agent.
+    """
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Agent factory must look like 'module:attribute', got {spec!r}")
+    target = getattr(importlib.import_module(module_name), attr)
+    agents = target() if callable(target) else target
+    return {agent.agent_name: agent for agent in agents}
+
+
+async def _serve_worker(conn: Any, agents: Dict[str, Any], executor: AsyncAgentExecutor) -> None:
+    loop = asyncio.get_running_loop()
+    running = set()
+
+    async def handle(request_id: int, agent_name: str, kwargs: Dict[str, Any], stream: bool) -> None:
+        agent = agents.get(agent_name)
+        if agent is None:
+            response = {
+                "result": "",
+                "success": False,
+                "error": f"Agent '{agent_name}' not found in worker",
+            }
+        else:
+            streaming_callback = None
+            if stream:
+
+                def streaming_callback(token: Any) -> None:
+                    loop.call_soon_threadsafe(
+                        conn.send, ("chunk", request_id, token_text(token))
+                    )
+
+            response = await executor.execute(
+                agent_name, agent, streaming_callback=streaming_callback, **kwargs
+            )
+        conn.send(("result", request_id, response))
+
+    conn.send(("ready", os.getpid(), None))
+    # Lazy agents are built in the background once the worker takes requests.
+    warmup = loop.run_in_executor(None, build_agents, list(agents.values()))
+    running.add(warmup)
+    warmup.add_done_callback(running.discard)
+    while True:
+        try:
+            message = await loop.run_in_executor(None, conn.recv)
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        task = asyncio.ensure_future(handle(*message))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    if running:
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+def _worker_main(
+    conn: Any,
+    agent_factory: str,
+    executor_kwargs: Dict[str, Any],
+    llm_client_options: Optional[Dict[str, Any]] = None,
+    prompt_cache_options: Optional[Dict[str, Any]] = None,
+    resilience_options: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Entry point of a worker process: build the agents and serve requests."""
+    agents = load_agents(agent_factory)
+    llm_client = None
+    if llm_client_options is not None:
+        llm_client = SharedLLMClient(**llm_client_options)
+        for agent in agents.values():
+            llm_client.install(agent)
+    if prompt_cache_options is not None:
+        prompt_cache = PromptCache(**prompt_cache_options)
+        for name, agent in agents.items():
+            prompt_cache.install(name, agent)
+    resilience = Resilience(**resilience_options) if resilience_options is not None else None
+    executor = AsyncAgentExecutor(
+        **executor_kwargs,
+        resilience=resilience,
+        already_retried=llm_client.already_retried if llm_client is not None else None,
+    )
+    try:
+        asyncio.run(_serve_worker(conn, agents, executor))
+    finally:
+        executor.shutdown()
+
+
+class _Worker:
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.ready = threading.Event()
+        self.in_flight: Dict[int, Tuple[asyncio.Future, Optional[Callable[[Any], None]]]] = {}
+        self.completed = 0
+        self.restarts = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class WorkerPoolExecutor:
+    """Dispatch agent calls to a pool of worker processes.
+
+    A drop-in replacement for ``AsyncAgentExecutor``: the front process
+    keeps the MCP endpoint while each worker builds its own agents from
+    ``agent_factory`` and runs them on its own event loop and thread pool,
+    so prompt assembly, parsing and logging are no longer bound to one GIL.
+    Requests travel over a duplex pipe per worker; each worker accepts at
+    most ``max_inflight_per_worker`` requests and callers wait for capacity
+    beyond that. Crashed workers are restarted and their in-flight calls
+    fail with an error instead of hanging.
+
+    Args:
+        agent_factory: ``"module:attribute"`` spec resolving to the agents.
+        workers: Number of worker processes.
+        dispatch: ``"least_loaded"`` or ``"hash"`` (pin each agent to a worker).
+        max_inflight_per_worker: Backpressure limit per worker.
+        max_concurrency_per_agent: Per-agent limit inside each worker.
+        max_threads: Thread pool size inside each worker.
+        retry_delay: Delay between retries inside each worker.
+        llm_client_options: ``SharedLLMClient`` arguments; each worker then
+            shares one pooled LLM client across its agents (None to skip).
+        prompt_cache_options: ``PromptCache`` arguments for prompt-prefix
+            caching inside each worker (None to skip).
+        resilience_options: ``Resilience`` arguments; each worker then
+            adapts timeouts, hedges and breaks circuits for its own calls
+            (None to skip).
+        restart_delay: Seconds to wait before restarting a crashed worker.
+    """
+
+    def __init__(
+        self,
+        agent_factory: str,
+        workers: int = 2,
+        dispatch: str = "least_loaded",
+        max_inflight_per_worker: int = 64,
+        max_concurrency_per_agent: int = 32,
+        max_threads: int = 64,
+        retry_delay: float = 1.0,
+        llm_client_options: Optional[Dict[str, Any]] = None,
+        prompt_cache_options: Optional[Dict[str, Any]] = None,
+        resilience_options: Optional[Dict[str, Any]] = None,
+        restart_delay: float = 1.0,
+    ):
+        if dispatch not in ("least_loaded", "hash"):
+            raise ValueError(f"dispatch must be 'least_loaded' or 'hash', got {dispatch!r}")
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.agent_factory = agent_factory
+        self.dispatch = dispatch
+        self.max_inflight_per_worker = max_inflight_per_worker
+        self.restart_delay = restart_delay
+        self.executor_kwargs = {
+            "max_concurrency_per_agent": max_concurrency_per_agent,
+            "max_threads": max_threads,
+            "retry_delay": retry_delay,
+        }
+        self.llm_client_options = llm_client_options
+        self.prompt_cache_options = prompt_cache_options
+        self.resilience_options = resilience_options
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [_Worker(index) for index in range(workers)]
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._capacity: Optional[asyncio.Semaphore] = None
+        self._started = False
+        self._closing = False
+
+    def start(self, wait: bool = True, timeout: float = 120) -> None:
+        """Spawn the worker processes, optionally waiting until they are ready."""
+        if self._started:
+            return
+        self._started = True
+        for worker in self._workers:
+            self._spawn(worker)
+        if wait:
+            deadline = time.monotonic() + timeout
+            for worker in self._workers:
+                if not worker.ready.wait(max(0, deadline - time.monotonic())):
+                    raise TimeoutError(f"Worker {worker.index} did not start within {timeout}s")
+
+    def _spawn(self, worker: _Worker) -> None:
+        parent_conn, child_conn = self._context.Pipe(duplex=True)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                child_conn,
+                self.agent_factory,
+                self.executor_kwargs,
+                self.llm_client_options,
+                self.prompt_cache_options,
+                self.resilience_options,
+            ),
+            name=f"agent-worker-{worker.index}",
+            daemon=True,
+        )
+        worker.ready.clear()
+        process.start()
+        child_conn.close()
+        worker.process = process
+        worker.conn = parent_conn
+        threading.Thread(
+            target=self._read_responses,
+            args=(worker, parent_conn),
+            name=f"agent-worker-{worker.index}-reader",
+            daemon=True,
+        ).start()
+
+    def _read_responses(self, worker: _Worker, conn: Any) -> None:
+        while True:
+            try:
+                kind, key, payload = conn.recv()
+            except (EOFError, OSError):
+                break
+            if kind == "ready":
+                worker.pid = key
+                worker.ready.set()
+                logger.info(f"Agent worker {worker.index} ready (pid {key})")
+                continue
+            with self._lock:
+                entry = worker.in_flight.get(key)
+                if kind == "result":
+                    worker.in_flight.pop(key, None)
+                    worker.completed += 1
+            if entry is None:
+                continue
+            future, streaming_callback = entry
+            if kind == "chunk":
+                if streaming_callback is not None:
+                    streaming_callback(payload)
+            else:
+                future.get_loop().call_soon_threadsafe(_resolve, future, payload)
+        self._handle_exit(worker, conn)
+
+    def _handle_exit(self, worker: _Worker, conn: Any) -> None:
+        with self._lock:
+            if worker.conn is not conn:
+                return
+            pending = list(worker.in_flight.values())
+            worker.in_flight.clear()
+            worker.ready.clear()
+            worker.pid = None
+        for future, _ in pending:
+            future.get_loop().call_soon_threadsafe(
+                _resolve,
+                future,
+                {
+                    "result": "",
+                    "success": False,
+                    "error": f"Agent worker {worker.index} exited while processing the request",
+                },
+            )
+        if self._closing:
+            return
+        exitcode = None
+        if worker.process is not None:
+            worker.process.join(timeout=1)
+            exitcode = worker.process.exitcode
+        logger.error(f"Agent worker {worker.index} exited (code {exitcode}); restarting")
+        time.sleep(self.restart_delay)
+        if not self._closing:
+            worker.restarts += 1
+            self._spawn(worker)
+
+    def _pick_worker(self, agent_name: str) -> _Worker:
+        candidates = [w for w in self._workers if w.ready.is_set()] or self._workers
+        if self.dispatch == "hash":
+            preferred = self._workers[zlib.crc32(agent_name.encode()) % len(self._workers)]
+            if (
+                preferred in candidates
+                and len(preferred.in_flight) < self.max_inflight_per_worker
+            ):
+                return preferred
+        return min(candidates, key=lambda w: len(w.in_flight))
+
+    async def execute(
+        self,
+        tool_name: str,
+        agent: Any,
+        task: str,
+        timeout: float,
+        img: Optional[str] = None,
+        imgs: Optional[List[str]] = None,
+        correct_answer: Optional[str] = None,
+        max_retries: int = 0,
+        streaming_callback: Optional[Callable[[Any], None]] = None,
+    ) -> Dict[str, Any]:
+        """Execute an agent call on a worker and return the standard tool response."""
+        if not self._started:
+            self.start(wait=False)
+        if self._capacity is None:
+            self._capacity = asyncio.Semaphore(
+                len(self._workers) * self.max_inflight_per_worker
+            )
+        agent_name = getattr(agent, "agent_name", tool_name)
+        kwargs = {
+            "task": task,
+            "timeout": timeout,
+            "img": img,
+            "imgs": imgs,
+            "correct_answer": correct_answer,
+            "max_retries": max_retries,
+        }
+        # The worker enforces the per-attempt timeout; this outer bound only
+        # protects against a worker that stops answering altogether.
+        deadline = timeout * (max_retries + 1) + self.executor_kwargs["retry_delay"] * max_retries + 5
+        async with self._capacity:
+            future = asyncio.get_running_loop().create_future()
+            request_id = next(self._request_ids)
+            with self._lock:
+                worker = self._pick_worker(agent_name)
+                worker.in_flight[request_id] = (future, streaming_callback)
+                conn = worker.conn
+            try:
+                conn.send(
+                    (request_id, agent_name, kwargs, streaming_callback is not None)
+                )
+                return await asyncio.wait_for(future, timeout=deadline)
+            except asyncio.TimeoutError:
+                return {
+                    "result": "",
+                    "success": False,
+                    "error": f"Agent worker {worker.index} did not answer within {deadline}s",
+                }
+            except (OSError, ValueError) as e:
+                return {
+                    "result": "",
+                    "success": False,
+                    "error": f"Agent worker {worker.index} unavailable: {e}",
+                }
+            finally:
+                with self._lock:
+                    worker.in_flight.pop(request_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "dispatch": self.dispatch,
+            "max_inflight_per_worker": self.max_inflight_per_worker,
+            "workers": [
+                {
+                    "index": w.index,
+                    "pid": w.pid,
+                    "alive": w.alive,
+                    "ready": w.ready.is_set(),
+                    "in_flight": len(w.in_flight),
+                    "completed": w.completed,
+                    "restarts": w.restarts,
+                }
+                for w in self._workers
+            ],
+        }
+
+    def shutdown(self, timeout: float = 5) -> None:
+        self._closing = True
+        for worker in self._workers:
+            try:
+                if worker.conn is not None:
+                    worker.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            if worker.process is not None:
+                worker.process.join(timeout)
+                if worker.process.is_alive():
+                    worker.process.terminate()
+
+
+def _resolve(future: asyncio.Future, response: Dict[str, Any]) -> None:
+    if not future.done():
+        future.set_result(response)
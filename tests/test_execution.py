@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from benchmarks.stub_llm import AsyncStubAgent, StubAgent
+from medical_aop.dispatch import AgentDispatcher
+from medical_aop.execution import AgentSaturatedError, AsyncAgentExecutor
+from medical_aop.lazy import LazyAgent
+
+
+class MemoryStubAgent(StubAgent):
+    """Stub with swarms' conversation memory: every run sees earlier tasks."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.short_memory = self.short_memory_init()
+
+    def short_memory_init(self):
+        return []
+
+    def run(self, task, *args, **kwargs):
+        self.short_memory.append(task)
+        time.sleep(self.latency)
+        return " | ".join(self.short_memory)
+
+
+def test_timeout_covers_the_wait_for_a_slot():
+    async def main():
+        executor = AsyncAgentExecutor(max_concurrency_per_agent=1, retry_delay=0)
+        agent = StubAgent(latency=0.5)
+        holder = asyncio.ensure_future(executor.run_agent("stub", agent, "a", 5))
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        with pytest.raises(TimeoutError):
+            await executor.run_agent("stub", agent, "b", 0.1)
+        waited = time.perf_counter() - start
+        await holder
+        return waited
+
+    assert asyncio.run(main()) < 0.3
+
+
+def test_timed_out_sync_call_keeps_its_slot_until_the_thread_returns():
+    async def main():
+        executor = AsyncAgentExecutor(max_concurrency_per_agent=2, retry_delay=0)
+        agent = StubAgent(latency=0.3)
+        with pytest.raises(TimeoutError):
+            await executor.run_agent("stub", agent, "a", 0.05)
+        during = executor.get_stats()
+        await asyncio.sleep(0.4)
+        return during, executor.get_stats()
+
+    during, after = asyncio.run(main())
+    assert during["in_flight"] == {"stub": 1}
+    assert during["stuck"] == {"stub": 1}
+    assert after["in_flight"] == {"stub": 0}
+    assert after["stuck"] == {}
+
+
+def test_native_arun_releases_its_slot_on_timeout():
+    async def main():
+        executor = AsyncAgentExecutor(max_concurrency_per_agent=1, retry_delay=0)
+        agent = AsyncStubAgent(latency=1.0)
+        with pytest.raises(TimeoutError):
+            await executor.run_agent("stub", agent, "a", 0.05)
+        await asyncio.sleep(0)
+        return executor.get_stats()
+
+    stats = asyncio.run(main())
+    assert stats["in_flight"] == {"stub": 0}
+    assert stats["stuck"] == {}
+
+
+def test_calls_fail_fast_once_every_slot_is_stuck():
+    async def main():
+        executor = AsyncAgentExecutor(max_concurrency_per_agent=2, retry_delay=0)
+        agent = StubAgent(latency=0.5)
+        for task in ("a", "b"):
+            with pytest.raises(TimeoutError):
+                await executor.run_agent("stub", agent, task, 0.05)
+        start = time.perf_counter()
+        with pytest.raises(AgentSaturatedError):
+            await executor.run_agent("stub", agent, "c", 5, max_retries=1)
+        failed_after = time.perf_counter() - start
+        await asyncio.sleep(0.6)
+        result = await executor.run_agent("stub", agent, "d", 5)
+        return failed_after, result
+
+    failed_after, result = asyncio.run(main())
+    assert failed_after < 0.1
+    assert "handled: d" in result
+
+
+def test_lazy_agent_gives_each_concurrent_call_its_own_conversation():
+    agent = LazyAgent(factory=MemoryStubAgent, agent_name="memory", latency=0.05)
+
+    async def main():
+        executor = AsyncAgentExecutor(retry_delay=0)
+        first = await asyncio.gather(
+            *(executor.run_agent("memory", agent, f"patient-{i}", 5) for i in range(4))
+        )
+        second = await executor.run_agent("memory", agent, "patient-x", 5)
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == [f"patient-{i}" for i in range(4)]
+    assert second == "patient-x"
+    assert agent.instances == 4
+
+
+def test_shared_stateful_agent_runs_one_call_at_a_time():
+    agent = MemoryStubAgent(latency=0.05)
+    running = []
+    peak = []
+    lock = threading.Lock()
+    run = agent.run
+
+    def counted_run(task, *args, **kwargs):
+        with lock:
+            running.append(task)
+            peak.append(len(running))
+        try:
+            return run(task, *args, **kwargs)
+        finally:
+            with lock:
+                running.remove(task)
+
+    agent.run = counted_run
+
+    async def main():
+        executor = AsyncAgentExecutor(retry_delay=0)
+        return await asyncio.gather(
+            *(executor.run_agent("memory", agent, f"patient-{i}", 5) for i in range(3))
+        )
+
+    results = asyncio.run(main())
+    assert max(peak) == 1
+    assert results == [f"patient-{i}" for i in range(3)]
+
+
+def test_dispatcher_reports_a_tool_timeout():
+    async def main():
+        dispatcher = AgentDispatcher(
+            AsyncAgentExecutor(retry_delay=0),
+            agents={"stub": StubAgent(latency=0.5)},
+            tool_configs={"stub": SimpleNamespace(timeout=0.1, max_retries=0)},
+        )
+        return await dispatcher.dispatch("stub", "a")
+
+    response = asyncio.run(main())
+    assert response["success"] is False
+    assert "timed out" in response["error"]
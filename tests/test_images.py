@@ -0,0 +1,94 @@
+import asyncio
+import base64
+import os
+import struct
+import zlib
+
+import pytest
+
+from medical_aop.images import ImageInputError, ImagePipeline
+
+
+def _png() -> bytes:
+    """A 1x1 grayscale PNG."""
+
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 0, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"\x00\x80"))
+        + chunk(b"IEND", b"")
+    )
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    uploads = tmp_path / "uploads"
+    outside = tmp_path / "outside"
+    uploads.mkdir()
+    outside.mkdir()
+    (uploads / "scan.png").write_bytes(_png())
+    (outside / "secret.png").write_bytes(_png())
+    return uploads, outside
+
+
+def _prepare(pipeline, source):
+    try:
+        return asyncio.run(pipeline.prepare(source))
+    finally:
+        pipeline.close()
+
+
+def test_path_under_an_allowed_root_is_read(dirs):
+    uploads, _ = dirs
+    prepared = _prepare(ImagePipeline(allowed_roots=[str(uploads)]), str(uploads / "scan.png"))
+    assert prepared.img.startswith("data:image/png;base64,")
+    assert prepared.ref_img.startswith("sha256:")
+
+
+def test_file_uri_under_an_allowed_root_is_read(dirs):
+    uploads, _ = dirs
+    prepared = _prepare(
+        ImagePipeline(allowed_roots=[str(uploads)]), "file://" + str(uploads / "scan.png")
+    )
+    assert prepared.img.startswith("data:image/png;base64,")
+
+
+def test_paths_are_rejected_without_allowed_roots(dirs):
+    uploads, _ = dirs
+    with pytest.raises(ImageInputError, match="outside the allowed directories"):
+        _prepare(ImagePipeline(), str(uploads / "scan.png"))
+
+
+def test_path_outside_the_roots_is_rejected(dirs):
+    uploads, outside = dirs
+    pipeline = ImagePipeline(allowed_roots=[str(uploads)])
+    with pytest.raises(ImageInputError, match="outside the allowed directories"):
+        _prepare(pipeline, str(uploads / ".." / "outside" / "secret.png"))
+
+
+def test_symlink_out_of_a_root_is_rejected(dirs):
+    uploads, outside = dirs
+    link = uploads / "link.png"
+    os.symlink(outside / "secret.png", link)
+    with pytest.raises(ImageInputError, match="outside the allowed directories"):
+        _prepare(ImagePipeline(allowed_roots=[str(uploads)]), str(link))
+
+
+def test_root_prefix_does_not_admit_a_sibling_directory(dirs, tmp_path):
+    uploads, _ = dirs
+    sibling = tmp_path / "uploads-old"
+    sibling.mkdir()
+    (sibling / "scan.png").write_bytes(_png())
+    with pytest.raises(ImageInputError, match="outside the allowed directories"):
+        _prepare(ImagePipeline(allowed_roots=[str(uploads)]), str(sibling / "scan.png"))
+
+
+def test_data_uri_needs_no_allowed_root():
+    uri = "data:image/png;base64," + base64.b64encode(_png()).decode()
+    prepared = _prepare(ImagePipeline(), uri)
+    assert prepared.img.startswith("data:image/png;base64,")
@@ -0,0 +1,60 @@
+from benchmarks.stub_llm import StubAgent
+from medical_aop.cache import ResponseCache, canonicalize_medication_list, make_cache_key
+from medical_aop.coalesce import SingleFlight
+
+
+def test_cache_key_covers_correct_answer():
+    cache = ResponseCache()
+    agent = StubAgent()
+    assert cache.key_for(agent, "task", correct_answer="A") != cache.key_for(
+        agent, "task", correct_answer="B"
+    )
+    assert cache.key_for(agent, "task") == cache.key_for(agent, "task", correct_answer=None)
+
+
+def test_cache_key_covers_prompt_model_and_images():
+    base = make_cache_key("agent", "prompt", "model", "task")
+    assert make_cache_key("agent", "other prompt", "model", "task") != base
+    assert make_cache_key("agent", "prompt", "other-model", "task") != base
+    assert make_cache_key("agent", "prompt", "model", "task", img="sha256:a") != base
+    assert make_cache_key("agent", "prompt", "model", "  TASK ") == base
+
+
+def test_drug_interaction_key_ignores_medication_order():
+    def key(task):
+        return make_cache_key("Drug-Interaction-Agent", "prompt", "model", task)
+
+    assert key("Check: warfarin, aspirin and ibuprofen") == key(
+        "Check: Aspirin; ibuprofen + warfarin"
+    )
+    assert key("Doses: 1,500 mg metformin, 2,000 mg sertraline") != key(
+        "Doses: 2,500 mg metformin, 1,000 mg sertraline"
+    )
+
+
+def test_coalescing_key_keeps_case_and_correct_answer():
+    flights = SingleFlight()
+    key = flights.key_for("agent", "Start HCTZ 25 mg")
+    assert flights.key_for("agent", "  Start HCTZ\n25 mg ") == key
+    assert flights.key_for("agent", "start hctz 25 mg") != key
+    assert flights.key_for("agent", "Start HCTZ 25 mg", correct_answer="A") != key
+    assert flights.key_for("other", "Start HCTZ 25 mg") != key
+
+
+def test_canonicalize_sorts_inline_and_bulleted_medications():
+    assert (
+        canonicalize_medication_list("Check: warfarin, aspirin and ibuprofen")
+        == "check:aspirin; ibuprofen; warfarin"
+    )
+    bulleted = "Current meds:\n- Warfarin 5 mg\n- aspirin 81 mg\n\nAny issues?"
+    assert canonicalize_medication_list(bulleted) == (
+        "current meds:\naspirin 81 mg\nwarfarin 5 mg\nany issues?"
+    )
+
+
+def test_canonicalize_keeps_prose_and_dose_numbers():
+    prose = "Note: patient stopped warfarin last week, then started aspirin."
+    assert canonicalize_medication_list(prose) == " ".join(prose.split()).lower()
+    assert "1,500 mg metformin" in canonicalize_medication_list(
+        "Doses: 1,500 mg metformin, 20 mg atorvastatin"
+    )
@@ -0,0 +1,114 @@
+import asyncio
+import socket
+
+import httpx
+import pytest
+
+from benchmarks.mock_llm import MockLLM, serve_mock_llm
+from benchmarks.stub_llm import StubAgent
+from medical_aop.execution import AgentSaturatedError, AsyncAgentExecutor
+from medical_aop.llm_client import SharedLLMClient
+
+
+class HTTPStubAgent(StubAgent):
+    """Stub agent whose LLM call goes to the mock backend through the shared client."""
+
+    def __init__(self, client: SharedLLMClient, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.client = client
+        self.base_url = base_url
+
+    def call_llm(self, task, streaming_callback=None):
+        response = self.client.client.post(
+            f"{self.base_url}/v1/messages",
+            json={
+                "model": self.model_name,
+                "max_tokens": 64,
+                "messages": [{"role": "user", "content": task}],
+            },
+        )
+        response.raise_for_status()
+        return response.json()["content"][0]["text"]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def mock_llm():
+    mock = MockLLM(latency=0.0)
+    with serve_mock_llm(mock, port=_free_port()) as base_url:
+        yield mock, base_url
+
+
+def test_overloaded_backend_is_retried_by_the_client_only(mock_llm):
+    mock, base_url = mock_llm
+    mock.error_rate = 1.0
+    client = SharedLLMClient(http2=False, max_retries=2, backoff_base=0.01)
+    agent = HTTPStubAgent(client, base_url)
+
+    async def main():
+        executor = AsyncAgentExecutor(retry_delay=0, already_retried=client.already_retried)
+        return await executor.execute("stub", agent, "task", 5, max_retries=2)
+
+    try:
+        response = asyncio.run(main())
+    finally:
+        client.close()
+    assert response["success"] is False
+    assert "529" in response["error"]
+    # One request plus the client's two retries; no tool-level retries on top.
+    assert mock.stats["requests"] == 3
+
+
+def test_hung_requests_hold_their_slots_then_calls_fail_fast(mock_llm):
+    mock, base_url = mock_llm
+    mock.hang_rate = 1.0
+    client = SharedLLMClient(http2=False, max_retries=0, timeout=1.0)
+    agent = HTTPStubAgent(client, base_url)
+
+    async def main():
+        executor = AsyncAgentExecutor(max_concurrency_per_agent=2, retry_delay=0)
+        timed_out = await asyncio.gather(
+            *(executor.run_agent("stub", agent, f"t{i}", 0.2) for i in range(2)),
+            return_exceptions=True,
+        )
+        with pytest.raises(AgentSaturatedError):
+            await executor.run_agent("stub", agent, "shed", 5)
+        stuck = executor.get_stats()["stuck"]
+        # The hung requests give up at the client's 1s read timeout.
+        await asyncio.sleep(1.5)
+        mock.hang_rate = 0.0
+        result = await executor.run_agent("stub", agent, "after", 5)
+        return timed_out, stuck, result, executor.get_stats()
+
+    try:
+        timed_out, stuck, result, stats = asyncio.run(main())
+    finally:
+        client.close()
+    assert all(isinstance(error, TimeoutError) for error in timed_out)
+    assert stuck == {"stub": 2}
+    assert result
+    assert stats["in_flight"] == {"stub": 0}
+    assert stats["stuck"] == {}
+
+
+def test_already_retried_follows_the_cause_chain():
+    client = SharedLLMClient(http2=False, max_retries=2)
+    request = httpx.Request("POST", "http://mock/v1/messages")
+    overloaded = httpx.HTTPStatusError(
+        "overloaded", request=request, response=httpx.Response(529, request=request)
+    )
+    try:
+        try:
+            raise overloaded
+        except httpx.HTTPStatusError as error:
+            raise RuntimeError("litellm wrapper") from error
+    except RuntimeError as wrapped:
+        assert client.already_retried(wrapped)
+    assert not client.already_retried(ValueError("bad request"))
+    assert not SharedLLMClient(http2=False, max_retries=0).already_retried(overloaded)
+    client.close()
@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from medical_aop.scheduler import DeadlineExceeded, FairScheduler
+
+
+def test_cancelled_queued_call_leaves_the_queue():
+    async def main():
+        scheduler = FairScheduler(max_concurrent=1)
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(scheduler.run(release.wait))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(scheduler.run(release.wait, tenant="a"))
+        await asyncio.sleep(0)
+        before = scheduler.get_stats()
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        after = scheduler.get_stats()
+        release.set()
+        await holder
+        return before, after, scheduler.get_stats()
+
+    before, after, done = asyncio.run(main())
+    assert before["queued"] == 1
+    assert before["lanes"]["normal"]["queued"] == 1
+    assert after["queued"] == 0
+    assert after["lanes"]["normal"]["queued"] == 0
+    assert after["tenants_queued"] == {}
+    assert done["running"] == 0
+
+
+def test_deadline_dropped_call_cancelled_before_it_resumes_releases_nothing():
+    async def main():
+        scheduler = FairScheduler(max_concurrent=1)
+        release = asyncio.Event()
+        dropped = None
+
+        async def hold_then_cancel():
+            # The holder's release drops the queued call for its deadline;
+            # its caller is cancelled before it sees the DeadlineExceeded.
+            await scheduler.run(release.wait)
+            dropped.cancel()
+
+        holder = asyncio.ensure_future(hold_then_cancel())
+        await asyncio.sleep(0)
+        dropped = asyncio.ensure_future(
+            scheduler.run(release.wait, deadline=time.monotonic() - 1)
+        )
+        await asyncio.sleep(0)
+        release.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await dropped
+        return scheduler.get_stats()
+
+    stats = asyncio.run(main())
+    assert stats["running"] == 0
+    assert stats["lanes"]["normal"]["deadline_dropped"] == 1
+
+
+def test_at_most_max_concurrent_calls_run():
+    async def main():
+        scheduler = FairScheduler(max_concurrent=2)
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        calls = [asyncio.ensure_future(scheduler.run(call)) for _ in range(6)]
+        calls.append(
+            asyncio.ensure_future(scheduler.run(call, deadline=time.monotonic() - 1))
+        )
+        await asyncio.sleep(0)
+        calls[2].cancel()
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        return peak, results, scheduler.get_stats()
+
+    peak, results, stats = asyncio.run(main())
+    assert peak == 2
+    assert isinstance(results[2], asyncio.CancelledError)
+    assert isinstance(results[-1], DeadlineExceeded)
+    assert stats["running"] == 0
+    assert stats["queued"] == 0
@@ -0,0 +1,68 @@
+from medical_agents import icd10_mapping_system_prompt
+from medical_aop.pipeline import parse_sections
+from medical_aop.sections import SectionParser, output_schema, parse_structured
+from medical_aop.streaming import SectionChunker
+
+ICD10_OUTPUT = """Here is my assessment.
+## SECTION: SUMMARY
+Chest pain on exertion.
+**SECTION: TOP CODE CANDIDATES**
+1. **I20.9** Angina pectoris, unspecified — typical exertional pattern (confidence 0.6)
+2. R07.9 — Chest pain, unspecified — symptom code
+   Confidence: 0.3
+SECTION: MISSING DOCUMENTATION NEEDED
+Duration and ECG findings.
+SECTION: SOURCES
+- ICD-10-CM Official Guidelines
+- CDC ICD-10-CM browser
+"""
+
+
+def test_schema_is_derived_from_the_prompt():
+    schema = {spec["key"]: spec for spec in output_schema(icd10_mapping_system_prompt)}
+    candidates = schema["top_code_candidates"]
+    assert candidates["type"] == "records"
+    assert [field["key"] for field in candidates["fields"]][:2] == ["code", "title"]
+    assert schema["sources"]["type"] == "list"
+
+
+def test_parser_reads_typed_records_and_strips_emphasis():
+    parsed = parse_structured(ICD10_OUTPUT, output_schema(icd10_mapping_system_prompt))
+    sections = parsed["sections"]
+    assert parsed["preamble"] == "Here is my assessment."
+    assert sections["summary"] == "Chest pain on exertion."
+    first, second = sections["top_code_candidates"]
+    assert first["code"] == "I20.9"
+    assert first["confidence"] == 0.6
+    assert second["code"] == "R07.9"
+    assert second["confidence"] == 0.3
+    assert sections["sources"] == ["ICD-10-CM Official Guidelines", "CDC ICD-10-CM browser"]
+    assert "alternative_considerations" in parsed["missing"]
+
+
+def test_streamed_parse_matches_the_whole_parse():
+    schema = output_schema(icd10_mapping_system_prompt)
+    whole = parse_structured(ICD10_OUTPUT, schema)
+    parser = SectionParser(schema)
+    for start in range(0, len(ICD10_OUTPUT), 7):
+        parser.feed(ICD10_OUTPUT[start : start + 7])
+    assert parser.close() == whole
+
+
+def test_parse_sections_and_chunker_share_the_header_rule():
+    sections = parse_sections(ICD10_OUTPUT)
+    assert list(sections) == [
+        "",
+        "SUMMARY",
+        "TOP CODE CANDIDATES",
+        "MISSING DOCUMENTATION NEEDED",
+        "SOURCES",
+    ]
+    chunker = SectionChunker()
+    chunks = []
+    for start in range(0, len(ICD10_OUTPUT), 5):
+        chunks.extend(chunker.feed(ICD10_OUTPUT[start : start + 5]))
+    chunks.extend(chunker.flush())
+    assert "".join(chunks) == ICD10_OUTPUT
+    assert len(chunks) == 5
+    assert chunks[2].startswith("**SECTION: TOP CODE CANDIDATES**")